@@ -1,34 +1,130 @@
 """Initialize the Flask application."""
+import asyncio
+import atexit
+import json
 import os
+import sys
+import threading
+import traceback
 from pathlib import Path
+from typing import Any, Dict, Optional
 
 from flask import Flask
 from flask_cors import CORS
 from loguru import logger
 
 import config
+from app.modules.log_writer import BackgroundLogWriter
+
+
+def compact_json(record: Dict[str, Any]) -> str:
+    """
+    Loguru format function writing each record as one small JSON object.
+    
+    Keeps only the time, level, message, ``module:line`` location, extras
+    and any traceback, instead of Loguru's full serialized record.
+    
+    Args:
+        record: The Loguru record
+        
+    Returns:
+        The format string for the record
+    """
+    entry = {
+        "time": record["time"].isoformat(timespec="milliseconds"),
+        "level": record["level"].name,
+        "message": record["message"],
+        "where": f"{record['name']}:{record['line']}",
+    }
+    extra = {key: value for key, value in record["extra"].items() if key != "json"}
+    if extra:
+        entry["extra"] = extra
+    if record["exception"] is not None:
+        error_type, error, trace = record["exception"]
+        entry["exception"] = "".join(traceback.format_exception(error_type, error, trace))
+    record["extra"]["json"] = json.dumps(entry, ensure_ascii=False, default=str)
+    return "{extra[json]}\n"
+
+
+_log_writer: Optional[BackgroundLogWriter] = None
 
 
 def setup_logging():
-    """Configure application logging."""
+    """
+    Configure application logging.
+    
+    Request threads only hand records to a queue; a background thread
+    serializes and writes them (see ``BackgroundLogWriter``). The log file
+    holds one compact JSON object per line (see ``compact_json``) unless
+    ``LOG_JSON`` is off. High-volume debug lines are sampled at the call
+    site with ``debug_sampled``.
+    """
+    global _log_writer
+    
     # Create log directory if it doesn't exist
     os.makedirs(config.LOG_FOLDER, exist_ok=True)
     
     # Configure Loguru
     logger.remove()  # Remove default handlers
-    logger.add(
+    if _log_writer is not None:
+        _log_writer.stop()
+    _log_writer = BackgroundLogWriter(max_queue=config.LOG_QUEUE_SIZE)
+    _log_writer.add(
         config.LOG_FILENAME,
         rotation=config.LOG_ROTATION,
         level=config.LOG_LEVEL,
-        format="{time:YYYY-MM-DD HH:mm:ss} | {level} | {module}:{function}:{line} - {message}"
+        format=compact_json if config.LOG_JSON else
+        "{time:YYYY-MM-DD HH:mm:ss} | {level} | {module}:{function}:{line} - {message}"
     )
-    logger.add(lambda msg: print(msg), level="INFO", format="{message}")  # Console output
+    _log_writer.add(sys.stderr, level="INFO", format="{message}")  # Console output
+    
+    # The request-side sink only formats the bare message and queues the record
+    logger.add(
+        _log_writer,
+        level=config.LOG_LEVEL,
+        format="{message}"
+    )
+    atexit.register(_log_writer.stop)
     
     return logger
 
 
-def create_app():
-    """Create and configure the Flask application."""
+def start_background_services():
+    """
+    Start the outbound HTTP pool, the rate refresher and the intent-cache pre-warm.
+    
+    Threads do not survive a fork, so servers that fork workers after
+    importing the app must call this in each worker (the ASGI entry point
+    does so on lifespan startup).
+    """
+    # Start the shared outbound HTTP connection pool
+    from app.modules.http_client import http_client
+    http_client.start()
+    atexit.register(http_client.stop)
+    
+    # Keep the popular and most-requested rate tables fresh in the background
+    if config.RATE_REFRESH_ENABLED:
+        from app.modules.currency_service import rate_refresher
+        rate_refresher.start()
+        atexit.register(rate_refresher.stop)
+    
+    # Pre-warm the intent cache for the shortcut buttons without delaying startup
+    from app.modules.gemini_client import prewarm_intent_cache
+    queries = [query for _, query in config.SHORTCUT_QUERIES]
+    threading.Thread(
+        target=lambda: asyncio.run(prewarm_intent_cache(queries)),
+        name="intent-prewarm",
+        daemon=True
+    ).start()
+
+
+def create_app(start_services: bool = True):
+    """
+    Create and configure the Flask application.
+    
+    Args:
+        start_services: Whether to start the background threads now (see ``start_background_services``)
+    """
     # Setup logging
     setup_logging()
     logger.info("Initializing Flask application")
@@ -48,6 +144,15 @@ def create_app():
     if not app.config.get("GEMINI_API_KEY"):
         logger.error("Gemini API key not found. Please set the GEMINI_API_KEY environment variable.")
     
+    # Fingerprint and precompress the static files the templates link to
+    if config.ASSET_BUILD_ENABLED:
+        from app.modules.assets import asset_manifest
+        asset_manifest.build()
+    
+    # Start background threads here only when the caller will not do it later
+    if start_services:
+        start_background_services()
+    
     # Register routes
     from app.routes import register_routes
     register_routes(app)
@@ -0,0 +1,234 @@
+"""
+ASGI entry point for the Currency Converter application.
+
+The hot API routes (/api/chat, /api/chat/stream, /api/convert) are served
+natively on the server's single long-lived event loop, so thousands of
+requests can wait on Gemini or the rate mirrors concurrently without one
+thread each. Every other route (pages, static files, metrics) is delegated
+to the regular Flask app.
+
+Run locally with:
+    uvicorn app.asgi:application --port 5000
+"""
+import json
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+
+from asgiref.wsgi import WsgiToAsgi
+from loguru import logger
+
+from app import create_app, start_background_services
+from app.modules.admission import Rejected, chat_lane, client_address, convert_lane
+from app.modules.currency_service import get_conversion, rate_refresher
+from app.modules.gemini_client import process_user_message, stream_user_message
+from app.modules.http_client import http_client
+from app.modules.metrics import HTTP_DURATION, HTTP_REQUESTS, server_timing_header, start_request_timing
+from app.routes import client_session_id, format_sse, parse_conversion_row, parse_date, rejection_body
+
+Scope = Dict[str, Any]
+Receive = Callable[[], Awaitable[Dict[str, Any]]]
+Send = Callable[[Dict[str, Any]], Awaitable[None]]
+
+JSON_HEADERS = [(b"content-type", b"application/json")]
+SSE_HEADERS = [
+    (b"content-type", b"text/event-stream; charset=utf-8"),
+    (b"cache-control", b"no-cache"),
+    (b"x-accel-buffering", b"no"),
+]
+
+
+async def read_json(receive: Receive) -> Any:
+    """
+    Read and decode a JSON request body.
+
+    Returns:
+        The decoded document, or an empty dict if the body is empty or invalid
+    """
+    body = b""
+    more_body = True
+    while more_body:
+        message = await receive()
+        body += message.get("body", b"")
+        more_body = message.get("more_body", False)
+    try:
+        return json.loads(body) if body else {}
+    except ValueError:
+        return {}
+
+
+async def send_json(send: Send, status: int, payload: Any,
+                    headers: List[Tuple[bytes, bytes]] = None) -> None:
+    """Send a complete JSON response."""
+    body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": JSON_HEADERS + [(b"content-length", str(len(body)).encode())] + (headers or []),
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+def _remote_addr(scope: Scope) -> str:
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+
+def _client(scope: Scope) -> str:
+    """Identify the client for rate limiting."""
+    forwarded_for = dict(scope.get("headers", [])).get(b"x-forwarded-for")
+    return client_address(_remote_addr(scope), forwarded_for.decode("latin-1") if forwarded_for else None)
+
+
+async def send_rejected(send: Send, rejection: Rejected) -> None:
+    """Answer a request turned away by admission control."""
+    await send_json(send, rejection.status, rejection_body(rejection),
+                    headers=[(b"retry-after", str(rejection.retry_after).encode())])
+
+
+async def chat(scope: Scope, receive: Receive, send: Send) -> None:
+    """Process a chat message and return a JSON response."""
+    data = await read_json(receive)
+    user_message = data.get("message", "") if isinstance(data, dict) else ""
+    if not user_message:
+        await send_json(send, 400, {"error": "No message provided"})
+        return
+
+    logger.info(f"Received chat message: {user_message}")
+    session_id = client_session_id(data)
+    try:
+        async with chat_lane.admit(_client(scope)):
+            response = await process_user_message(user_message, session_id)
+        await send_json(send, 200, {"response": response, "session_id": session_id})
+    except Rejected as e:
+        await send_rejected(send, e)
+    except Exception as e:
+        logger.error(f"Error processing chat: {str(e)}")
+        await send_json(send, 500, {"error": f"Failed to process message: {str(e)}"})
+
+
+async def chat_stream(scope: Scope, receive: Receive, send: Send) -> None:
+    """Process a chat message and stream the response as Server-Sent Events."""
+    data = await read_json(receive)
+    user_message = data.get("message", "") if isinstance(data, dict) else ""
+    if not user_message:
+        await send_json(send, 400, {"error": "No message provided"})
+        return
+
+    session_id = client_session_id(data)
+    try:
+        async with chat_lane.admit(_client(scope)):
+            logger.info(f"Received chat message (stream): {user_message}")
+            events = stream_user_message(user_message, session_id)
+            headers = SSE_HEADERS + [(b"x-session-id", session_id.encode("ascii"))]
+            await send({"type": "http.response.start", "status": 200, "headers": headers})
+            try:
+                async for event in events:
+                    await send({"type": "http.response.body", "body": format_sse(event).encode("utf-8"), "more_body": True})
+            finally:
+                await events.aclose()
+            await send({"type": "http.response.body", "body": b""})
+    except Rejected as e:
+        await send_rejected(send, e)
+
+
+async def convert(scope: Scope, receive: Receive, send: Send) -> None:
+    """Convert currency directly from API."""
+    data = await read_json(receive)
+    try:
+        amount, base_currency, target_currency = parse_conversion_row(data)
+    except (TypeError, ValueError, AttributeError) as e:
+        await send_json(send, 400, {"error": str(e)})
+        return
+    try:
+        as_of = parse_date(data.get("date"))
+    except ValueError:
+        await send_json(send, 400, {"error": "Invalid date, expected YYYY-MM-DD"})
+        return
+
+    logger.info(f"Converting {amount} {base_currency} to {target_currency}")
+    try:
+        async with convert_lane.admit(_client(scope)):
+            conversion = await get_conversion(amount, base_currency, target_currency, as_of=as_of)
+        await send_json(send, 200, {
+            "amount": amount,
+            "base_currency": base_currency,
+            "target_currency": target_currency,
+            "date": as_of.isoformat() if as_of else None,
+            "result": conversion["result"],
+            "rate_timestamp": conversion["rate_timestamp"],
+            "stale": conversion["stale"]
+        })
+    except Rejected as e:
+        await send_rejected(send, e)
+    except ValueError as e:
+        await send_json(send, 400, {"error": str(e)})
+    except Exception as e:
+        logger.error(f"Error converting currency: {str(e)}")
+        await send_json(send, 500, {"error": f"Failed to convert currency: {str(e)}"})
+
+
+class AsgiApplication:
+    """Routes hot API endpoints natively and everything else to Flask."""
+
+    def __init__(self):
+        """Create the Flask app and the native route table; background threads start with the server."""
+        self.flask_app = create_app(start_services=False)
+        self.wsgi = WsgiToAsgi(self.flask_app)
+        self.routes: Dict[Tuple[str, str], Callable[[Scope, Receive, Send], Awaitable[None]]] = {
+            ("POST", "/api/chat"): chat,
+            ("POST", "/api/chat/stream"): chat_stream,
+            ("POST", "/api/convert"): convert,
+        }
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "lifespan":
+            await self.lifespan(receive, send)
+            return
+        if scope["type"] == "http":
+            handler = self.routes.get((scope["method"], scope["path"]))
+            if handler is not None:
+                await self.serve_timed(handler, scope, receive, send)
+                return
+        await self.wsgi(scope, receive, send)
+
+    async def serve_timed(self, handler: Callable[[Scope, Receive, Send], Awaitable[None]],
+                          scope: Scope, receive: Receive, send: Send) -> None:
+        """Run a native handler, counting the request and adding a Server-Timing header."""
+        started = time.perf_counter()
+        stages = start_request_timing()
+        route = scope["path"]
+        status = 500
+
+        async def timed_send(message: Dict[str, Any]) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                elapsed = time.perf_counter() - started
+                HTTP_DURATION.observe(elapsed, route=route)
+                timing = (b"server-timing", server_timing_header(stages, elapsed).encode("utf-8"))
+                message = dict(message, headers=list(message.get("headers", [])) + [timing])
+            await send(message)
+
+        try:
+            await handler(scope, receive, timed_send)
+        finally:
+            HTTP_REQUESTS.inc(route=route, method=scope["method"], status=status)
+
+    async def lifespan(self, receive: Receive, send: Send) -> None:
+        """Start and stop shared resources with the server."""
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                # Started here rather than at import, so they run in the worker process
+                start_background_services()
+                logger.info("ASGI application started")
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                rate_refresher.stop()
+                http_client.stop()
+                logger.info("ASGI application stopped")
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+
+application = AsgiApplication()
@@ -0,0 +1,240 @@
+"""Admission control: per-client rate limits and bounded queues in front of the API."""
+import asyncio
+import math
+import threading
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Optional
+
+from loguru import logger
+
+import config
+from app.modules.concurrency import AsyncLimiter
+from app.modules.metrics import ADMISSION_REJECTED, ADMISSION_WAIT, CallbackMetric, record_stage, registry
+
+
+class Rejected(Exception):
+    """A request turned away before any work was done."""
+
+    def __init__(self, status: int, reason: str, retry_after: int, message: str):
+        """
+        Initialize the rejection.
+
+        Args:
+            status: HTTP status to answer with (429 or 503)
+            reason: Short machine-readable reason (rate_limited, queue_full, timeout)
+            retry_after: Seconds the client should wait before retrying
+            message: Message shown to the user
+        """
+        super().__init__(message)
+        self.status = status
+        self.reason = reason
+        self.retry_after = retry_after
+        self.message = message
+
+
+class ClientRateLimiter:
+    """
+    Token bucket per client.
+
+    Each client may burst up to ``burst`` requests and is then refilled at
+    ``rate`` requests per second. Buckets are kept in an LRU map capped at
+    ``max_clients``; a client evicted from it simply starts with a full bucket.
+    """
+
+    def __init__(self, rate: float, burst: int, max_clients: int):
+        """
+        Initialize the limiter.
+
+        Args:
+            rate: Tokens added per second; 0 disables the limit
+            burst: Bucket capacity
+            max_clients: Maximum number of buckets kept
+        """
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        self._buckets: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, client: str) -> float:
+        """
+        Take one token from a client's bucket.
+
+        Args:
+            client: Client identifier (e.g., its address)
+
+        Returns:
+            0 if the request may proceed, otherwise seconds until a token is available
+        """
+        if self.rate <= 0:
+            return 0.0
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(client)
+            if bucket is None:
+                bucket = self._buckets[client] = [float(self.burst), now]
+                if len(self._buckets) > self.max_clients:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(client)
+                bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+                bucket[1] = now
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+                return 0.0
+            return (1 - bucket[0]) / self.rate
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+class AdmissionLane:
+    """
+    Rate limit, bounded queue and concurrency cap for one class of requests.
+
+    A request first takes a token from its client's bucket (429 if empty),
+    then waits for one of ``max_in_flight`` slots. If ``max_queue`` requests
+    are already waiting, or no slot frees up within ``max_wait`` seconds, it
+    is turned away with 503. Rejections are immediate and carry a
+    Retry-After estimate, so a burst is shed instead of timing out slowly.
+    Lanes are independent: cheap conversions never queue behind chat.
+    """
+
+    def __init__(self, name: str, max_in_flight: int, max_queue: int, max_wait: float,
+                 rate: float, burst: int):
+        """
+        Initialize the lane.
+
+        Args:
+            name: Lane name used in metrics and statistics
+            max_in_flight: Requests served at once
+            max_queue: Requests allowed to wait for a slot
+            max_wait: Seconds a request may wait for a slot
+            rate: Requests per second per client; 0 disables the per-client limit
+            burst: Requests a client may send at once
+        """
+        self.name = name
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.limiter = AsyncLimiter(max_in_flight, name)
+        self.clients = ClientRateLimiter(rate, burst, config.ADMISSION_MAX_CLIENTS)
+        self._service_time = 1.0  # moving average of seconds a slot is held
+        self._lock = threading.Lock()
+        self.rejected: Dict[str, int] = {}
+
+    def _reject(self, status: int, reason: str, retry_after: float) -> Rejected:
+        retry_after = min(60, max(1, math.ceil(retry_after)))
+        with self._lock:
+            self.rejected[reason] = self.rejected.get(reason, 0) + 1
+        ADMISSION_REJECTED.inc(lane=self.name, reason=reason)
+        logger.warning(f"Rejected {self.name} request ({reason}), retry after {retry_after}s")
+        if status == 429:
+            message = f"لقد أرسلت طلبات كثيرة، يرجى المحاولة بعد {retry_after} ثانية."
+        else:
+            message = f"الخدمة مزدحمة حالياً، يرجى المحاولة بعد {retry_after} ثانية."
+        return Rejected(status, reason, retry_after, message)
+
+    def _queue_drain_time(self) -> float:
+        """Estimate how long the current queue takes to drain."""
+        queued = self.limiter.queued
+        return self._service_time * (queued + 1) / self.limiter.limit
+
+    async def enter(self, client: str) -> None:
+        """
+        Admit a request or raise.
+
+        Args:
+            client: Client identifier
+
+        Raises:
+            Rejected: If the client is over its rate or the lane is saturated
+        """
+        wait = self.clients.take(client)
+        if wait:
+            raise self._reject(429, "rate_limited", wait)
+        if self.limiter.queued >= self.max_queue:
+            raise self._reject(503, "queue_full", self._queue_drain_time())
+        try:
+            waited = await self.limiter.acquire(timeout=self.max_wait)
+        except asyncio.TimeoutError:
+            raise self._reject(503, "timeout", self._queue_drain_time())
+        ADMISSION_WAIT.observe(waited, lane=self.name)
+        if waited:
+            record_stage("admission", waited)
+
+    def leave(self, held: Optional[float] = None) -> None:
+        """
+        Free the slot taken by ``enter``.
+
+        Args:
+            held: Seconds the slot was held, used for Retry-After estimates
+        """
+        self.limiter.release()
+        if held is not None:
+            with self._lock:
+                self._service_time += 0.1 * (held - self._service_time)
+
+    @asynccontextmanager
+    async def admit(self, client: str) -> AsyncIterator[None]:
+        """Hold a slot in this lane for the duration of the block (raises Rejected)."""
+        await self.enter(client)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.leave(time.monotonic() - started)
+
+    def stats(self) -> Dict[str, object]:
+        """Return slot usage, the rejection counts and the tracked client count."""
+        with self._lock:
+            rejected = dict(self.rejected)
+            service_time = self._service_time
+        return {
+            **self.limiter.stats(),
+            "max_queue": self.max_queue,
+            "max_wait": self.max_wait,
+            "avg_service_time": service_time,
+            "rejected": rejected,
+            "clients": len(self.clients),
+        }
+
+
+def client_address(remote_addr: Optional[str], forwarded_for: Optional[str] = None) -> str:
+    """
+    Identify the client a request is rate limited as.
+
+    Args:
+        remote_addr: The peer address of the connection
+        forwarded_for: The X-Forwarded-For header, honored only if ``config.TRUST_PROXY_HEADERS``
+
+    Returns:
+        The client address
+    """
+    if config.TRUST_PROXY_HEADERS and forwarded_for:
+        return forwarded_for.split(",")[0].strip()
+    return remote_addr or "unknown"
+
+
+# LLM-bound chat traffic and the cheap conversion endpoints get separate lanes
+chat_lane = AdmissionLane(
+    "chat",
+    max_in_flight=config.CHAT_MAX_IN_FLIGHT,
+    max_queue=config.CHAT_MAX_QUEUE,
+    max_wait=config.CHAT_MAX_WAIT,
+    rate=config.CHAT_RATE_LIMIT,
+    burst=config.CHAT_RATE_BURST
+)
+convert_lane = AdmissionLane(
+    "convert",
+    max_in_flight=config.CONVERT_MAX_IN_FLIGHT,
+    max_queue=config.CONVERT_MAX_QUEUE,
+    max_wait=config.CONVERT_MAX_WAIT,
+    rate=config.CONVERT_RATE_LIMIT,
+    burst=config.CONVERT_RATE_BURST
+)
+registry.register(CallbackMetric(
+    "admission_tracked_clients", "Clients with a rate-limit bucket, by lane.",
+    ["lane"], lambda: {(lane.name,): len(lane.clients) for lane in (chat_lane, convert_lane)}, kind="gauge"
+))
@@ -0,0 +1,196 @@
+"""Static asset pipeline: content-hashed, precompressed copies of the static folder."""
+import gzip
+import hashlib
+import json
+import os
+import posixpath
+import re
+import tempfile
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple
+
+from loguru import logger
+
+import config
+
+try:
+    import brotli
+except ImportError:  # optional: only gzip variants are built without it
+    brotli = None
+
+MANIFEST_NAME = "manifest.json"
+
+# Files worth compressing; fonts and raster images are already compressed
+COMPRESSIBLE = {".css", ".js", ".svg", ".json", ".txt", ".html"}
+
+# Content-Encoding for each precompressed variant, in order of preference
+ENCODINGS: Tuple[Tuple[str, str], ...] = (("br", ".br"), ("gzip", ".gz"))
+
+_CSS_URL = re.compile(r"""url\(\s*(['"]?)([^'")]+)\1\s*\)""")
+
+
+def _hashed_name(path: str, content: bytes) -> str:
+    """Insert a short content hash before the extension: css/main.css -> css/main.1a2b3c4d5e6f.css."""
+    stem, ext = posixpath.splitext(path)
+    return f"{stem}.{hashlib.sha256(content).hexdigest()[:12]}{ext}"
+
+
+def _rewrite_css_urls(path: str, css: bytes, manifest: Dict[str, str]) -> bytes:
+    """Point relative ``url(...)`` references in a stylesheet at the hashed files."""
+    folder = posixpath.dirname(path)
+
+    def replace(match: "re.Match[str]") -> str:
+        quote, ref = match.group(1), match.group(2)
+        if ref.startswith(("data:", "http:", "https:", "//", "/", "#")):
+            return match.group(0)
+        ref_path, _, suffix = ref.partition("?")
+        target = posixpath.normpath(posixpath.join(folder, ref_path))
+        hashed = manifest.get(target)
+        if hashed is None:
+            return match.group(0)
+        relative = posixpath.relpath(hashed, folder or ".")
+        return f"url({quote}{relative}{'?' + suffix if suffix else ''}{quote})"
+
+    return _CSS_URL.sub(replace, css.decode("utf-8")).encode("utf-8")
+
+
+def _write_atomic(path: Path, content: bytes) -> None:
+    """Write a file through a temporary name so concurrent builds never expose a partial file."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(content)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def _variants(content: bytes) -> Iterable[Tuple[str, bytes]]:
+    """Yield (suffix, compressed bytes) for each available encoding."""
+    if brotli is not None:
+        yield ".br", brotli.compress(content, quality=11)
+    yield ".gz", gzip.compress(content, compresslevel=9, mtime=0)
+
+
+def build_assets(source: Path, output: Path) -> Dict[str, str]:
+    """
+    Copy the static folder into ``output`` under content-hashed names.
+
+    Stylesheets are built last so their ``url(...)`` references can be
+    rewritten to the hashed names of the fonts and images they use (and so
+    their own hash changes when a referenced file does). Compressible files
+    also get ``.gz`` variants, and ``.br`` variants when the ``brotli``
+    package is installed; a variant is kept only if it is smaller. Unchanged
+    files are not rewritten, so rebuilding on every start is cheap, and
+    several workers may build at once.
+
+    Args:
+        source: The static folder
+        output: Folder that receives the hashed files and the manifest
+
+    Returns:
+        The manifest, mapping each source path (e.g. ``css/main.css``) to its hashed path
+    """
+    files = sorted(
+        path.relative_to(source).as_posix()
+        for path in source.rglob("*")
+        if path.is_file() and output not in path.parents and not path.name.startswith(".")
+    )
+    manifest: Dict[str, str] = {}
+    for path in sorted(files, key=lambda p: p.endswith(".css")):
+        content = (source / path).read_bytes()
+        if path.endswith(".css"):
+            content = _rewrite_css_urls(path, content, manifest)
+        hashed = _hashed_name(path, content)
+        manifest[path] = hashed
+        target = output / hashed
+        if target.exists():
+            continue
+        if posixpath.splitext(path)[1] in COMPRESSIBLE:
+            for suffix, compressed in _variants(content):
+                if len(compressed) < len(content):
+                    _write_atomic(output / (hashed + suffix), compressed)
+        _write_atomic(target, content)  # last, so an existing target means a complete build
+    _write_atomic(output / MANIFEST_NAME, json.dumps(manifest, indent=2, sort_keys=True).encode("utf-8"))
+    return manifest
+
+
+class AssetManifest:
+    """Maps static paths to their fingerprinted, precompressed build."""
+
+    def __init__(self, source: Path, output: Path):
+        """
+        Initialize the manifest.
+
+        Args:
+            source: The static folder
+            output: Folder holding the built assets
+        """
+        self.source = source
+        self.output = output
+        self.files: Dict[str, str] = {}
+        self._served = set()  # hashed paths, the only names the asset route serves
+
+    def build(self) -> None:
+        """Build the assets, falling back to the plain static files on failure."""
+        try:
+            self.files = build_assets(self.source, self.output)
+            self._served = set(self.files.values())
+            logger.info(f"Built {len(self.files)} static assets into {self.output}")
+        except Exception as e:
+            logger.error(f"Error building static assets: {str(e)}")
+            self.files = {}
+            self._served = set()
+
+    def lookup(self, path: str) -> Optional[str]:
+        """Return the hashed path of a static file, or None if it was not built."""
+        return self.files.get(path)
+
+    def serves(self, hashed: str) -> bool:
+        """Whether ``hashed`` is a built asset."""
+        return hashed in self._served
+
+    def negotiate(self, hashed: str, accept_encoding: str) -> Tuple[str, Optional[str]]:
+        """
+        Pick the smallest variant of a built asset the client accepts.
+
+        Args:
+            hashed: Hashed asset path
+            accept_encoding: The request's Accept-Encoding header
+
+        Returns:
+            (file name relative to the output folder, Content-Encoding or None)
+        """
+        accepted = _accepted_encodings(accept_encoding)
+        for encoding, suffix in ENCODINGS:
+            if (encoding in accepted or "*" in accepted) and (self.output / (hashed + suffix)).is_file():
+                return hashed + suffix, encoding
+        return hashed, None
+
+
+def _accepted_encodings(header: str) -> set:
+    """Parse Accept-Encoding into the set of codings with a non-zero quality."""
+    accepted = set()
+    for part in header.split(","):
+        coding, _, params = part.strip().partition(";")
+        q = params.strip()
+        if q.startswith("q="):
+            try:
+                if float(q[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        if coding:
+            accepted.add(coding.strip().lower())
+    return accepted
+
+
+# Shared asset manifest instance
+asset_manifest = AssetManifest(config.STATIC_FOLDER, config.ASSET_BUILD_FOLDER)
+
+
+if __name__ == "__main__":
+    # Build ahead of deployment: python -m app.modules.assets
+    asset_manifest.build()
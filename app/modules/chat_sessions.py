@@ -0,0 +1,150 @@
+"""Per-client Gemini chat sessions with bounded count and history."""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+from loguru import logger
+
+# Rough characters-per-token ratio used for size reporting (no API call needed)
+CHARS_PER_TOKEN = 4
+
+
+def trim_history(history: List[Any], window: int) -> List[Any]:
+    """
+    Keep only the most recent turns of a chat history.
+
+    The kept window always starts on a user turn, so the model never sees a
+    reply (or function call) without the message that prompted it.
+
+    Args:
+        history: List of ``Content`` objects with a ``role`` attribute
+        window: Maximum number of contents to keep
+
+    Returns:
+        The trimmed history (the original list if it already fits)
+    """
+    if len(history) <= window:
+        return history
+    start = len(history) - window
+    while start < len(history) and getattr(history[start], "role", "user") != "user":
+        start += 1
+    return history[start:]
+
+
+def history_size(history: List[Any]) -> Dict[str, int]:
+    """
+    Measure the text held in a chat history.
+
+    Args:
+        history: List of ``Content`` objects
+
+    Returns:
+        Dictionary with the number of turns, UTF-8 bytes and approximate tokens
+    """
+    size = 0
+    for content in history:
+        for part in getattr(content, "parts", []):
+            text = getattr(part, "text", "") or ""
+            size += len(text.encode("utf-8"))
+            if getattr(part, "function_call", None):
+                size += len(str(part.function_call).encode("utf-8"))
+    return {"turns": len(history), "bytes": size, "approx_tokens": size // CHARS_PER_TOKEN}
+
+
+class SessionStore:
+    """
+    LRU store of chat sessions keyed by client session id.
+
+    Sessions idle for longer than the timeout are dropped, and the least
+    recently used session is evicted once the store is full.
+    """
+
+    def __init__(self, factory: Callable[[], Any], max_sessions: int, idle_timeout: float):
+        """
+        Initialize the store.
+
+        Args:
+            factory: Callable creating a new session
+            max_sessions: Maximum number of live sessions
+            idle_timeout: Seconds of inactivity after which a session is dropped
+        """
+        self.factory = factory
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self._sessions: "OrderedDict[str, List[Any]]" = OrderedDict()  # id -> [session, last_used]
+        self._lock = threading.Lock()
+        self.created = 0
+        self.evicted = 0
+
+    def get(self, session_id: str) -> Any:
+        """
+        Get the session for a client, creating it if needed.
+
+        Args:
+            session_id: The client session id
+
+        Returns:
+            The chat session
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._expire_locked(now)
+            entry = self._sessions.get(session_id)
+            if entry is not None:
+                entry[1] = now
+                self._sessions.move_to_end(session_id)
+                return entry[0]
+
+        session = self.factory()
+        with self._lock:
+            entry = self._sessions.setdefault(session_id, [session, now])
+            self._sessions.move_to_end(session_id)
+            if entry[0] is session:
+                self.created += 1
+                while len(self._sessions) > self.max_sessions:
+                    self._sessions.popitem(last=False)
+                    self.evicted += 1
+            return entry[0]
+
+    def _expire_locked(self, now: float) -> None:
+        while self._sessions:
+            session_id, (_, last_used) = next(iter(self._sessions.items()))
+            if now - last_used <= self.idle_timeout:
+                break
+            del self._sessions[session_id]
+            self.evicted += 1
+            logger.debug("Dropped idle chat session {}", session_id[:8])
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._sessions)
+
+    def stats(self, sizer: Optional[Callable[[Any], Dict[str, int]]] = None) -> Dict[str, Any]:
+        """
+        Get store statistics.
+
+        Args:
+            sizer: Optional callable returning the size of one session
+
+        Returns:
+            Dictionary with counters and, if a sizer is given, the total size of all sessions
+        """
+        with self._lock:
+            sessions = [session for session, _ in self._sessions.values()]
+        result: Dict[str, Any] = {
+            "live": len(sessions),
+            "max_sessions": self.max_sessions,
+            "idle_timeout": self.idle_timeout,
+            "created": self.created,
+            "evicted": self.evicted,
+        }
+        if sizer is not None:
+            total_bytes = total_tokens = 0
+            for session in sessions:
+                size = sizer(session)
+                total_bytes += size["bytes"]
+                total_tokens += size["approx_tokens"]
+            result["total_bytes"] = total_bytes
+            result["total_approx_tokens"] = total_tokens
+        return result
@@ -0,0 +1,152 @@
+"""Concurrency primitives shared across event loops."""
+import asyncio
+import threading
+import time
+import weakref
+from collections import deque
+from concurrent.futures import Future
+from typing import Dict, Optional
+
+from app.modules.metrics import CallbackMetric, registry
+
+
+# Every limiter in the process, reported on /metrics by name
+_limiters: "weakref.WeakSet[AsyncLimiter]" = weakref.WeakSet()
+
+
+class AsyncLimiter:
+    """
+    Bounded semaphore that can be awaited from any event loop.
+
+    ``asyncio.Semaphore`` binds to one loop, but Flask runs each async view in
+    its own loop. Waiters here are thread-safe ``concurrent.futures.Future``
+    objects, so requests on different loops share one global limit. Time spent
+    waiting for a slot is recorded for sizing workers.
+    """
+
+    def __init__(self, limit: int, name: str):
+        """
+        Initialize the limiter.
+
+        Args:
+            limit: Maximum number of holders at once
+            name: Name used in statistics and logs
+        """
+        self.limit = limit
+        self.name = name
+        self._available = limit
+        self._waiters: deque = deque()
+        self._lock = threading.Lock()
+        self.acquired = 0
+        self.timeouts = 0
+        self.max_queued = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        _limiters.add(self)
+
+    async def acquire(self, timeout: Optional[float] = None) -> float:
+        """
+        Wait for a free slot.
+
+        Args:
+            timeout: Maximum seconds to wait, or None to wait indefinitely
+
+        Returns:
+            Seconds spent waiting in the queue
+
+        Raises:
+            asyncio.TimeoutError: If no slot frees up within the timeout
+        """
+        started = time.monotonic()
+        with self._lock:
+            if self._available > 0 and not self._waiters:
+                self._available -= 1
+                self._record_wait(0.0)
+                return 0.0
+            waiter = Future()
+            self._waiters.append(waiter)
+            self.max_queued = max(self.max_queued, len(self._waiters))
+
+        try:
+            await asyncio.wait_for(asyncio.wrap_future(waiter), timeout)
+        except BaseException as e:
+            with self._lock:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                if isinstance(e, asyncio.TimeoutError):
+                    self.timeouts += 1
+            # The slot may have been handed over just as we gave up
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            raise
+
+        waited = time.monotonic() - started
+        with self._lock:
+            self._record_wait(waited)
+        return waited
+
+    @property
+    def queued(self) -> int:
+        """Number of callers waiting for a slot."""
+        return len(self._waiters)
+
+    def _record_wait(self, waited: float) -> None:
+        self.acquired += 1
+        self.total_wait += waited
+        self.max_wait = max(self.max_wait, waited)
+
+    def release(self) -> None:
+        """Free a slot, handing it directly to the oldest waiter if any."""
+        with self._lock:
+            while self._waiters:
+                waiter = self._waiters.popleft()
+                if waiter.set_running_or_notify_cancel():
+                    waiter.set_result(True)
+                    return
+            self._available += 1
+
+    async def __aenter__(self) -> "AsyncLimiter":
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        self.release()
+
+    def stats(self) -> Dict[str, float]:
+        """Return in-flight/queued counts and queue-time statistics."""
+        with self._lock:
+            return {
+                "limit": self.limit,
+                "in_flight": self.limit - self._available,
+                "queued": len(self._waiters),
+                "max_queued": self.max_queued,
+                "acquired": self.acquired,
+                "timeouts": self.timeouts,
+                "avg_wait": self.total_wait / self.acquired if self.acquired else 0.0,
+                "max_wait": self.max_wait,
+            }
+
+
+def _limiter_values(field: str) -> Dict[tuple, float]:
+    values = {}
+    for limiter in list(_limiters):
+        values[(limiter.name,)] = limiter.stats()[field]
+    return values
+
+
+registry.register(CallbackMetric(
+    "limiter_slots", "Slots of each concurrency limiter (gemini, admission lanes).",
+    ["limiter"], lambda: _limiter_values("limit"), kind="gauge"
+))
+registry.register(CallbackMetric(
+    "limiter_in_flight", "Slots currently held, by limiter.",
+    ["limiter"], lambda: _limiter_values("in_flight"), kind="gauge"
+))
+registry.register(CallbackMetric(
+    "limiter_queued", "Callers waiting for a slot, by limiter.",
+    ["limiter"], lambda: _limiter_values("queued"), kind="gauge"
+))
+registry.register(CallbackMetric(
+    "limiter_timeouts_total", "Callers that gave up waiting for a slot, by limiter.",
+    ["limiter"], lambda: _limiter_values("timeouts")
+))
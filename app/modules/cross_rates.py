@@ -0,0 +1,94 @@
+"""Cross-rate engine serving any currency pair from a single pivot table."""
+import time
+from array import array
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+
+class CrossRateTable:
+    """
+    Exchange rates from one pivot currency held in a dense float64 array.
+
+    ``values[index[code]]`` is the price of one pivot unit in ``code``, so the
+    rate for any pair is ``values[target] / values[base]``.
+    """
+
+    __slots__ = ("pivot", "index", "values", "fetched_at", "stale")
+
+    def __init__(self, pivot: str, index: Dict[str, int], values: array,
+                 fetched_at: Optional[float] = None, stale: bool = False):
+        """
+        Initialize a table.
+
+        Args:
+            pivot: Lowercase pivot currency code (e.g., usd)
+            index: Mapping of lowercase currency code to array position
+            values: float64 array of pivot rates aligned with ``index``
+            fetched_at: Unix timestamp of the upstream data
+            stale: Whether the table is being served past its freshness
+                because upstream is unavailable
+        """
+        self.pivot = pivot
+        self.index = index
+        self.values = values
+        self.fetched_at = fetched_at if fetched_at is not None else time.time()
+        self.stale = stale
+
+    @classmethod
+    def from_rates(cls, pivot: str, rates: Dict[str, float],
+                   fetched_at: Optional[float] = None) -> "CrossRateTable":
+        """
+        Build a table from an upstream ``{code: rate}`` mapping.
+
+        Non-numeric and non-positive rates are dropped, and the pivot itself
+        is always present with a rate of 1.
+
+        Args:
+            pivot: Lowercase pivot currency code
+            rates: Mapping of lowercase currency code to rate from the pivot
+            fetched_at: Unix timestamp of the upstream data
+
+        Returns:
+            The cross-rate table
+        """
+        clean = {pivot: 1.0}
+        for code, rate in rates.items():
+            if isinstance(rate, (int, float)) and rate > 0:
+                clean[code] = float(rate)
+        codes = sorted(clean)
+        index = {code: position for position, code in enumerate(codes)}
+        return cls(pivot, index, array("d", (clean[code] for code in codes)), fetched_at)
+
+    def age(self) -> float:
+        """Return the age of the data in seconds."""
+        return time.time() - self.fetched_at
+
+    def timestamp(self) -> str:
+        """Return the fetch time as an ISO 8601 UTC timestamp."""
+        return datetime.fromtimestamp(self.fetched_at, tz=timezone.utc).isoformat(timespec="seconds")
+
+    def __contains__(self, code: str) -> bool:
+        return code in self.index
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def codes(self) -> List[str]:
+        """Return the currency codes in array order."""
+        return sorted(self.index, key=self.index.__getitem__)
+
+    def rate(self, base: str, target: str) -> float:
+        """
+        Get the rate for one unit of ``base`` expressed in ``target``.
+
+        Args:
+            base: Lowercase base currency code
+            target: Lowercase target currency code
+
+        Returns:
+            The cross rate
+
+        Raises:
+            KeyError: If either currency is not in the table
+        """
+        return self.values[self.index[target]] / self.values[self.index[base]]
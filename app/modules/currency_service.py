@@ -1,11 +1,328 @@
 """Currency conversion service module."""
 import asyncio
-from typing import List, Dict, Any, Optional
+import math
+import os
+import time
+from datetime import date, datetime, timezone
+from typing import List, Dict, Any, Optional, Tuple
 
-import aiohttp
 from loguru import logger
 
 import config
+from app.modules.cross_rates import CrossRateTable
+from app.modules.http_client import http_client
+from app.modules.log_writer import debug_sampled
+from app.modules.metrics import RATE_LOOKUPS, CallbackMetric, registry, timed
+from app.modules.rate_cache import rate_cache
+from app.modules.rate_history import day_timestamp, rate_history
+from app.modules.rate_refresher import RateRefresher
+from app.modules.rate_snapshot import rate_snapshots
+from app.modules.rate_sources import CLOSED, HALF_OPEN, OPEN, SourceSelector
+from app.modules.shared_rates import shared_rates
+
+# Mirror selection with hedged requests and per-mirror circuit breakers
+rate_sources = SourceSelector(config.CURRENCY_API_URLS)
+history_sources = SourceSelector(config.CURRENCY_HISTORY_URLS)
+
+_SELECTORS = (("latest", rate_sources), ("history", history_sources))
+_CIRCUIT_LEVELS = {CLOSED: 0.0, HALF_OPEN: 0.5, OPEN: 1.0}
+
+registry.register(CallbackMetric(
+    "rate_mirror_circuit_open", "Mirror circuit breaker state: 0 closed, 0.5 half-open, 1 open.",
+    ["selector", "mirror"],
+    lambda: {
+        (name, source.breaker.name): _CIRCUIT_LEVELS[source.breaker.state]
+        for name, selector in _SELECTORS for source in selector.sources
+    },
+    kind="gauge"
+))
+registry.register(CallbackMetric(
+    "rate_mirror_hedges_total", "Fetches hedged to another mirror because the first was slow.",
+    ["selector"], lambda: {(name,): selector.hedges for name, selector in _SELECTORS}
+))
+
+# Dates whose dated download failed recently (monotonic time of the failure)
+_history_failures: Dict[date, float] = {}
+
+# The bases that get most of the traffic; always kept warm by the refresher
+POPULAR_CURRENCIES = [
+    {"code": "USD", "name": "دولار أمريكي", "symbol": "$"},
+    {"code": "EUR", "name": "يورو", "symbol": "€"},
+    {"code": "GBP", "name": "جنيه إسترليني", "symbol": "£"},
+    {"code": "EGP", "name": "جنيه مصري", "symbol": "ج.م"},
+    {"code": "SAR", "name": "ريال سعودي", "symbol": "ر.س"},
+    {"code": "AED", "name": "درهم إماراتي", "symbol": "د.إ"},
+    {"code": "KWD", "name": "دينار كويتي", "symbol": "د.ك"},
+    {"code": "JPY", "name": "ين ياباني", "symbol": "¥"},
+    {"code": "CNY", "name": "يوان صيني", "symbol": "¥"},
+    {"code": "CAD", "name": "دولار كندي", "symbol": "C$"}
+]
+
+async def _fetch_from_url(url: str, base_currency: str) -> Dict[str, float]:
+    """Fetch one mirror and validate the response shape."""
+    debug_sampled("Fetching exchange rates from: {}", url)
+    data = await http_client.get_json(url, timeout=config.HTTP_REQUEST_TIMEOUT)
+    
+    # Check if the response contains the expected data structure
+    if base_currency not in data:
+        logger.opt(lazy=True).debug("Response data keys: {}", lambda: list(data.keys()))
+        raise ValueError(f"Invalid API response: base currency '{base_currency}' not in response")
+    
+    return data[base_currency]
+
+async def fetch_rate_table(base_currency: str) -> Dict[str, float]:
+    """
+    Download the exchange-rate table for a base currency.
+    
+    The healthiest mirror is tried first; if it has not answered within its
+    adaptive hedge delay the next mirror is raced against it.
+    
+    Args:
+        base_currency: The lowercase base currency code (e.g., usd)
+        
+    Returns:
+        Mapping of lowercase target currency code to rate
+        
+    Raises:
+        ValueError: If every source fails
+    """
+    return await rate_sources.fetch(base_currency, lambda url: _fetch_from_url(url, base_currency))
+
+async def _load_table(base_currency: str) -> CrossRateTable:
+    """
+    Load a base currency's cross-rate table.
+    
+    A snapshot younger than the cache TTL is used as-is (warm start).
+    Otherwise the rates are downloaded and the snapshot is refreshed; if
+    every mirror fails, the last snapshot is served and marked stale.
+    """
+    snapshot = await asyncio.to_thread(rate_snapshots.load, base_currency)
+    if snapshot is not None and snapshot.age() < config.RATE_CACHE_TTL:
+        logger.info(f"Loaded {base_currency} rates from snapshot ({snapshot.age():.0f}s old)")
+        return snapshot
+    
+    try:
+        return await _download_table(base_currency)
+    except ValueError:
+        if snapshot is None:
+            raise
+        logger.warning(f"All rate sources failed for {base_currency}, serving snapshot from {snapshot.timestamp()}")
+        snapshot.stale = True
+        return snapshot
+
+async def _download_table(base_currency: str) -> CrossRateTable:
+    """Download a base currency's rates, pack them into a table and update its snapshot."""
+    rates = await fetch_rate_table(base_currency)
+    table = CrossRateTable.from_rates(base_currency, rates)
+    if config.RATE_SHARED_ENABLED:
+        shared_rates.publish(table)
+    try:
+        await asyncio.to_thread(rate_snapshots.save, table)
+    except Exception as e:
+        logger.error(f"Failed to save {base_currency} rate snapshot: {str(e)}")
+    return table
+
+def _shared_table(key: str) -> Optional[CrossRateTable]:
+    """Get the table another worker published for a key if it is still fresh."""
+    if not config.RATE_SHARED_ENABLED:
+        return None
+    table = shared_rates.read(key)
+    if table is None or table.age() >= config.RATE_CACHE_TTL:
+        return None
+    return table
+
+async def _refresh_table(key: str) -> CrossRateTable:
+    """
+    Renew a table in the background.
+    
+    Only the elected refresher process downloads; the other workers pick up
+    what it published and only go upstream themselves if it has fallen
+    behind (e.g. while a new refresher is being elected).
+    """
+    if not config.RATE_SHARED_ENABLED or shared_rates.is_leader():
+        return await _download_table(key)
+    table = _shared_table(key)
+    if table is not None:
+        return table
+    logger.warning(f"No fresh shared '{key}' rates from the elected refresher, downloading them directly")
+    return await _download_table(key)
+
+def table_key(base_currency: str) -> str:
+    """
+    Get the cache key of the table that serves a base currency.
+    
+    Args:
+        base_currency: The lowercase base currency code
+        
+    Returns:
+        The pivot currency, or the base itself if the pivot table lacks it
+    """
+    pivot_table = rate_cache.peek(config.PIVOT_CURRENCY)
+    if pivot_table is None or base_currency in pivot_table:
+        return config.PIVOT_CURRENCY
+    return base_currency
+
+# Background refresh of the popular and most-requested tables
+rate_refresher = RateRefresher(
+    rate_cache,
+    _refresh_table,
+    seeds=[currency["code"].lower() for currency in POPULAR_CURRENCIES],
+    table_key=table_key
+)
+os.register_at_fork(after_in_child=rate_refresher.forget_after_fork)
+
+registry.register(CallbackMetric(
+    "rate_refresher_runs_total", "Background table refreshes by outcome.",
+    ["outcome"], lambda: {("ok",): rate_refresher.refreshes, ("error",): rate_refresher.failures}
+))
+registry.register(CallbackMetric(
+    "rate_refresher_failing_tables", "Tables whose last background refresh failed.",
+    [], lambda: {(): len(rate_refresher.stats()["failing"])}, kind="gauge"
+))
+
+async def _cached_table(key: str) -> CrossRateTable:
+    """
+    Get the table for a key.
+    
+    The copy shared by all workers is read first (lock-free); the worker's
+    own cache is only consulted when no fresh shared copy exists, and then
+    serves an expired table while the refresher renews it.
+    """
+    table = _shared_table(key)
+    if table is not None:
+        RATE_LOOKUPS.inc(source="shared")
+        return table
+    RATE_LOOKUPS.inc(source="cache")
+    on_stale = rate_refresher.request_refresh if rate_refresher.running else None
+    return await rate_cache.get_or_fetch(key, _load_table, on_stale=on_stale)
+
+async def get_rate_table(base_currency: str) -> CrossRateTable:
+    """
+    Get a cross-rate table that can quote pairs from a base currency.
+    
+    All pairs are served from the single pivot table (``config.PIVOT_CURRENCY``);
+    only a base missing from the pivot table falls back to its own table.
+    While the background refresher runs, an expired table is returned at
+    once and renewed in the background instead of waiting on upstream.
+    
+    Args:
+        base_currency: The lowercase base currency code
+        
+    Returns:
+        The cross-rate table
+        
+    Raises:
+        ValueError: If the rates cannot be fetched
+    """
+    rate_refresher.observe(base_currency)
+    with timed("rates"):
+        pivot_table = await _cached_table(config.PIVOT_CURRENCY)
+        if base_currency in pivot_table:
+            return pivot_table
+        
+        logger.warning(f"Currency '{base_currency}' missing from pivot table, fetching its own table")
+        return await _cached_table(base_currency)
+
+def _utc_today() -> date:
+    return datetime.now(timezone.utc).date()
+
+def _check_history_range(start: date, end: date) -> None:
+    """Raise ValueError unless a date range can be served from the history store."""
+    if start > end:
+        raise ValueError("تاريخ البداية بعد تاريخ النهاية")
+    if start < rate_history.epoch:
+        raise ValueError(f"لا تتوفر أسعار صرف تاريخية قبل {rate_history.epoch.isoformat()}")
+    if end > _utc_today():
+        raise ValueError("لا تتوفر أسعار صرف لتواريخ مستقبلية")
+    if (end - start).days >= config.RATE_HISTORY_MAX_DAYS:
+        raise ValueError(f"أقصى مدة مسموح بها هي {config.RATE_HISTORY_MAX_DAYS} يوماً")
+
+async def _download_history_day(day: date) -> None:
+    """Download the pivot table of one date from the dated mirrors and append it to the history."""
+    pivot = config.PIVOT_CURRENCY
+    rates = await history_sources.fetch(pivot, lambda url: _fetch_from_url(url, pivot), date=day.isoformat())
+    table = CrossRateTable.from_rates(pivot, rates, fetched_at=day_timestamp(day))
+    await asyncio.to_thread(rate_history.append, day, table)
+
+async def _fill_history(days: List[date]) -> None:
+    """
+    Download the dates missing from the history store.
+    
+    At most ``config.RATE_HISTORY_FETCH_CONCURRENCY`` dates are fetched at
+    once. A date that failed (e.g., today before upstream publishes it) is
+    not retried for ``config.RATE_STALE_RETRY`` seconds.
+    """
+    now = time.monotonic()
+    days = [day for day in days if now - _history_failures.get(day, -math.inf) >= config.RATE_STALE_RETRY]
+    if not days:
+        return
+    logger.info(f"Downloading {len(days)} missing day(s) of rate history")
+    semaphore = asyncio.Semaphore(config.RATE_HISTORY_FETCH_CONCURRENCY)
+    
+    async def fill(day: date) -> None:
+        async with semaphore:
+            try:
+                await _download_history_day(day)
+                _history_failures.pop(day, None)
+            except Exception as e:
+                _history_failures[day] = time.monotonic()
+                logger.warning(f"Failed to download rates for {day.isoformat()}: {str(e)}")
+    
+    await asyncio.gather(*(fill(day) for day in days))
+
+async def get_history_table(day: date) -> CrossRateTable:
+    """
+    Get the pivot rate table of a past date, downloading it once if it is not stored.
+    
+    Args:
+        day: The date
+        
+    Returns:
+        The table, timestamped at midnight UTC of that date
+        
+    Raises:
+        ValueError: If the date is out of range or its rates cannot be fetched
+    """
+    _check_history_range(day, day)
+    with timed("history"):
+        table = rate_history.table(day)
+        if table is None:
+            await _fill_history([day])
+            table = rate_history.table(day)
+    if table is None:
+        raise ValueError(f"تعذر الحصول على أسعار الصرف بتاريخ {day.isoformat()}")
+    return table
+
+async def get_rate_history(base_currency: str, target_currency: str,
+                           start: date, end: date) -> List[Dict[str, Any]]:
+    """
+    Get the daily rate of a currency pair over a date range.
+    
+    Dates not in the local history store are downloaded once (the whole
+    pivot table per date); after that any pair and range is read locally.
+    
+    Args:
+        base_currency: The base currency code (e.g., USD)
+        target_currency: The target currency code (e.g., EGP)
+        start: First date (inclusive)
+        end: Last date (inclusive)
+        
+    Returns:
+        One {"date", "rate"} dictionary per date; the rate is None where unavailable
+        
+    Raises:
+        ValueError: If the range is invalid or a currency is unknown
+    """
+    _check_history_range(start, end)
+    with timed("history"):
+        missing = rate_history.missing(start, end)
+        if missing:
+            await _fill_history(missing)
+        try:
+            points = rate_history.series(base_currency.lower(), target_currency.lower(), start, end)
+        except KeyError:
+            raise ValueError(f"لا تتوفر أسعار تاريخية للتحويل من {base_currency} إلى {target_currency}")
+    return [{"date": day.isoformat(), "rate": rate} for day, rate in points]
 
 async def convert_currency(amount: float, base_currency: str, target_currency: str) -> float:
     """
@@ -22,48 +339,129 @@ async def convert_currency(amount: float, base_currency: str, target_currency: s
     Raises:
         ValueError: If the conversion fails
     """
-    logger.info(f"Converting {amount} {base_currency} to {target_currency}")
+    conversion = await get_conversion(amount, base_currency, target_currency)
+    return conversion["result"]
+
+async def get_conversion(amount: float, base_currency: str, target_currency: str,
+                         as_of: Optional[date] = None) -> Dict[str, Any]:
+    """
+    Convert an amount and report how fresh the rate behind it is.
+    
+    The rate is computed from the cached pivot table, which is only downloaded
+    on a miss. With ``as_of`` set to a past date, that date's table from the
+    history store is used instead.
+    
+    Args:
+        amount: The amount to convert
+        base_currency: The base/source currency code (e.g., USD)
+        target_currency: The target currency code (e.g., EUR)
+        as_of: Optional past date (UTC) to convert at
+        
+    Returns:
+        Dictionary with result, rate, rate_timestamp (ISO 8601 UTC) and stale
+        
+    Raises:
+        ValueError: If the conversion fails
+    """
+    debug_sampled("Converting {} {} to {}", amount, base_currency, target_currency)
     
     # Ensure currency codes are lowercase for API
     base_currency_lower = base_currency.lower()
     target_currency_lower = target_currency.lower()
     
-    # Format the URLs
-    urls = [url.format(base=base_currency_lower) for url in config.CURRENCY_API_URLS]
+    if as_of is not None and as_of < _utc_today():
+        table = await get_history_table(as_of)
+        if base_currency_lower not in table:
+            raise ValueError(f"العملة {base_currency} غير متوفرة بتاريخ {as_of.isoformat()}")
+    else:
+        if as_of is not None and as_of > _utc_today():
+            raise ValueError("لا تتوفر أسعار صرف لتواريخ مستقبلية")
+        try:
+            table = await get_rate_table(base_currency_lower)
+        except ValueError:
+            raise ValueError(f"جميع مصادر أسعار الصرف فشلت للتحويل من {base_currency} إلى {target_currency}")
     
-    async with aiohttp.ClientSession() as session:
-        for url in urls:
-            try:
-                logger.debug(f"Fetching exchange rate from: {url}")
-                async with session.get(url, timeout=5) as resp:
-                    resp.raise_for_status()
-                    data = await resp.json()
-                    
-                    # Check if the response contains the expected data structure
-                    if base_currency_lower not in data:
-                        logger.warning(f"Invalid API response: base currency '{base_currency_lower}' not in response")
-                        logger.debug(f"Response data keys: {list(data.keys())}")
-                        continue
-                        
-                    if target_currency_lower not in data[base_currency_lower]:
-                        logger.warning(f"Target currency '{target_currency_lower}' not found in response for {base_currency_lower}")
-                        logger.debug(f"Available target currencies: {list(data[base_currency_lower].keys())[:10]}...")
-                        continue
-                    
-                    # Extract the exchange rate
-                    rate = data[base_currency_lower][target_currency_lower]
-                    logger.info(f"Exchange rate found: 1 {base_currency} = {rate} {target_currency}")
-                    
-                    # Calculate and return the result
-                    result = round(amount * rate, 2)
-                    logger.info(f"Conversion result: {amount} {base_currency} = {result} {target_currency}")
-                    return result
-                    
-            except Exception as e:
-                logger.error(f"Failed to fetch from {url}: {str(e)}")
+    if target_currency_lower not in table:
+        logger.warning(f"Target currency '{target_currency_lower}' not found in rate table for {base_currency_lower}")
+        raise ValueError(f"العملة {target_currency} غير متوفرة للتحويل من {base_currency}")
+    
+    # Compute the cross rate
+    rate = table.rate(base_currency_lower, target_currency_lower)
+    debug_sampled("Exchange rate found: 1 {} = {} {}", base_currency, rate, target_currency)
     
-    # If we get here, all sources failed
-    raise ValueError(f"جميع مصادر أسعار الصرف فشلت للتحويل من {base_currency} إلى {target_currency}")
+    # Calculate and return the result
+    result = round(amount * rate, 2)
+    debug_sampled("Conversion result: {} {} = {} {}", amount, base_currency, result, target_currency)
+    return {
+        "result": result,
+        "rate": rate,
+        "rate_timestamp": table.timestamp(),
+        "stale": table.stale,
+    }
+
+async def convert_batch(rows: List[Tuple[float, str, str]]) -> List[Dict[str, Any]]:
+    """
+    Convert many (amount, base, target) rows at once.
+    
+    Rows are grouped by base currency so each needed rate table is fetched
+    once (normally just the pivot table), and each distinct target's rate is
+    looked up once per group; the rows are then converted one by one.
+    
+    Args:
+        rows: List of (amount, base_currency, target_currency) tuples
+        
+    Returns:
+        One result dictionary per input row, in input order; failed rows carry an "error" key
+    """
+    groups: Dict[str, List[int]] = {}
+    for index, (_, base_currency, _) in enumerate(rows):
+        groups.setdefault(base_currency.lower(), []).append(index)
+    
+    logger.info(f"Batch converting {len(rows)} rows across {len(groups)} base currencies")
+    
+    tables = await asyncio.gather(
+        *(get_rate_table(base) for base in groups),
+        return_exceptions=True
+    )
+    
+    results: List[Dict[str, Any]] = [None] * len(rows)
+    for (base, indexes), table in zip(groups.items(), tables):
+        if isinstance(table, Exception):
+            for index in indexes:
+                results[index] = _batch_row(rows[index], error=str(table))
+            continue
+        
+        rates: Dict[str, Optional[float]] = {}
+        for index in indexes:
+            amount, _, target_currency = rows[index]
+            target = target_currency.lower()
+            if target not in rates:
+                rates[target] = table.rate(base, target) if target in table else None
+            rate = rates[target]
+            if rate is None:
+                results[index] = _batch_row(rows[index], error=f"العملة {target_currency.upper()} غير متوفرة")
+            else:
+                results[index] = _batch_row(rows[index], result=round(amount * rate, 2), table=table)
+    
+    return results
+
+def _batch_row(row: Tuple[float, str, str], result: Optional[float] = None,
+               error: Optional[str] = None,
+               table: Optional[CrossRateTable] = None) -> Dict[str, Any]:
+    """Build the response entry for one batch row."""
+    amount, base_currency, target_currency = row
+    entry = {
+        "amount": amount,
+        "base_currency": base_currency.upper(),
+        "target_currency": target_currency.upper(),
+    }
+    if error is not None:
+        entry["error"] = error
+    else:
+        entry["result"] = result
+        entry["rate_timestamp"] = table.timestamp()
+        entry["stale"] = table.stale
+    return entry
 
 async def get_popular_currencies() -> List[Dict[str, str]]:
     """
@@ -72,15 +470,4 @@ async def get_popular_currencies() -> List[Dict[str, str]]:
     Returns:
         List of popular currencies with code and name
     """
-    return [
-        {"code": "USD", "name": "دولار أمريكي", "symbol": "$"},
-        {"code": "EUR", "name": "يورو", "symbol": "€"},
-        {"code": "GBP", "name": "جنيه إسترليني", "symbol": "£"},
-        {"code": "EGP", "name": "جنيه مصري", "symbol": "ج.م"},
-        {"code": "SAR", "name": "ريال سعودي", "symbol": "ر.س"},
-        {"code": "AED", "name": "درهم إماراتي", "symbol": "د.إ"},
-        {"code": "KWD", "name": "دينار كويتي", "symbol": "د.ك"},
-        {"code": "JPY", "name": "ين ياباني", "symbol": "¥"},
-        {"code": "CNY", "name": "يوان صيني", "symbol": "¥"},
-        {"code": "CAD", "name": "دولار كندي", "symbol": "C$"}
-    ]
\ No newline at end of file
+    return POPULAR_CURRENCIES
@@ -1,13 +1,21 @@
 """Google Gemini API client module for natural language processing."""
 import asyncio
 import json
-from typing import Dict, Any, Optional
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
+from typing import AsyncIterator, Callable, Dict, Any, List, Optional, Tuple
 
 import google.generativeai as genai
 from loguru import logger
 
 import config
-from app.modules.currency_service import convert_currency
+from app.modules.chat_sessions import SessionStore, history_size, trim_history
+from app.modules.concurrency import AsyncLimiter
+from app.modules.currency_service import get_conversion
+from app.modules.intent_cache import intent_cache
+from app.modules.intent_parser import answer_conversion_intent, fast_path_stats, parse_conversion_intent
+from app.modules.log_writer import debug_sampled
+from app.modules.metrics import GEMINI_CALLS, GEMINI_QUEUE, CallbackMetric, record_stage, registry, timed
 
 # Configure Gemini API
 genai.configure(api_key=config.GEMINI_API_KEY)
@@ -35,6 +43,29 @@ FUNCTION_DECLARATIONS = [
             },
             "required": ["amount", "base_currency", "target_currency"]
         }
+    },
+    {
+        "name": "convert_currency_batch",
+        "description": "تحويل مبلغ واحد من عملة إلى عدة عملات مستهدفة دفعة واحدة باستخدام رموز العملات القياسية ثلاثية الأحرف.",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "amount": {
+                    "type": "number",
+                    "description": "المبلغ المراد تحويله"
+                },
+                "base_currency": {
+                    "type": "string",
+                    "description": "رمز العملة الأصلية (مثل USD, EUR, EGP)"
+                },
+                "target_currencies": {
+                    "type": "array",
+                    "items": {"type": "string"},
+                    "description": "رموز العملات المستهدفة (مثل [\"EUR\", \"EGP\", \"JPY\"])"
+                }
+            },
+            "required": ["amount", "base_currency", "target_currencies"]
+        }
     }
 ]
 
@@ -61,9 +92,106 @@ SYSTEM_INSTRUCTION = """
 3. "حول 100 جنيه إلى دولار أمريكي" → convert_currency(amount=100, base_currency="EGP", target_currency="USD")
 4. "معايا 50 دولار، بيساووا كام بالجنيه؟" → convert_currency(amount=50, base_currency="USD", target_currency="EGP")
 
+إذا طلب المستخدم تحويل المبلغ نفسه إلى أكثر من عملة، استخدم الدالة convert_currency_batch مرة واحدة بدلاً من عدة استدعاءات:
+5. "حول 100 دولار إلى يورو وجنيه وين" → convert_currency_batch(amount=100, base_currency="USD", target_currencies=["EUR", "EGP", "JPY"])
+
 تذكر أن تكون ودودًا ومحترفًا في ردودك، وقدم معلومات مساعدة حول تحويل العملات عند الحاجة.
 """
 
+# The SDK's chat calls are blocking, so they run on a dedicated thread pool.
+# The limiter caps in-flight calls across all request loops and records queue time.
+gemini_limiter = AsyncLimiter(config.GEMINI_MAX_CONCURRENCY, "gemini")
+_gemini_executor = ThreadPoolExecutor(max_workers=config.GEMINI_MAX_CONCURRENCY, thread_name_prefix="gemini")
+
+async def run_gemini_call(func: Callable, *args, stage: str = "gemini", **kwargs) -> Any:
+    """
+    Run a blocking Gemini SDK call without blocking the event loop.
+    
+    The limiter slot is held until the call returns on the pool thread, even
+    if the awaiting request is cancelled first, so abandoned calls still
+    count against ``config.GEMINI_MAX_CONCURRENCY``.
+    
+    Args:
+        func: The SDK callable (e.g., ``ChatSession.send_message``)
+        *args: Positional arguments for the call
+        stage: Name of the call in metrics and Server-Timing (e.g., gemini_chat)
+        **kwargs: Keyword arguments for the call
+        
+    Returns:
+        The call's return value
+    """
+    waited = await gemini_limiter.acquire()
+    _record_queue_wait(stage, waited)
+    call = None
+    try:
+        with timed(stage, GEMINI_CALLS, stage=stage):
+            call = _gemini_executor.submit(partial(func, *args, **kwargs))
+            return await asyncio.wrap_future(call)
+    finally:
+        _release_when_done(call)
+
+def _release_when_done(call: Optional[Future]) -> None:
+    """Free the Gemini slot once a pool call has finished, or now if none was submitted."""
+    if call is None:
+        gemini_limiter.release()
+    else:
+        call.add_done_callback(lambda _: gemini_limiter.release())
+
+def _record_queue_wait(stage: str, waited: float) -> None:
+    """Record how long a Gemini call waited for a limiter slot."""
+    GEMINI_QUEUE.observe(waited, stage=stage)
+    if waited:
+        record_stage("gemini_queue", waited)
+        debug_sampled("Gemini call waited {:.3f}s for a free slot", waited)
+
+async def stream_gemini_call(func: Callable, *args, stage: str = "gemini", **kwargs) -> AsyncIterator[Any]:
+    """
+    Run a blocking, streaming Gemini SDK call and yield its chunks.
+    
+    The limiter slot is held until the stream is exhausted or abandoned,
+    and in the latter case until the pool call in progress has returned.
+    The recorded duration runs from the call to the last chunk.
+    
+    Args:
+        func: The SDK callable, called with ``stream=True`` by the caller
+        *args: Positional arguments for the call
+        stage: Name of the call in metrics and Server-Timing (e.g., gemini_phrase)
+        **kwargs: Keyword arguments for the call
+        
+    Yields:
+        Response chunks as they arrive
+    """
+    waited = await gemini_limiter.acquire()
+    _record_queue_wait(stage, waited)
+    call = None
+    try:
+        with timed(stage, GEMINI_CALLS, stage=stage):
+            call = _gemini_executor.submit(lambda: iter(func(*args, **kwargs)))
+            chunks = await asyncio.wrap_future(call)
+            end = object()
+            while True:
+                call = _gemini_executor.submit(next, chunks, end)
+                chunk = await asyncio.wrap_future(call)
+                if chunk is end:
+                    break
+                yield chunk
+    finally:
+        _release_when_done(call)
+
+# Model shared by all chat sessions
+_gemini_model = None
+
+def get_gemini_model() -> genai.GenerativeModel:
+    """Get or create the Gemini model shared by all chat sessions."""
+    global _gemini_model
+    if _gemini_model is None:
+        _gemini_model = genai.GenerativeModel(
+            model_name=config.GEMINI_MODEL,
+            tools=[{"function_declarations": FUNCTION_DECLARATIONS}],
+            system_instruction=SYSTEM_INSTRUCTION
+        )
+    return _gemini_model
+
 # Create a class to manage Gemini chat sessions
 class GeminiChat:
     """Manages a Gemini chat session for currency conversion."""
@@ -71,17 +199,29 @@ class GeminiChat:
     def __init__(self):
         """Initialize a new Gemini chat session."""
         try:
-            self.model = genai.GenerativeModel(
-                model_name=config.GEMINI_MODEL,
-                tools=[{"function_declarations": FUNCTION_DECLARATIONS}],
-                system_instruction=SYSTEM_INSTRUCTION
-            )
+            self.model = get_gemini_model()
             self.chat = self.model.start_chat()
             logger.info("Gemini chat session initialized")
         except Exception as e:
             logger.error(f"Failed to initialize Gemini chat: {str(e)}")
             raise
     
+    def trim_history(self) -> None:
+        """Drop old turns so each request resends at most ``config.GEMINI_HISTORY_WINDOW`` contents."""
+        try:
+            history = self.chat.history
+        except Exception as e:
+            logger.warning(f"Chat history is unusable, starting over: {str(e)}")
+            self.chat.history = []
+            return
+        trimmed = trim_history(history, config.GEMINI_HISTORY_WINDOW)
+        if trimmed is not history:
+            self.chat.history = trimmed
+    
+    def size(self) -> Dict[str, int]:
+        """Return the number of turns, bytes and approximate tokens held in the history."""
+        return history_size(self.chat.history)
+    
     async def send_message(self, message: str) -> Dict[str, Any]:
         """
         Send a message to the Gemini model and process the response.
@@ -93,29 +233,20 @@ class GeminiChat:
             Dictionary containing the response text and any additional data
         """
         try:
-            logger.debug(f"Sending message to Gemini: {message}")
-            response = self.chat.send_message(message)
+            debug_sampled("Sending message to Gemini: {}", message)
+            response = await run_gemini_call(self.chat.send_message, message, stage="gemini_chat")
             
-            # --- Add detailed logging here ---
-            logger.debug(f"Raw Gemini Response Object: {response}")
-            try:
-                # Log the parts if they exist
-                logger.debug(f"Gemini Response Parts: {response.candidates[0].content.parts}")
-            except (AttributeError, IndexError):
-                logger.debug("Gemini Response has no parts or candidates.")
-            # --- End of added logging ---
-            
-            logger.debug(f"Received response from Gemini")
+            # Rendering the response is costly, so it only happens if a sink keeps DEBUG records
+            logger.opt(lazy=True).debug("Raw Gemini Response Object: {}", lambda: response)
+            logger.opt(lazy=True).debug("Gemini Response Parts: {}", lambda: _response_parts(response))
             
-            # Check for function calls
-            # Use .parts[-1] to check the latest part for a function call
-            latest_part = response.candidates[0].content.parts[-1]
-            if hasattr(latest_part, 'function_call') and latest_part.function_call:
-                 logger.info("Function call detected in the latest part.")
-                 return await self._handle_function_call(latest_part.function_call, message)
-
+            # Check every part for function calls; Gemini may return several in one turn
+            function_calls = _function_calls(response)
+            if function_calls:
+                logger.info(f"{len(function_calls)} function call(s) detected.")
+                return await self._handle_function_calls(function_calls, message)
             
-            # If no function call in the latest part, return the text response
+            # If there is no function call, return the text response
             logger.info("No function call detected. Returning text response.")
             return {"text": response.text, "type": "text"}
             
@@ -124,93 +255,432 @@ class GeminiChat:
             # Also log the exception traceback for more details
             logger.exception("Exception details:") 
             return {"text": "عذراً، حدث خطأ أثناء معالجة طلبك. يرجى المحاولة مرة أخرى.", "type": "error"}
+        finally:
+            self.trim_history()
+    
+    async def stream_message(self, message: str) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Send a message and stream the response as it is produced.
+        
+        Conversion results are emitted as soon as the conversions return, one
+        event each, before Gemini has phrased the reply; the reply text then
+        follows in chunks.
+        
+        Args:
+            message: The user's message
+            
+        Yields:
+            Events of the form {"event": "conversion" | "chunk" | "done" | "error", "data": {...}}
+        """
+        streamed = False
+        completed = False
+        try:
+            debug_sampled("Sending message to Gemini (stream): {}", message)
+            response = await run_gemini_call(self.chat.send_message, message, stage="gemini_chat")
+            
+            function_calls = _function_calls(response)
+            if not function_calls:
+                yield {"event": "chunk", "data": {"text": response.text}}
+                yield {"event": "done", "data": {"type": "text"}}
+                completed = True
+                return
+            
+            requests = _conversion_requests(function_calls)
+            if not requests:
+                yield {"event": "error", "data": {"text": "عذراً، لا يمكنني معالجة هذا النوع من الطلبات."}}
+                completed = True
+                return
+            
+            conversions, errors = await self._run_conversions(requests, message)
+            if conversions:
+                for data in conversions:
+                    yield {"event": "conversion", "data": data}
+                prompt = _result_prompt(conversions, errors, message)
+                response_type = "conversion"
+            else:
+                prompt = _error_prompt(errors[0][1], message)
+                response_type = "error"
+            
+            streamed = True
+            stream = stream_gemini_call(self.chat.send_message, prompt, stream=True, stage="gemini_phrase")
+            try:
+                async for chunk in stream:
+                    text = _chunk_text(chunk)
+                    if text:
+                        yield {"event": "chunk", "data": {"text": text}}
+            finally:
+                # Close the inner stream now, so an abandoned reply frees its Gemini slot
+                await stream.aclose()
+            yield {"event": "done", "data": {"type": response_type}}
+            completed = True
+            
+        except Exception as e:
+            logger.error(f"Error streaming message from Gemini: {str(e)}")
+            logger.exception("Exception details:")
+            yield {"event": "error", "data": {"text": "عذراً، حدث خطأ أثناء معالجة طلبك. يرجى المحاولة مرة أخرى."}}
+        finally:
+            if streamed and not completed:
+                # Drop the half-received reply so the next turn starts from a coherent history
+                try:
+                    self.chat.rewind()
+                except Exception as e:
+                    logger.warning(f"Failed to rewind broken stream: {str(e)}")
+            self.trim_history()
     
-    async def _handle_function_call(self, function_call, original_message: str) -> Dict[str, Any]:
+    async def _run_conversion(self, args: Dict[str, Any]) -> Dict[str, Any]:
         """
-        Handle a function call from Gemini.
+        Validate one set of conversion arguments from Gemini and run the conversion.
         
         Args:
-            function_call: The function call object from Gemini
+            args: Dictionary with amount, base_currency and target_currency
+            
+        Returns:
+            Dictionary with amount, base_currency, target_currency, result,
+            rate_timestamp and stale
+            
+        Raises:
+            ValueError: If parameters are missing or the conversion fails
+        """
+        # Extract parameters
+        amount = float(args.get("amount") or 0)
+        base_currency = (args.get("base_currency") or "").upper()
+        target_currency = (args.get("target_currency") or "").upper()
+        
+        if not amount or not base_currency or not target_currency:
+            raise ValueError(f"Missing required parameters for currency conversion")
+        
+        # Perform the conversion
+        conversion = await get_conversion(amount, base_currency, target_currency)
+        return {
+            "amount": amount,
+            "base_currency": base_currency,
+            "target_currency": target_currency,
+            "result": conversion["result"],
+            "rate_timestamp": conversion["rate_timestamp"],
+            "stale": conversion["stale"]
+        }
+    
+    async def _run_conversions(self, requests: List[Dict[str, Any]],
+                               original_message: str) -> Tuple[List[Dict[str, Any]], List[Tuple[Dict[str, Any], Exception]]]:
+        """
+        Run every requested conversion concurrently.
+        
+        A message that needed exactly one conversion is remembered in the
+        intent cache so it can skip the extraction call next time.
+        
+        Args:
+            requests: Conversion arguments, one dictionary per conversion
             original_message: The original user message
             
         Returns:
-            Dictionary containing the response data
+            Tuple of (successful conversions in request order, [(request, error)] for failures)
         """
-        func_name = function_call.name
-        args = function_call.args
+        outcomes = await asyncio.gather(
+            *(self._run_conversion(request) for request in requests),
+            return_exceptions=True
+        )
         
-        logger.info(f"Function call detected: {func_name} with args {args}")
+        conversions, errors = [], []
+        for request, outcome in zip(requests, outcomes):
+            if isinstance(outcome, Exception):
+                logger.error(f"Error during currency conversion {request}: {str(outcome)}")
+                errors.append((request, outcome))
+            else:
+                conversions.append(outcome)
         
-        if func_name == "convert_currency":
-            try:
-                # Extract parameters
-                amount = float(args.get("amount", 0))
-                base_currency = args.get("base_currency", "").upper()
-                target_currency = args.get("target_currency", "").upper()
-                
-                if not amount or not base_currency or not target_currency:
-                    raise ValueError(f"Missing required parameters for currency conversion")
-                
-                # Perform the conversion
-                result = await convert_currency(amount, base_currency, target_currency)
-                
-                # Format the result for the user
-                result_prompt = f"""
-                نتيجة التحويل هي:
-                {amount} {base_currency} = {result} {target_currency}
-                
-                يرجى الرد على المستخدم باللغة العربية، مع دمج هذه النتيجة بشكل طبيعي.
+        if len(requests) == 1 and conversions:
+            intent_cache.put(original_message, conversions[0])
+        return conversions, errors
+    
+    async def _handle_function_calls(self, function_calls: List[Any], original_message: str) -> Dict[str, Any]:
+        """
+        Handle the function calls from one Gemini response.
+        
+        Args:
+            function_calls: The function call objects from Gemini
+            original_message: The original user message
+            
+        Returns:
+            Dictionary containing the response data; "data" holds the first
+            conversion and "conversions" all of them
+        """
+        requests = _conversion_requests(function_calls)
+        if not requests:
+            return {"text": "عذراً، لا يمكنني معالجة هذا النوع من الطلبات.", "type": "error"}
+        
+        try:
+            conversions, errors = await self._run_conversions(requests, original_message)
+            if not conversions:
+                error_response = await run_gemini_call(
+                    self.chat.send_message, _error_prompt(errors[0][1], original_message), stage="gemini_phrase"
+                )
+                return {"text": error_response.text, "type": "error"}
+            
+            # Format all results for the user in one reply
+            final_response = await run_gemini_call(
+                self.chat.send_message, _result_prompt(conversions, errors, original_message), stage="gemini_phrase"
+            )
+            return {
+                "text": final_response.text,
+                "type": "conversion",
+                "data": conversions[0],
+                "conversions": conversions
+            }
+            
+        except Exception as e:
+            logger.error(f"Error during currency conversion: {str(e)}")
+            error_response = await run_gemini_call(
+                self.chat.send_message, _error_prompt(e, original_message), stage="gemini_phrase"
+            )
+            return {"text": error_response.text, "type": "error"}
+
+def _response_parts(response) -> Any:
+    """Get the parts of a Gemini response for logging."""
+    try:
+        return response.candidates[0].content.parts
+    except (AttributeError, IndexError):
+        return "Gemini Response has no parts or candidates."
+
+def _function_calls(response) -> List[Any]:
+    """Get the function calls from every part of a Gemini response."""
+    return [
+        part.function_call
+        for part in response.candidates[0].content.parts
+        if hasattr(part, "function_call") and part.function_call
+    ]
+
+def _conversion_requests(function_calls: List[Any]) -> List[Dict[str, Any]]:
+    """
+    Expand conversion function calls into one argument dictionary per conversion.
+    
+    Args:
+        function_calls: The function call objects from Gemini
+        
+    Returns:
+        List of dictionaries with amount, base_currency and target_currency
+    """
+    requests = []
+    for function_call in function_calls:
+        args = function_call.args
+        logger.info(f"Function call detected: {function_call.name} with args {args}")
+        if function_call.name == "convert_currency":
+            requests.append({
+                "amount": args.get("amount"),
+                "base_currency": args.get("base_currency"),
+                "target_currency": args.get("target_currency")
+            })
+        elif function_call.name == "convert_currency_batch":
+            for target_currency in args.get("target_currencies") or []:
+                requests.append({
+                    "amount": args.get("amount"),
+                    "base_currency": args.get("base_currency"),
+                    "target_currency": target_currency
+                })
+        else:
+            logger.warning(f"Unknown function call: {function_call.name}")
+    return requests
+
+def _result_prompt(conversions: List[Dict[str, Any]], errors: List[Tuple[Dict[str, Any], Exception]],
+                   original_message: str) -> str:
+    """Build the prompt asking Gemini to phrase one or more conversion results."""
+    results = "\n".join(
+        f"                {data['amount']} {data['base_currency']} = {data['result']} {data['target_currency']}"
+        for data in conversions
+    )
+    failures = ""
+    if errors:
+        failures = "\n                تعذر إجراء التحويلات التالية:\n" + "\n".join(
+            f"                {str(request.get('base_currency') or '').upper()} → {str(request.get('target_currency') or '').upper()}: {str(error)}"
+            for request, error in errors
+        )
+    stale_note = ""
+    stale = next((data for data in conversions if data.get("stale")), None)
+    if stale is not None:
+        stale_note = f"""
+                تنبيه: مصادر أسعار الصرف غير متاحة حالياً، وهذه النتائج مبنية على أسعار بتاريخ {stale["rate_timestamp"]}. اذكر ذلك للمستخدم.
+                """
+    return f"""
+                نتائج التحويل هي:
+{results}{failures}
+                {stale_note}
+                يرجى الرد على المستخدم باللغة العربية في رسالة واحدة، مع دمج كل هذه النتائج بشكل طبيعي.
                 استفسار المستخدم الأصلي: {original_message}
                 """
-                
-                final_response = self.chat.send_message(result_prompt)
-                return {
-                    "text": final_response.text,
-                    "type": "conversion",
-                    "data": {
-                        "amount": amount,
-                        "base_currency": base_currency,
-                        "target_currency": target_currency,
-                        "result": result
-                    }
-                }
-                
-            except Exception as e:
-                logger.error(f"Error during currency conversion: {str(e)}")
-                error_prompt = f"""
-                حدث خطأ أثناء التحويل: {str(e)}
+
+def _error_prompt(error: Exception, original_message: str) -> str:
+    """Build the prompt asking Gemini to explain a failed conversion."""
+    return f"""
+                حدث خطأ أثناء التحويل: {str(error)}
                 يرجى إبلاغ المستخدم باللغة العربية أن هناك مشكلة في تحويل العملة.
                 استفسار المستخدم الأصلي: {original_message}
                 """
-                error_response = self.chat.send_message(error_prompt)
-                return {"text": error_response.text, "type": "error"}
-        else:
-            logger.warning(f"Unknown function call: {func_name}")
-            return {"text": "عذراً، لا يمكنني معالجة هذا النوع من الطلبات.", "type": "error"}
 
-# Create a global chat session
-_gemini_chat = None
+def _chunk_text(chunk) -> str:
+    """Get the text of a streamed chunk, which may carry no text parts."""
+    try:
+        return chunk.text
+    except (ValueError, AttributeError, IndexError):
+        return ""
+
+# Chat sessions keyed by client session id
+chat_sessions = SessionStore(
+    GeminiChat,
+    max_sessions=config.GEMINI_MAX_SESSIONS,
+    idle_timeout=config.GEMINI_SESSION_IDLE_TIMEOUT
+)
+
+async def get_gemini_chat(session_id: str) -> GeminiChat:
+    """Get or create the Gemini chat session for a client."""
+    return chat_sessions.get(session_id)
+
+def _session_values() -> Dict[Tuple[str, ...], float]:
+    stats = chat_sessions.stats(sizer=GeminiChat.size)
+    return {
+        ("live",): stats["live"],
+        ("history_bytes",): stats["total_bytes"],
+        ("history_approx_tokens",): stats["total_approx_tokens"],
+    }
 
-async def get_gemini_chat() -> GeminiChat:
-    """Get or create a Gemini chat session."""
-    global _gemini_chat
-    if _gemini_chat is None:
-        _gemini_chat = GeminiChat()
-    return _gemini_chat
+registry.register(CallbackMetric(
+    "chat_sessions", "Live chat sessions and the total size of their histories.",
+    ["measure"], _session_values, kind="gauge"
+))
+registry.register(CallbackMetric(
+    "chat_sessions_total", "Chat sessions created and evicted.",
+    ["event"], lambda: {("created",): chat_sessions.created, ("evicted",): chat_sessions.evicted}
+))
 
-async def process_user_message(message: str) -> Dict[str, Any]:
+def resolve_local_intent(message: str) -> Optional[Dict[str, Any]]:
+    """
+    Get ``convert_currency`` arguments for a message without calling Gemini.
+    
+    Checks the intent cache first, then the fast-path parser.
+    
+    Args:
+        message: The user's message
+        
+    Returns:
+        Dictionary with amount, base_currency and target_currency, or None
+    """
+    with timed("intent"):
+        intent = intent_cache.get(message)
+        if intent is not None:
+            logger.info(f"Intent cache hit: {intent}")
+            return intent
+        
+        if config.FAST_PATH_ENABLED:
+            intent = parse_conversion_intent(message)
+            fast_path_stats.record(intent is not None)
+            if intent is not None:
+                logger.info(f"Fast path parsed message: {intent}")
+        return intent
+
+async def extract_intent(message: str) -> Optional[Dict[str, Any]]:
+    """
+    Ask Gemini for the ``convert_currency`` arguments of a standalone message.
+    
+    Uses a one-off request rather than a chat session, so no history is involved.
+    
+    Args:
+        message: The message to analyze
+        
+    Returns:
+        Dictionary with amount, base_currency and target_currency, or None
+    """
+    response = await run_gemini_call(get_gemini_model().generate_content, message, stage="gemini_extract")
+    requests = _conversion_requests(_function_calls(response))
+    if len(requests) != 1:
+        return None  # multi-target messages are not cached
+    args = requests[0]
+    return {
+        "amount": float(args["amount"] or 0),
+        "base_currency": (args["base_currency"] or "").upper(),
+        "target_currency": (args["target_currency"] or "").upper()
+    }
+
+async def prewarm_intent_cache(queries: List[str]) -> int:
+    """
+    Fill the intent cache for known queries (e.g., the shortcut buttons).
+    
+    The local parser is tried first; Gemini is only asked when it cannot
+    parse a query and an API key is configured.
+    
+    Args:
+        queries: Messages to pre-warm
+        
+    Returns:
+        Number of queries cached
+    """
+    warmed = 0
+    for query in queries:
+        try:
+            intent = parse_conversion_intent(query)
+            if intent is None and config.GEMINI_API_KEY:
+                intent = await extract_intent(query)
+            if intent and intent["amount"] and intent_cache.put(query, intent):
+                warmed += 1
+            else:
+                logger.warning(f"Could not pre-warm intent for: {query}")
+        except Exception as e:
+            logger.error(f"Failed to pre-warm intent for '{query}': {str(e)}")
+    logger.info(f"Pre-warmed intent cache with {warmed}/{len(queries)} queries")
+    return warmed
+
+async def process_user_message(message: str, session_id: str) -> Dict[str, Any]:
     """
     Process a user message using the Gemini API.
     
+    Messages found in the intent cache, and unambiguous conversion requests
+    understood by the local fast-path parser, are answered without calling Gemini.
+    
     Args:
         message: The user's message
+        session_id: The client session id selecting the conversation history
         
     Returns:
         Dictionary containing the response
     """
     try:
-        chat = await get_gemini_chat()
+        intent = resolve_local_intent(message)
+        if intent is not None:
+            return await answer_conversion_intent(intent)
+        
+        chat = await get_gemini_chat(session_id)
         return await chat.send_message(message)
     except Exception as e:
         logger.error(f"Error processing user message: {str(e)}")
         return {"text": "عذراً، حدث خطأ أثناء معالجة طلبك. يرجى المحاولة مرة أخرى.", "type": "error"}
+
+async def stream_user_message(message: str, session_id: str) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Process a user message and stream the response events.
+    
+    Args:
+        message: The user's message
+        session_id: The client session id selecting the conversation history
+        
+    Yields:
+        Events as produced by ``GeminiChat.stream_message``
+    """
+    intent = resolve_local_intent(message)
+    if intent is not None:
+        response = await answer_conversion_intent(intent)
+        if response["type"] == "conversion":
+            yield {"event": "conversion", "data": response["data"]}
+        yield {"event": "chunk", "data": {"text": response["text"]}}
+        yield {"event": "done", "data": {"type": response["type"]}}
+        return
+    
+    try:
+        chat = await get_gemini_chat(session_id)
+    except Exception as e:
+        logger.error(f"Error processing user message: {str(e)}")
+        yield {"event": "error", "data": {"text": "عذراً، حدث خطأ أثناء معالجة طلبك. يرجى المحاولة مرة أخرى."}}
+        return
+    
+    events = chat.stream_message(message)
+    try:
+        async for event in events:
+            yield event
+    finally:
+        await events.aclose()
@@ -0,0 +1,130 @@
+"""Shared, pooled HTTP client for outbound requests."""
+import asyncio
+import os
+import threading
+from typing import Any, Coroutine, Optional
+
+import aiohttp
+from loguru import logger
+
+import config
+
+
+class HttpClient:
+    """
+    Owns one pooled ``aiohttp.ClientSession`` for the lifetime of the app.
+
+    aiohttp sessions are bound to the event loop that created them, while
+    Flask runs each async view in a throwaway loop. The session therefore
+    lives on a dedicated background loop, and callers on any loop submit
+    their requests to it and await the result.
+    """
+
+    def __init__(self):
+        """Initialize an idle client; call ``start`` to open the pool."""
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._lock = threading.Lock()
+
+    def forget_after_fork(self) -> None:
+        """
+        Drop the state a forked child inherits from its parent.
+
+        Only the forking thread survives a fork, so the child has the
+        parent's session but no loop thread to run it; requests submitted to
+        it would wait forever. The child starts its own pool on first use.
+        """
+        self._loop = self._thread = self._session = None
+        self._lock = threading.Lock()
+
+    @property
+    def started(self) -> bool:
+        """Whether the background loop and session are running."""
+        return self._session is not None
+
+    def start(self) -> None:
+        """Start the background event loop and open the connection pool."""
+        with self._lock:
+            if self._session is not None:
+                return
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=loop.run_forever, name="http-client", daemon=True)
+            thread.start()
+            future = asyncio.run_coroutine_threadsafe(self._open_session(), loop)
+            self._session = future.result()
+            self._loop = loop
+            self._thread = thread
+            logger.info(
+                f"HTTP client started (pool={config.HTTP_POOL_SIZE}, "
+                f"per_host={config.HTTP_POOL_PER_HOST}, dns_ttl={config.HTTP_DNS_CACHE_TTL}s)"
+            )
+
+    async def _open_session(self) -> aiohttp.ClientSession:
+        connector = aiohttp.TCPConnector(
+            limit=config.HTTP_POOL_SIZE,
+            limit_per_host=config.HTTP_POOL_PER_HOST,
+            ttl_dns_cache=config.HTTP_DNS_CACHE_TTL,
+            keepalive_timeout=config.HTTP_KEEPALIVE_TIMEOUT,
+        )
+        return aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=config.HTTP_REQUEST_TIMEOUT),
+        )
+
+    def stop(self) -> None:
+        """Close the connection pool and stop the background loop."""
+        with self._lock:
+            if self._session is None:
+                return
+            loop, thread, session = self._loop, self._thread, self._session
+            self._loop = self._thread = self._session = None
+        try:
+            asyncio.run_coroutine_threadsafe(session.close(), loop).result(timeout=5)
+        except Exception as e:
+            logger.error(f"Failed to close HTTP client session: {str(e)}")
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout=5)
+        loop.close()
+        logger.info("HTTP client stopped")
+
+    async def run(self, coro: Coroutine) -> Any:
+        """
+        Run a coroutine on the client loop and await its result from any loop.
+
+        Args:
+            coro: The coroutine to run
+
+        Returns:
+            The coroutine's result
+        """
+        if self._session is None:
+            self.start()
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, self._loop))
+
+    async def get_json(self, url: str, timeout: Optional[float] = None) -> Any:
+        """
+        Fetch a URL with the shared session and decode its JSON body.
+
+        Args:
+            url: The URL to fetch
+            timeout: Optional total timeout in seconds overriding the default
+
+        Returns:
+            The decoded JSON document
+
+        Raises:
+            aiohttp.ClientError: If the request fails or returns an error status
+        """
+        return await self.run(self._get_json(url, timeout))
+
+    async def _get_json(self, url: str, timeout: Optional[float]) -> Any:
+        kwargs = {"timeout": aiohttp.ClientTimeout(total=timeout)} if timeout else {}
+        async with self._session.get(url, **kwargs) as resp:
+            resp.raise_for_status()
+            return await resp.json()
+
+
+# Process-wide client shared by all outbound rate fetches
+http_client = HttpClient()
+os.register_at_fork(after_in_child=http_client.forget_after_fork)
@@ -0,0 +1,121 @@
+"""Cache of extracted conversion intents keyed by normalized chat message."""
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+import config
+from app.modules.intent_parser import extract_amount
+from app.modules.metrics import CallbackMetric, registry
+from app.modules.utils import find_currency_mentions, fold_alef, normalize_text
+
+
+def _message_amount(message: str) -> Optional[float]:
+    """The single amount written in a message, or None."""
+    parsed = extract_amount(fold_alef(message))
+    return parsed[0] if parsed is not None else None
+
+
+class IntentCache:
+    """
+    Bounded LRU map from normalized message text to ``convert_currency`` arguments.
+
+    Only self-contained messages are cached: the amount must be written in
+    the message and it must name exactly two currencies, so a follow-up such
+    as "وباليورو؟" (which depends on the conversation) is never reused for
+    another user, and a multi-target message is never reduced to one pair.
+    """
+
+    def __init__(self, max_size: int):
+        """
+        Initialize the cache.
+
+        Args:
+            max_size: Maximum number of cached messages
+        """
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, message: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up the arguments previously extracted for a message.
+
+        The amount is read from the message again, and an entry whose amount
+        differs is treated as a miss.
+
+        Args:
+            message: The user's message
+
+        Returns:
+            Dictionary with amount, base_currency and target_currency, or None
+        """
+        key = normalize_text(message)
+        with self._lock:
+            intent = self._entries.get(key)
+            if intent is None or _message_amount(message) != intent["amount"]:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return dict(intent)
+
+    def put(self, message: str, intent: Dict[str, Any]) -> bool:
+        """
+        Remember the arguments extracted for a message.
+
+        Args:
+            message: The user's message
+            intent: Dictionary with amount, base_currency and target_currency
+
+        Returns:
+            True if the message was self-contained and got cached
+        """
+        if not self._is_self_contained(message, intent["amount"]):
+            return False
+        key = normalize_text(message)
+        entry = {
+            "amount": intent["amount"],
+            "base_currency": intent["base_currency"],
+            "target_currency": intent["target_currency"],
+        }
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return True
+
+    @staticmethod
+    def _is_self_contained(message: str, amount: float) -> bool:
+        if _message_amount(message) != amount:
+            return False
+        # Exactly two currencies: multi-target messages expand to several conversions
+        return len({code for _, _, code in find_currency_mentions(fold_alef(message))}) == 2
+
+    def stats(self) -> Dict[str, float]:
+        """Return size, hit/miss counters and hit rate."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+intent_cache = IntentCache(max_size=config.INTENT_CACHE_MAX_SIZE)
+
+registry.register(CallbackMetric(
+    "intent_cache_lookups_total",
+    "Intent cache lookups by result.",
+    ["result"],
+    lambda: {("hit",): intent_cache.hits, ("miss",): intent_cache.misses}
+))
+registry.register(CallbackMetric(
+    "intent_cache_entries", "Conversion intents held in the intent cache.",
+    [], lambda: {(): intent_cache.stats()["size"]}, kind="gauge"
+))
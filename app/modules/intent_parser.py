@@ -0,0 +1,323 @@
+"""Local fast-path parser for unambiguous conversion requests."""
+import re
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+from app.modules.currency_service import get_conversion
+from app.modules.metrics import CallbackMetric, registry
+from app.modules.utils import ARABIC_DIGITS, ARABIC_PREFIXES, ARABIC_SUFFIXES, find_currency_mentions, fold_alef, format_currency
+
+# Number words in Arabic (MSA and Egyptian spellings) and English, alef-normalized
+NUMBER_WORDS = {
+    "واحد": 1, "واحدة": 1, "one": 1,
+    "اثنين": 2, "اثنان": 2, "اتنين": 2, "two": 2,
+    "ثلاث": 3, "ثلاثة": 3, "تلاتة": 3, "three": 3,
+    "اربع": 4, "اربعة": 4, "four": 4,
+    "خمس": 5, "خمسة": 5, "five": 5,
+    "ست": 6, "ستة": 6, "six": 6,
+    "سبع": 7, "سبعة": 7, "seven": 7,
+    "ثمان": 8, "ثمانية": 8, "تمانية": 8, "eight": 8,
+    "تسع": 9, "تسعة": 9, "nine": 9,
+    "عشر": 10, "عشرة": 10, "ten": 10,
+    "عشرين": 20, "twenty": 20,
+    "ثلاثين": 30, "تلاتين": 30, "thirty": 30,
+    "اربعين": 40, "forty": 40,
+    "خمسين": 50, "fifty": 50,
+    "ستين": 60, "sixty": 60,
+    "سبعين": 70, "seventy": 70,
+    "ثمانين": 80, "تمانين": 80, "eighty": 80,
+    "تسعين": 90, "ninety": 90,
+    "مائة": 100, "مئة": 100, "مية": 100, "ميه": 100, "hundred": 100,
+    "مائتين": 200, "مئتين": 200, "ميتين": 200,
+    "الف": 1000, "الاف": 1000, "thousand": 1000,
+    "الفين": 2000,
+    "مليون": 1000000, "ملايين": 1000000, "million": 1000000,
+}
+
+# Words that scale the preceding quantity instead of adding to it
+MULTIPLIERS = {100, 1000, 1000000}
+SCALE_WORDS = {"مائة", "مئة", "مية", "ميه", "hundred", "الف", "الاف", "thousand",
+               "مليون", "ملايين", "million"}
+
+# Words ending like a nationality adjective that do not qualify a currency
+NON_QUALIFIERS = {"يساوي", "بيساوي", "تساوي", "بتساوي", "في", "الي", "اي"}
+
+# Words that may sit between the two currencies ("100 دولار كام بالجنيه", "100 dollars to euros")
+CONNECTORS = {
+    "الى", "الي", "ل", "لل", "ب", "في", "مقابل", "كم", "كام", "بكم", "بكام",
+    "يساوي", "يساووا", "بيساوي", "بيساووا", "تساوي", "بتساوي", "يعني",
+    "to", "in", "into", "is", "are", "worth", "equals", "equal", "how", "much", "many", "as", "for",
+}
+
+# Courtesy words allowed after the last currency; anything else may name another currency
+TRAILING_WORDS = {"من", "فضلك", "لو", "سمحت", "please"}
+
+_TOKEN_PATTERN = re.compile(r"(?P<num>\d+(?:[.,٫٬]\d+)*)|(?P<word>[^\W\d_]+)")
+_GROUPED_NUMBER = re.compile(r"^\d{1,3}(?:,\d{3})+(?:\.\d+)?$")
+_NEXT_WORD = re.compile(r"\s*([^\W\d_]+)")
+_PREVIOUS_WORD = re.compile(r"([^\W\d_]+)\s*$")
+
+
+class FastPathStats:
+    """Counts how many chat messages the local parser answered without Gemini."""
+
+    def __init__(self):
+        """Initialize zeroed counters."""
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def record(self, hit: bool) -> None:
+        """Record whether a message was answered by the fast path."""
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def stats(self) -> Dict[str, float]:
+        """Return the hit/miss counters and the fast-path hit ratio."""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / total if total else 0.0,
+            }
+
+
+fast_path_stats = FastPathStats()
+registry.register(CallbackMetric(
+    "fast_path_messages_total",
+    "Chat messages by whether the local parser answered them (hit) or they went to Gemini (miss).",
+    ["result"],
+    lambda: {("hit",): fast_path_stats.hits, ("miss",): fast_path_stats.misses}
+))
+
+
+def _parse_digits(token: str) -> Optional[float]:
+    """Parse a digit token, rejecting separators whose meaning is ambiguous."""
+    token = token.translate(ARABIC_DIGITS).replace("٬", ",").replace("٫", ".")
+    if "," in token:
+        if not _GROUPED_NUMBER.match(token):
+            return None
+        token = token.replace(",", "")
+    try:
+        return float(token)
+    except ValueError:
+        return None
+
+
+def _number_word(word: str) -> Optional[str]:
+    """Return the number word for a token, stripping a leading "و" (and)."""
+    if word in NUMBER_WORDS:
+        return word
+    if word.startswith("و") and word[1:] in NUMBER_WORDS:
+        return word[1:]
+    return None
+
+
+def _combine(values: List[Tuple[float, bool]]) -> float:
+    """Combine a run of (value, is_scale_word) numbers, e.g. "ثلاث مية وخمسين" → 350."""
+    total = 0.0
+    current = 0.0
+    for value, is_scale in values:
+        if is_scale and value in MULTIPLIERS:
+            current = (current or 1) * value
+            if value >= 1000:
+                total += current
+                current = 0.0
+        else:
+            current += value
+    return total + current
+
+
+def extract_amount(text: str) -> Optional[Tuple[float, int]]:
+    """
+    Extract the single amount mentioned in a text.
+
+    Handles ASCII and Arabic-Indic digits, thousands separators, and number
+    words (e.g., "مية", "خمسة آلاف", "100 ألف").
+
+    Args:
+        text: Alef-normalized, lowercase text
+
+    Returns:
+        Tuple of (amount, end position of the amount), or None if there is no
+        amount or more than one
+    """
+    runs = []
+    current_run: List[Tuple[float, bool]] = []
+    run_end = 0
+    for match in _TOKEN_PATTERN.finditer(text):
+        if match.group("num"):
+            value = _parse_digits(match.group("num"))
+            if value is None:
+                return None
+            current_run.append((value, False))
+            run_end = match.end()
+            continue
+        word = match.group("word")
+        number_word = _number_word(word)
+        if number_word is not None:
+            current_run.append((NUMBER_WORDS[number_word], number_word in SCALE_WORDS))
+            run_end = match.end()
+        elif word in ("و", "and") and current_run:
+            continue
+        elif current_run:
+            runs.append((current_run, run_end))
+            current_run = []
+    if current_run:
+        runs.append((current_run, run_end))
+
+    if len(runs) != 1:
+        return None
+    values, end = runs[0]
+    amount = _combine(values)
+    return (amount, end) if amount > 0 else None
+
+
+def _is_qualified(text: str, mention: Tuple[int, int, str]) -> bool:
+    """
+    Check whether a currency term carries a qualifier the mapping does not know.
+
+    "دولار كندي" or "canadian dollar" would otherwise be read as plain USD, so
+    an adjacent nationality-style adjective sends the message to Gemini.
+    """
+    following = _NEXT_WORD.match(text, mention[1])
+    if following:
+        word = following.group(1)
+        if word.endswith(("ي", "ية")) and word not in NON_QUALIFIERS:
+            return True
+    preceding = _PREVIOUS_WORD.search(text, 0, mention[0])
+    if preceding:
+        word = preceding.group(1)
+        if word.isascii() and word.endswith(("an", "ese", "ish", "ian")):
+            return True
+    return False
+
+
+def _has_unknown_words(text: str, start: int, end: int, allowed: set, before_mention: bool = False) -> bool:
+    """
+    Check a stretch of text for words the fast path does not understand.
+
+    Numbers are skipped (the amount was already validated). The stretch
+    starts right after a currency term, so a plural or dual ending attached
+    to it (the "ات" of "دولارات") is skipped; when the stretch runs up to a
+    currency term, a clitic attached to it (the "بال" of "بالدولار") is
+    skipped too.
+
+    Args:
+        text: Alef-normalized, lowercase text
+        start: Start of the stretch, the end of a currency term
+        end: End of the stretch
+        allowed: Words that may appear in it
+        before_mention: Whether a currency term starts at ``end``
+
+    Returns:
+        True if the stretch holds any other word
+    """
+    for match in _TOKEN_PATTERN.finditer(text, start, end):
+        word = match.group("word")
+        if word is None or _number_word(word) is not None:
+            continue
+        if match.start() == start and word in ARABIC_SUFFIXES:
+            continue
+        if before_mention and match.end() == end and word in ARABIC_PREFIXES:
+            continue
+        if word not in allowed:
+            return True
+    return False
+
+
+def parse_conversion_intent(message: str) -> Optional[Dict[str, Any]]:
+    """
+    Parse a chat message into ``convert_currency`` arguments without the LLM.
+
+    Only unambiguous messages are accepted: exactly one amount, exactly two
+    distinct currencies, the base currency written right after the amount
+    (e.g., "حول 100 دولار إلى يورو", "كم يساوي 50 يورو بالدولار"), and
+    nothing between or after the currencies that could name a currency the
+    mapping does not know ("دولار هونج كونج", "إلى يورو والريال").
+
+    Args:
+        message: The user's message
+
+    Returns:
+        Dictionary with amount, base_currency and target_currency, or None
+        if the message should go to Gemini
+    """
+    text = fold_alef(message)
+    amount = extract_amount(text)
+    if amount is None:
+        return None
+    value, amount_end = amount
+
+    mentions = find_currency_mentions(text)
+    if len(mentions) != 2 or mentions[0][2] == mentions[1][2]:
+        return None
+    if any(_is_qualified(text, mention) for mention in mentions):
+        return None
+
+    # The base currency must follow the amount directly ("100 دولار")
+    base = next((m for m in mentions if m[0] >= amount_end and not text[amount_end:m[0]].strip()), None)
+    if base is None:
+        return None
+    target = mentions[1] if base is mentions[0] else mentions[0]
+
+    first, last = mentions
+    if _has_unknown_words(text, first[1], last[0], CONNECTORS, before_mention=True):
+        return None
+    if _has_unknown_words(text, last[1], len(text), TRAILING_WORDS):
+        return None
+
+    return {"amount": value, "base_currency": base[2], "target_currency": target[2]}
+
+
+def format_conversion_reply(amount: float, base_currency: str, target_currency: str, result: float,
+                            rate_timestamp: Optional[str] = None, stale: bool = False) -> str:
+    """Build the templated Arabic reply for a conversion result."""
+    if stale and rate_timestamp:
+        source = f"حسب آخر أسعار صرف متاحة (بتاريخ {rate_timestamp[:10]})"
+    else:
+        source = "حسب أحدث أسعار الصرف"
+    return (
+        f"{format_currency(amount, base_currency)} تساوي "
+        f"{format_currency(result, target_currency)} {source}."
+    )
+
+
+async def answer_conversion_intent(intent: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Run a parsed conversion and build the chat response without Gemini.
+
+    Args:
+        intent: Dictionary with amount, base_currency and target_currency
+
+    Returns:
+        Dictionary in the same shape as ``GeminiChat.send_message`` responses
+    """
+    amount = intent["amount"]
+    base_currency = intent["base_currency"]
+    target_currency = intent["target_currency"]
+    try:
+        conversion = await get_conversion(amount, base_currency, target_currency)
+    except Exception as e:
+        logger.error(f"Fast-path conversion failed: {str(e)}")
+        return {"text": f"عذراً، تعذر تحويل العملة حالياً: {str(e)}", "type": "error"}
+
+    return {
+        "text": format_conversion_reply(amount, base_currency, target_currency, conversion["result"],
+                                        conversion["rate_timestamp"], conversion["stale"]),
+        "type": "conversion",
+        "data": {
+            "amount": amount,
+            "base_currency": base_currency,
+            "target_currency": target_currency,
+            "result": conversion["result"],
+            "rate_timestamp": conversion["rate_timestamp"],
+            "stale": conversion["stale"]
+        }
+    }
@@ -0,0 +1,134 @@
+"""Background log writer that keeps formatting and I/O off request threads."""
+import copy
+import os
+import queue
+import sys
+import threading
+import weakref
+from functools import partial
+from typing import Any, Dict, Optional, Tuple
+
+from loguru import logger
+
+import config
+
+
+def _restore(original: Dict[str, Any], record: Dict[str, Any]) -> None:
+    """Replace a re-emitted record with the one captured on the request thread."""
+    record.update(original)
+
+
+class BackgroundLogWriter:
+    """
+    A Loguru sink that only puts records on an in-process queue.
+
+    A daemon thread takes them off and re-emits each one through a private
+    copy of the logger that owns the real sinks (files, console), so
+    serialization, rotation and writes all happen on that thread. The
+    re-emitted record keeps the original time, level, location and extras.
+
+    Loguru's own ``enqueue=True`` pickles every record through a
+    multiprocessing pipe on the calling thread, which costs more than
+    writing the file directly; this sink only costs a queue put.
+    When the queue is full records are dropped and counted rather than
+    blocking the request.
+    """
+
+    def __init__(self, max_queue: int):
+        """
+        Initialize the writer and start its thread.
+
+        Call this after ``logger.remove()`` so the private copy starts without sinks.
+
+        Args:
+            max_queue: Maximum number of records waiting to be written
+        """
+        self._writer = copy.deepcopy(logger)
+        self._writer.remove()
+        self._max_queue = max_queue
+        self.dropped = 0
+        self._start()
+        _writers.add(self)
+
+    def _start(self) -> None:
+        self._queue: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue(maxsize=self._max_queue)
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+
+    def add(self, sink, **kwargs) -> int:
+        """
+        Add a real sink, written from the background thread.
+
+        Args:
+            sink: Any Loguru sink (path, stream, callable)
+            **kwargs: Loguru ``add`` options (level, format, serialize, rotation, ...)
+
+        Returns:
+            The handler id
+        """
+        return self._writer.add(sink, **kwargs)
+
+    def __call__(self, message) -> None:
+        """Queue a record; used as the Loguru sink on the request side."""
+        try:
+            self._queue.put_nowait(message.record)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self) -> None:
+        while True:
+            record = self._queue.get()
+            if record is None:
+                break
+            try:
+                self._writer.patch(partial(_restore, record)).log(record["level"].name, record["message"])
+            except Exception as e:
+                sys.stderr.write(f"Failed to write log record: {str(e)}\n")
+
+    def stop(self) -> None:
+        """Write the records still queued, then close the real sinks."""
+        _writers.discard(self)
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join(timeout=5)
+        self._writer.remove()
+
+
+# Live writers, restarted in forked children, which inherit them without their thread
+_writers: "weakref.WeakSet[BackgroundLogWriter]" = weakref.WeakSet()
+
+
+def _restart_writers_after_fork() -> None:
+    for writer in list(_writers):
+        if not writer._thread.is_alive():
+            writer._start()
+
+
+os.register_at_fork(after_in_child=_restart_writers_after_fork)
+
+
+_sample_counts: Dict[Tuple[str, int], int] = {}
+
+
+def debug_sampled(message: str, *args: Any, **kwargs: Any) -> None:
+    """
+    Log at DEBUG, keeping one call in ``config.LOG_DEBUG_SAMPLE_EVERY`` per call site.
+
+    The skipped calls return before Loguru builds a record or formats the
+    message, so high-volume debug lines on the request path cost a counter
+    increment. Use it like ``logger.debug`` with ``{}`` placeholders.
+
+    Args:
+        message: The message, formatted with ``args`` and ``kwargs`` when kept
+        *args: Positional formatting arguments
+        **kwargs: Keyword formatting arguments
+    """
+    every = config.LOG_DEBUG_SAMPLE_EVERY
+    if every > 1:
+        caller = sys._getframe(1)
+        site = (caller.f_code.co_filename, caller.f_lineno)
+        seen = _sample_counts.get(site, 0)
+        _sample_counts[site] = seen + 1
+        if seen % every:
+            return
+    logger.opt(depth=1).debug(message, *args, **kwargs)
@@ -0,0 +1,283 @@
+"""Prometheus metrics and per-request Server-Timing instrumentation."""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+LabelValues = Tuple[str, ...]
+
+# Latency buckets (seconds) shared by all histograms
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    """A monotonically increasing value per label set."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        """
+        Initialize the counter.
+
+        Args:
+            name: Metric name
+            documentation: HELP text
+            labelnames: Names of the labels
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[LabelValues, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        """Increase the value for a label set."""
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self) -> List[str]:
+        """Return the exposition lines for this metric's samples."""
+        with self._lock:
+            values = dict(self._values)
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {value}" for key, value in values.items()]
+
+
+class CallbackMetric:
+    """A counter or gauge whose values are read from a callback at scrape time."""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str],
+                 callback: Callable[[], Dict[LabelValues, float]], kind: str = "counter"):
+        """
+        Initialize the metric.
+
+        Args:
+            name: Metric name
+            documentation: HELP text
+            labelnames: Names of the labels
+            callback: Returns the current value per label-value tuple
+            kind: "counter" or "gauge"
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.callback = callback
+        self.kind = kind
+
+    def samples(self) -> List[str]:
+        """Return the exposition lines for this metric's samples."""
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {value}"
+            for key, value in self.callback().items()
+        ]
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram per label set."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        """
+        Initialize the histogram.
+
+        Args:
+            name: Metric name
+            documentation: HELP text
+            labelnames: Names of the labels
+            buckets: Upper bounds of the buckets in seconds
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[LabelValues, List[float]] = {}  # bucket counts..., +Inf count, sum
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str) -> None:
+        """Record one observation for a label set."""
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0.0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    def samples(self) -> List[str]:
+        """Return the exposition lines for this metric's samples."""
+        with self._lock:
+            series = {key: list(values) for key, values in self._series.items()}
+        lines = []
+        for key, values in series.items():
+            cumulative = 0.0
+            for bound, count in zip(self.buckets + (float("inf"),), values):
+                cumulative += count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {values[-1]}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Holds the process's metrics and renders them in Prometheus text format.
+
+    Each worker process keeps its own registry; scrape every worker (or put
+    them behind a per-worker address) to see the whole deployment.
+    """
+
+    def __init__(self):
+        """Initialize an empty registry."""
+        self._metrics: List = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        """Add a metric and return it."""
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        """Create and register a counter."""
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Histogram:
+        """Create and register a histogram."""
+        return self.register(Histogram(name, documentation, labelnames))
+
+    def render(self) -> str:
+        """Render every metric in the Prometheus text exposition format."""
+        with self._lock:
+            metrics = list(self._metrics)
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+# Process-wide registry and the application's metrics
+registry = MetricsRegistry()
+
+HTTP_REQUESTS = registry.counter(
+    "http_requests_total", "HTTP requests by route, method and status.", ["route", "method", "status"]
+)
+HTTP_DURATION = registry.histogram(
+    "http_request_duration_seconds", "Time to produce the response headers, by route.", ["route"]
+)
+GEMINI_CALLS = registry.histogram(
+    "gemini_call_duration_seconds", "Gemini API calls by stage and outcome (excluding queue time).", ["stage", "outcome"]
+)
+GEMINI_QUEUE = registry.histogram(
+    "gemini_queue_wait_seconds", "Time spent waiting for a free Gemini concurrency slot.", ["stage"]
+)
+RATE_FETCHES = registry.histogram(
+    "rate_mirror_fetch_duration_seconds", "Rate mirror fetch attempts by mirror and outcome.", ["mirror", "outcome"]
+)
+RATE_WINS = registry.counter(
+    "rate_mirror_served_total", "Rate tables served, by the mirror that answered first.", ["mirror"]
+)
+ADMISSION_REJECTED = registry.counter(
+    "admission_rejected_total", "Requests turned away by admission control, by lane and reason.", ["lane", "reason"]
+)
+ADMISSION_WAIT = registry.histogram(
+    "admission_queue_wait_seconds", "Time admitted requests waited for a slot in their lane.", ["lane"]
+)
+RATE_LOOKUPS = registry.counter(
+    "rate_table_lookups_total", "Rate table lookups by source (shared segment or the worker's own cache).", ["source"]
+)
+
+# Server-Timing stages of the current request; None outside a timed request
+_request_stages: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar("request_stages", default=None)
+
+
+def start_request_timing() -> List[Tuple[str, float]]:
+    """
+    Start collecting Server-Timing stages for the current request.
+
+    Returns:
+        The list that stages of this request are appended to
+    """
+    stages: List[Tuple[str, float]] = []
+    _request_stages.set(stages)
+    return stages
+
+
+def record_stage(name: str, seconds: float) -> None:
+    """Add a stage duration to the current request's Server-Timing, if any."""
+    stages = _request_stages.get()
+    if stages is not None:
+        stages.append((name, seconds))
+
+
+@contextmanager
+def timed(name: str, histogram: Optional[Histogram] = None, **labels: str) -> Iterator[None]:
+    """
+    Time a block as a Server-Timing stage and optionally a histogram observation.
+
+    The histogram gets an ``outcome`` label of "ok" or "error" when it has one.
+
+    Args:
+        name: Server-Timing stage name
+        histogram: Optional histogram to observe the duration in
+        **labels: Histogram labels other than ``outcome``
+    """
+    started = time.perf_counter()
+    outcome = "ok"
+    try:
+        yield
+    except BaseException:
+        outcome = "error"
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        record_stage(name, elapsed)
+        if histogram is not None:
+            if "outcome" in histogram.labelnames:
+                labels["outcome"] = outcome
+            histogram.observe(elapsed, **labels)
+
+
+def server_timing_header(stages: List[Tuple[str, float]], total: Optional[float] = None) -> str:
+    """
+    Build a Server-Timing header value, summing repeated stages.
+
+    Args:
+        stages: (stage name, seconds) pairs in the order they were recorded
+        total: Optional total request time in seconds
+
+    Returns:
+        The header value (e.g., "gemini_chat;dur=812.4, rates;dur=0.2, total;dur=815.1")
+    """
+    durations: Dict[str, float] = {}
+    counts: Dict[str, int] = {}
+    for name, seconds in list(stages):
+        durations[name] = durations.get(name, 0.0) + seconds
+        counts[name] = counts.get(name, 0) + 1
+    entries = []
+    for name, seconds in durations.items():
+        entry = f"{name};dur={seconds * 1000:.1f}"
+        if counts[name] > 1:
+            entry += f';desc="{counts[name]} calls"'
+        entries.append(entry)
+    if total is not None:
+        entries.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(entries)
@@ -0,0 +1,279 @@
+"""In-process cache for exchange-rate tables."""
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from loguru import logger
+
+import config
+from app.modules.log_writer import debug_sampled
+from app.modules.metrics import CallbackMetric, registry
+
+# Cached value for one base currency (a CrossRateTable in the currency service)
+RateTable = Any
+
+
+class FetchCancelled(Exception):
+    """The caller leading a shared fetch was cancelled before it finished."""
+
+
+class RateCache:
+    """
+    TTL + LRU cache of rate tables keyed by base currency.
+
+    Concurrent misses for the same base share a single fetch (single-flight).
+    Flask runs every async view in its own event loop, so in-flight fetches are
+    tracked with thread-safe ``concurrent.futures.Future`` objects that any
+    loop can await.
+
+    Expired tables are kept for a further ``stale_ttl`` seconds. Within that
+    window ``get_or_fetch`` can serve them immediately and ask for a background
+    refresh instead of making the caller wait on upstream
+    (stale-while-revalidate).
+    """
+
+    def __init__(self, ttl: float, max_size: int,
+                 ttl_for: Optional[Callable[[RateTable], float]] = None,
+                 stale_ttl: float = 0):
+        """
+        Initialize the cache.
+
+        Args:
+            ttl: Default time-to-live of an entry in seconds
+            max_size: Maximum number of base currencies kept in memory
+            ttl_for: Optional callable giving the time-to-live of a specific table
+            stale_ttl: Seconds an expired table may still be served while it is refreshed
+        """
+        self.ttl = ttl
+        self.max_size = max_size
+        self.ttl_for = ttl_for
+        self.stale_ttl = stale_ttl
+        self._entries: "OrderedDict[str, Tuple[float, RateTable]]" = OrderedDict()  # base -> (expires_at, table)
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.shared_fetches = 0
+        self.evictions = 0
+
+    def get(self, base: str) -> Optional[RateTable]:
+        """
+        Return the cached table for a base currency if it is still fresh.
+
+        Args:
+            base: Lowercase base currency code
+
+        Returns:
+            The rate table, or None if missing or expired
+        """
+        with self._lock:
+            table, fresh = self._lookup_locked(base)
+            return table if fresh else None
+
+    def peek(self, base: str) -> Optional[RateTable]:
+        """
+        Return the cached table for a base, even if expired, without touching LRU order or counters.
+
+        Args:
+            base: Lowercase base currency code
+
+        Returns:
+            The rate table, or None if missing or past its stale window
+        """
+        with self._lock:
+            entry = self._entries.get(base)
+            if entry is None or time.monotonic() > entry[0] + self.stale_ttl:
+                return None
+            return entry[1]
+
+    def expires_in(self, base: str) -> Optional[float]:
+        """
+        Get the seconds left before a cached table expires.
+
+        Args:
+            base: Lowercase base currency code
+
+        Returns:
+            Seconds until expiry (negative once expired), or None if not cached
+        """
+        with self._lock:
+            entry = self._entries.get(base)
+            return entry[0] - time.monotonic() if entry is not None else None
+
+    def _lookup_locked(self, base: str) -> Tuple[Optional[RateTable], bool]:
+        entry = self._entries.get(base)
+        if entry is None:
+            return None, False
+        expires_at, table = entry
+        now = time.monotonic()
+        if now > expires_at + self.stale_ttl:
+            del self._entries[base]
+            return None, False
+        self._entries.move_to_end(base)
+        return table, now <= expires_at
+
+    def set(self, base: str, table: RateTable) -> None:
+        """
+        Store a rate table, evicting the least recently used entries.
+
+        Args:
+            base: Lowercase base currency code
+            table: The table to cache
+        """
+        ttl = self.ttl_for(table) if self.ttl_for else self.ttl
+        with self._lock:
+            self._entries[base] = (time.monotonic() + ttl, table)
+            self._entries.move_to_end(base)
+            while len(self._entries) > self.max_size:
+                evicted, _ = self._entries.popitem(last=False)
+                self.evictions += 1
+                logger.debug("Evicted rate table for '{}' from cache", evicted)
+
+    async def get_or_fetch(self, base: str, fetch: Callable[[str], Awaitable[RateTable]],
+                           on_stale: Optional[Callable[[str], None]] = None) -> RateTable:
+        """
+        Return the table for a base currency, fetching it on a miss.
+
+        Args:
+            base: Lowercase base currency code
+            fetch: Coroutine function that downloads the table for a base
+            on_stale: Optional callback that schedules a background refresh;
+                when given, an expired table within the stale window is
+                returned immediately and the callback is invoked with the base
+
+        Returns:
+            The rate table
+        """
+        with self._lock:
+            table, fresh = self._lookup_locked(base)
+            if table is not None and fresh:
+                self.hits += 1
+                return table
+            serve_stale = table is not None and on_stale is not None
+            if serve_stale:
+                self.stale_hits += 1
+            else:
+                self.misses += 1
+
+        if serve_stale:
+            on_stale(base)
+            return table
+        return await self.refresh(base, fetch)
+
+    async def refresh(self, base: str, fetch: Callable[[str], Awaitable[RateTable]]) -> RateTable:
+        """
+        Fetch and store the table for a base, sharing any fetch already in flight.
+
+        Cancelling one caller never fails the others: the shared future is
+        marked running so a cancelled follower cannot cancel it, and if the
+        leader is cancelled the followers start over and one of them leads.
+
+        Args:
+            base: Lowercase base currency code
+            fetch: Coroutine function that downloads the table for a base
+
+        Returns:
+            The new rate table
+        """
+        with self._lock:
+            future = self._inflight.get(base)
+            leader = future is None
+            if leader:
+                future = Future()
+                future.set_running_or_notify_cancel()  # waiters can no longer cancel it
+                self._inflight[base] = future
+            else:
+                self.shared_fetches += 1
+
+        if not leader:
+            debug_sampled("Waiting for in-flight fetch of '{}' rate table", base)
+            try:
+                return await asyncio.wrap_future(future)
+            except FetchCancelled:
+                return await self.refresh(base, fetch)
+
+        try:
+            table = await fetch(base)
+        except BaseException as e:
+            with self._lock:
+                self._inflight.pop(base, None)
+            if isinstance(e, asyncio.CancelledError):
+                future.set_exception(FetchCancelled(f"Fetch of '{base}' rate table was cancelled"))
+            else:
+                future.set_exception(e)
+            raise
+        self.set(base, table)
+        with self._lock:
+            self._inflight.pop(base, None)
+        future.set_result(table)
+        return table
+
+    def clear(self) -> None:
+        """Drop all cached tables and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.stale_hits = self.misses = self.shared_fetches = self.evictions = 0
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Get cache statistics.
+
+        Returns:
+            Dictionary with size, hit/miss counters and hit rate
+        """
+        with self._lock:
+            lookups = self.hits + self.stale_hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl": self.ttl,
+                "stale_ttl": self.stale_ttl,
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "shared_fetches": self.shared_fetches,
+                "evictions": self.evictions,
+                "hit_rate": (self.hits + self.stale_hits) / lookups if lookups else 0.0,
+            }
+
+
+def table_ttl(table: RateTable) -> float:
+    """
+    Get how long a rate table may stay in the cache.
+
+    Fresh tables live until they are ``config.RATE_CACHE_TTL`` old, so a
+    table loaded from an on-disk snapshot keeps its original age. Stale
+    tables are kept for ``config.RATE_STALE_RETRY`` seconds before upstream
+    is retried.
+    """
+    if table.stale:
+        return config.RATE_STALE_RETRY
+    return max(0.0, config.RATE_CACHE_TTL - table.age())
+
+
+# Process-wide cache used by the currency service
+rate_cache = RateCache(
+    ttl=config.RATE_CACHE_TTL,
+    max_size=config.RATE_CACHE_MAX_SIZE,
+    ttl_for=table_ttl,
+    stale_ttl=config.RATE_CACHE_STALE_TTL
+)
+
+registry.register(CallbackMetric(
+    "rate_cache_lookups_total",
+    "Rate cache lookups by result (hit, stale hit served while refreshing, miss).",
+    ["result"],
+    lambda: {("hit",): rate_cache.hits, ("stale",): rate_cache.stale_hits, ("miss",): rate_cache.misses}
+))
+registry.register(CallbackMetric(
+    "rate_cache_entries", "Rate tables held in this worker's cache.",
+    [], lambda: {(): rate_cache.stats()["size"]}, kind="gauge"
+))
+registry.register(CallbackMetric(
+    "rate_cache_shared_fetches_total", "Cache misses that joined a fetch already in flight.",
+    [], lambda: {(): rate_cache.shared_fetches}
+))
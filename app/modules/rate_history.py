@@ -0,0 +1,380 @@
+"""Daily pivot rates in a memory-mapped columnar file for date-pinned and trend queries."""
+import json
+import math
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import threading
+from array import array
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from loguru import logger
+
+import config
+from app.modules.cross_rates import CrossRateTable
+from app.modules.metrics import CallbackMetric, registry
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None
+
+# File layout: magic, uint32 header length, JSON header padded to 8 bytes,
+# then float64 cells, one row per day since the epoch and one column per code
+MAGIC = b"RHIST1\n"
+_HEADER_LENGTH = struct.Struct("<I")
+_CELL = 8
+
+
+class RateHistory:
+    """
+    Daily rates from the pivot currency, one row per date and one column per currency.
+
+    Row ``r`` holds the rates of ``epoch + r days``, so a date's row is
+    found by subtraction and a date range is a contiguous block of the
+    file. Cells of days never fetched are 0.0 (the file grows sparsely);
+    the pivot's own column is 1.0 in every stored row and doubles as the
+    "row present" flag. Appending writes the rate cells first and the flag
+    last, so readers never use a half-written row.
+
+    Readers map the file read-only and remap when it grows or is replaced.
+    Writers from different processes are serialized with ``flock`` on a
+    side lock file. A table with currencies missing from the columns
+    rewrites the file with the wider column set (rare: upstream adds
+    currencies slowly).
+    """
+
+    def __init__(self, folder: Path, pivot: str, epoch: date):
+        """
+        Initialize the store; the file is opened on first use.
+
+        Args:
+            folder: Directory holding the history file
+            pivot: Lowercase pivot currency code of every stored row
+            epoch: Date of the first row
+        """
+        self.path = Path(folder) / f"{pivot}.history"
+        self.pivot = pivot
+        self.epoch = epoch
+        self._lock = threading.Lock()
+        self._map: Optional[mmap.mmap] = None
+        self._view: Optional[memoryview] = None
+        self._file_id: Tuple[int, int] = (0, 0)
+        self._codes: List[str] = []
+        self._index: Dict[str, int] = {}
+        self.appended = 0
+
+    def _row(self, day: date) -> int:
+        return (day - self.epoch).days
+
+    def _close_locked(self) -> None:
+        if self._view is not None:
+            self._view.release()
+            self._view = None
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file_id = (0, 0)
+        self._codes, self._index = [], {}
+
+    def _sync_locked(self) -> bool:
+        """Map the current file if it changed since the last read; return whether one exists."""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            self._close_locked()
+            return False
+        file_id = (stat.st_ino, stat.st_size)
+        if file_id == self._file_id:
+            return self._view is not None
+
+        self._close_locked()
+        file_map = None
+        try:
+            with open(self.path, "rb") as f:
+                file_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            header, offset = _read_header(file_map)
+        except (OSError, ValueError, KeyError, struct.error) as e:
+            if file_map is not None:
+                file_map.close()
+            logger.warning(f"Ignoring unreadable rate history {self.path}: {str(e)}")
+            return False
+        if header["byteorder"] != sys.byteorder or header["pivot"] != self.pivot:
+            file_map.close()
+            logger.warning(f"Ignoring rate history {self.path} written for another pivot or byte order")
+            return False
+
+        codes = header["codes"]
+        cells = (len(file_map) - offset) // _CELL
+        cells -= cells % len(codes)
+        self._map = file_map
+        self._view = memoryview(file_map)[offset:offset + cells * _CELL].cast("d")
+        self._file_id = file_id
+        self._codes = codes
+        self._index = {code: position for position, code in enumerate(codes)}
+        return True
+
+    def _cell_locked(self, row: int, column: int) -> float:
+        position = row * len(self._codes) + column
+        if row < 0 or position >= len(self._view):
+            return 0.0
+        return self._view[position]
+
+    def _has_row_locked(self, row: int) -> bool:
+        return self._cell_locked(row, self._index[self.pivot]) == 1.0
+
+    def has(self, day: date) -> bool:
+        """Check whether the rates of a date are stored."""
+        with self._lock:
+            return self._sync_locked() and self._has_row_locked(self._row(day))
+
+    def missing(self, start: date, end: date) -> List[date]:
+        """
+        List the dates of a range that are not stored yet.
+
+        Args:
+            start: First date (inclusive)
+            end: Last date (inclusive)
+
+        Returns:
+            The missing dates in order
+        """
+        days = [start + timedelta(days=offset) for offset in range((end - start).days + 1)]
+        with self._lock:
+            if not self._sync_locked():
+                return days
+            return [day for day in days if not self._has_row_locked(self._row(day))]
+
+    def table(self, day: date) -> Optional[CrossRateTable]:
+        """
+        Get the full rate table of a date.
+
+        Args:
+            day: The date
+
+        Returns:
+            The table (timestamped at midnight UTC of that date), or None if not stored
+        """
+        with self._lock:
+            if not self._sync_locked():
+                return None
+            row = self._row(day)
+            if not self._has_row_locked(row):
+                return None
+            width = len(self._codes)
+            cells = self._view[row * width:(row + 1) * width].tolist()
+            rates = {code: cells[column] for code, column in self._index.items()}
+        return CrossRateTable.from_rates(self.pivot, rates, fetched_at=day_timestamp(day))
+
+    def series(self, base: str, target: str, start: date, end: date) -> List[Tuple[date, Optional[float]]]:
+        """
+        Get the daily rate of one pair over a date range.
+
+        Args:
+            base: Lowercase base currency code
+            target: Lowercase target currency code
+            start: First date (inclusive)
+            end: Last date (inclusive)
+
+        Returns:
+            (date, rate) pairs in date order; the rate is None for dates not
+            stored or without a quote for either currency
+
+        Raises:
+            KeyError: If either currency has never been stored
+        """
+        points: List[Tuple[date, Optional[float]]] = []
+        with self._lock:
+            if not self._sync_locked():
+                raise KeyError(base)
+            base_column, target_column = self._index[base], self._index[target]
+            pivot_column = self._index[self.pivot]
+            first = self._row(start)
+            for offset in range((end - start).days + 1):
+                row = first + offset
+                rate = None
+                if self._cell_locked(row, pivot_column) == 1.0:
+                    base_value = self._cell_locked(row, base_column)
+                    target_value = self._cell_locked(row, target_column)
+                    if base_value > 0 and target_value > 0:
+                        rate = target_value / base_value
+                points.append((start + timedelta(days=offset), rate))
+        return points
+
+    def append(self, day: date, table: CrossRateTable) -> None:
+        """
+        Store the rates of a date, widening the columns if the table has new currencies.
+
+        Args:
+            day: The date the rates are for
+            table: A table of the store's pivot currency
+
+        Raises:
+            ValueError: If the table's pivot differs or the date is before the epoch
+        """
+        if table.pivot != self.pivot:
+            raise ValueError(f"History holds '{self.pivot}' rates, got a '{table.pivot}' table")
+        row = self._row(day)
+        if row < 0:
+            raise ValueError(f"No history before {self.epoch.isoformat()}")
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with _writer_lock(self.path.with_suffix(".lock")):
+            header, offset = _load_header(self.path)
+            if header and (header["pivot"] != self.pivot or header["byteorder"] != sys.byteorder):
+                header, offset = None, 0  # not ours to extend; start over
+            codes = header["codes"] if header else []
+            known = set(codes)
+            if not header or any(code not in known for code in table.codes()):
+                codes = sorted(known | set(table.codes()) | {self.pivot})
+                offset = self._rewrite(header, offset, codes)
+            fd = os.open(self.path, os.O_RDWR)
+            try:
+                _write_row(fd, offset, codes, row, table, self.pivot)
+            finally:
+                os.close(fd)
+        self.appended += 1
+
+    def _rewrite(self, header: Optional[Dict], offset: int, codes: List[str]) -> int:
+        """Copy every stored row into a new file with the given columns and rename it into place."""
+        old_codes = header["codes"] if header else []
+        old_width = len(old_codes)
+        positions = [codes.index(code) for code in old_codes]
+        new_header = _encode_header(self.pivot, codes)
+
+        tmp_fd, tmp_path = tempfile.mkstemp(dir=self.path.parent, prefix=f".{self.pivot}.", suffix=".tmp")
+        try:
+            os.write(tmp_fd, new_header)
+            if old_width:
+                with open(self.path, "rb") as f:
+                    f.seek(offset)
+                    row = 0
+                    while True:
+                        data = f.read(old_width * _CELL)
+                        if len(data) < old_width * _CELL:
+                            break
+                        if data.strip(b"\0"):
+                            cells = array("d")
+                            cells.frombytes(data)
+                            widened = array("d", bytes(len(codes) * _CELL))
+                            for value, position in zip(cells, positions):
+                                widened[position] = value
+                            os.pwrite(tmp_fd, widened.tobytes(), len(new_header) + row * len(codes) * _CELL)
+                        row += 1
+            os.fsync(tmp_fd)
+            os.close(tmp_fd)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            try:
+                os.close(tmp_fd)
+            except OSError:
+                pass
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+        if old_width:
+            logger.info(f"Widened rate history {self.path} from {old_width} to {len(codes)} currencies")
+        return len(new_header)
+
+    def stats(self) -> Dict[str, object]:
+        """Return the number of currencies, stored days and date span."""
+        with self._lock:
+            if not self._sync_locked():
+                return {"currencies": 0, "days": 0, "first": None, "last": None, "appended": self.appended}
+            pivot_column = self._index[self.pivot]
+            rows = len(self._view) // len(self._codes)
+            stored = [row for row in range(rows) if self._cell_locked(row, pivot_column) == 1.0]
+            return {
+                "currencies": len(self._codes),
+                "days": len(stored),
+                "first": (self.epoch + timedelta(days=stored[0])).isoformat() if stored else None,
+                "last": (self.epoch + timedelta(days=stored[-1])).isoformat() if stored else None,
+                "appended": self.appended,
+            }
+
+
+def day_timestamp(day: date) -> float:
+    """Return the Unix timestamp of midnight UTC at the start of a date."""
+    return datetime(day.year, day.month, day.day, tzinfo=timezone.utc).timestamp()
+
+
+def _encode_header(pivot: str, codes: Sequence[str]) -> bytes:
+    header = json.dumps({"pivot": pivot, "byteorder": sys.byteorder, "codes": list(codes)}).encode("utf-8")
+    # Pad so the float64 cells start 8-byte aligned
+    length = len(MAGIC) + _HEADER_LENGTH.size + len(header)
+    header += b" " * (-length % _CELL)
+    return MAGIC + _HEADER_LENGTH.pack(len(header)) + header
+
+
+def _read_header(data) -> Tuple[Dict, int]:
+    if data[:len(MAGIC)] != MAGIC:
+        raise ValueError("bad magic")
+    (length,) = _HEADER_LENGTH.unpack_from(data, len(MAGIC))
+    offset = len(MAGIC) + _HEADER_LENGTH.size
+    header = json.loads(bytes(data[offset:offset + length]))
+    if not header["codes"]:
+        raise ValueError("no currencies")
+    return header, offset + length
+
+
+def _load_header(path: Path) -> Tuple[Optional[Dict], int]:
+    """Read a history file's header, or (None, 0) if the file is missing or unreadable."""
+    try:
+        with open(path, "rb") as f:
+            prefix = f.read(len(MAGIC) + _HEADER_LENGTH.size)
+            (length,) = _HEADER_LENGTH.unpack_from(prefix, len(MAGIC))
+            return _read_header(prefix + f.read(length))
+    except FileNotFoundError:
+        return None, 0
+    except (OSError, ValueError, KeyError, struct.error) as e:
+        logger.warning(f"Rebuilding unreadable rate history {path}: {str(e)}")
+        return None, 0
+
+
+def _write_row(fd: int, offset: int, codes: List[str], row: int, table: CrossRateTable, pivot: str) -> None:
+    """Write a row's rate cells, then set its pivot flag cell."""
+    width = len(codes)
+    cells = array("d", bytes(width * _CELL))
+    for column, code in enumerate(codes):
+        if code in table and code != pivot:
+            value = table.values[table.index[code]]
+            if math.isfinite(value):
+                cells[column] = value
+    row_offset = offset + row * width * _CELL
+    pivot_column = codes.index(pivot)
+    os.pwrite(fd, cells.tobytes(), row_offset)
+    os.pwrite(fd, array("d", [1.0]).tobytes(), row_offset + pivot_column * _CELL)
+
+
+@contextmanager
+def _writer_lock(path: Path) -> Iterator[None]:
+    """Hold the cross-process writer lock; a separate file, since the history file is replaced on rewrite."""
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+        yield
+    finally:
+        os.close(fd)  # also releases the lock
+
+
+rate_history = RateHistory(
+    config.RATE_HISTORY_FOLDER,
+    config.PIVOT_CURRENCY,
+    date.fromisoformat(config.RATE_HISTORY_EPOCH)
+)
+registry.register(CallbackMetric(
+    "rate_history_days", "Dates stored in the historical rate file.",
+    [], lambda: {(): rate_history.stats()["days"]}, kind="gauge"
+))
+registry.register(CallbackMetric(
+    "rate_history_appended_total", "Dates this worker downloaded and appended to the history file.",
+    [], lambda: {(): rate_history.appended}
+))
@@ -0,0 +1,227 @@
+"""Background refresh of hot exchange-rate tables ahead of their expiry."""
+import asyncio
+import random
+import threading
+import time
+from collections import Counter
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional
+
+from loguru import logger
+
+import config
+from app.modules.rate_cache import RateCache, RateTable
+
+
+class RateRefresher:
+    """
+    Keeps the tables behind popular and frequently requested bases fresh.
+
+    A daemon thread runs its own event loop. Each hot table is refreshed
+    ``config.RATE_REFRESH_AHEAD`` seconds before it expires, and each
+    schedule is spread by a random jitter so workers and tables do not all
+    hit upstream at once. A failed refresh is retried with jittered
+    exponential backoff while the cache keeps serving the old table.
+
+    Request handlers report the bases they serve with ``observe`` and ask
+    for an immediate refresh of an expired table with ``request_refresh``.
+    """
+
+    def __init__(self, cache: RateCache, fetch: Callable[[str], Awaitable[RateTable]],
+                 seeds: Iterable[str], table_key: Callable[[str], str]):
+        """
+        Initialize an idle refresher; call ``start`` to run it.
+
+        Args:
+            cache: The rate cache to keep warm
+            fetch: Coroutine function that downloads the table for a key, raising on failure
+            seeds: Lowercase base currencies that are always kept warm
+            table_key: Maps a requested base currency to the cache key that serves it
+        """
+        self.cache = cache
+        self.fetch = fetch
+        self.seeds = list(seeds)
+        self.table_key = table_key
+        self._demand: Counter = Counter()
+        self._next_run: Dict[str, float] = {}
+        self._failures: Dict[str, int] = {}
+        self._last_decay = time.monotonic()
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+        self.refreshes = 0
+        self.failures = 0
+
+    def forget_after_fork(self) -> None:
+        """
+        Drop the thread state a forked child inherits from its parent.
+
+        The refresh thread does not survive a fork; afterwards the refresher
+        is idle and can be started again in the child.
+        """
+        self._loop = self._wakeup = self._thread = None
+        self._stopping = False
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        """Whether the background thread is running."""
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        """Start the background refresh thread."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._stopping = False
+            self._thread = threading.Thread(target=lambda: asyncio.run(self._run()), name="rate-refresher", daemon=True)
+            self._thread.start()
+        logger.info(f"Rate refresher started (seeds={len(self.seeds)}, hot_bases={config.RATE_REFRESH_HOT_BASES})")
+
+    def stop(self) -> None:
+        """Stop the background refresh thread."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+            self._stopping = True
+        if thread is None:
+            return
+        self._wake()
+        thread.join(timeout=5)
+        logger.info("Rate refresher stopped")
+
+    def observe(self, base_currency: str) -> None:
+        """
+        Record that a request was served for a base currency.
+
+        Args:
+            base_currency: The lowercase base currency code
+        """
+        with self._lock:
+            self._demand[base_currency] += 1
+
+    def request_refresh(self, key: str) -> None:
+        """
+        Ask for a table to be refreshed as soon as possible.
+
+        Safe to call from any thread; if the refresher is not running yet the
+        request is picked up when it starts.
+
+        Args:
+            key: The cache key of the table
+        """
+        with self._lock:
+            self._next_run[key] = 0.0
+        self._wake()
+
+    def _wake(self) -> None:
+        loop, wakeup = self._loop, self._wakeup
+        if loop is not None and wakeup is not None:
+            try:
+                loop.call_soon_threadsafe(wakeup.set)
+            except RuntimeError:
+                pass  # loop already closed
+
+    def hot_keys(self) -> List[str]:
+        """Return the cache keys currently kept warm, seeds first."""
+        with self._lock:
+            observed = [base for base, _ in self._demand.most_common(config.RATE_REFRESH_HOT_BASES)]
+        keys: List[str] = []
+        for base in self.seeds + observed:
+            key = self.table_key(base)
+            if key not in keys:
+                keys.append(key)
+        return keys
+
+    def _decay_demand(self) -> None:
+        """Halve the demand counters once per poll interval so the hot set follows recent traffic."""
+        now = time.monotonic()
+        if now - self._last_decay < config.RATE_REFRESH_POLL:
+            return
+        self._last_decay = now
+        with self._lock:
+            self._demand = Counter({base: count // 2 for base, count in self._demand.items() if count > 1})
+
+    async def _run(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        try:
+            while not self._stopping:
+                due = self._due_keys(self.hot_keys())
+                if due:
+                    await asyncio.gather(*(self._refresh(key) for key in due))
+                    continue
+
+                self._decay_demand()
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self._sleep_time())
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self._loop = self._wakeup = None
+
+    def _due_keys(self, keys: List[str]) -> List[str]:
+        """Schedule newly hot keys and return the ones due for a refresh."""
+        now = time.monotonic()
+        with self._lock:
+            for key in keys:
+                if key not in self._next_run:
+                    self._next_run[key] = now + self._delay_until_refresh(key)
+            # Forget keys that fell out of the hot set (explicit requests stay until run)
+            for key in [key for key, at in self._next_run.items() if key not in keys and at > 0]:
+                del self._next_run[key]
+                self._failures.pop(key, None)
+            return [key for key, at in self._next_run.items() if at <= now]
+
+    def _delay_until_refresh(self, key: str) -> float:
+        expires_in = self.cache.expires_in(key)
+        if expires_in is None:
+            return 0.0
+        return max(0.0, expires_in - config.RATE_REFRESH_AHEAD - random.uniform(0, config.RATE_REFRESH_JITTER))
+
+    def _sleep_time(self) -> float:
+        with self._lock:
+            if not self._next_run:
+                return config.RATE_REFRESH_POLL
+            wait = min(self._next_run.values()) - time.monotonic()
+        return min(max(wait, 0.0), config.RATE_REFRESH_POLL)
+
+    async def _refresh(self, key: str) -> None:
+        try:
+            await self.cache.refresh(key, self.fetch)
+        except Exception as e:
+            with self._lock:
+                failures = self._failures.get(key, 0) + 1
+                self._failures[key] = failures
+                self.failures += 1
+            backoff = min(config.RATE_REFRESH_BACKOFF_MAX, config.RATE_REFRESH_BACKOFF_MIN * 2 ** (failures - 1))
+            backoff *= random.uniform(0.5, 1.0)
+            with self._lock:
+                self._next_run[key] = time.monotonic() + backoff
+            logger.warning(f"Background refresh of '{key}' rates failed ({failures} in a row), retrying in {backoff:.0f}s: {str(e)}")
+            return
+
+        with self._lock:
+            self._failures.pop(key, None)
+            self.refreshes += 1
+        # Never spin when the cache TTL is shorter than the refresh lead time
+        delay = max(self._delay_until_refresh(key), config.RATE_REFRESH_BACKOFF_MIN)
+        with self._lock:
+            self._next_run[key] = time.monotonic() + delay
+        logger.debug("Refreshed '{}' rates in the background, next refresh in {:.0f}s", key, delay)
+
+    def stats(self) -> Dict[str, object]:
+        """Return refresh counters, the hot set and the next refresh time per table."""
+        now = time.monotonic()
+        with self._lock:
+            schedule = {key: max(0.0, at - now) for key, at in self._next_run.items()}
+            demand = dict(self._demand.most_common(config.RATE_REFRESH_HOT_BASES))
+            return {
+                "running": self.running,
+                "refreshes": self.refreshes,
+                "failures": self.failures,
+                "failing": dict(self._failures),
+                "demand": demand,
+                "next_refresh_in": schedule,
+            }
@@ -0,0 +1,119 @@
+"""On-disk snapshots of rate tables for warm starts and offline fallback."""
+import json
+import os
+import struct
+import sys
+import tempfile
+from array import array
+from pathlib import Path
+from typing import Optional
+
+from loguru import logger
+
+import config
+from app.modules.cross_rates import CrossRateTable
+
+# File layout: magic, uint32 header length, JSON header, raw float64 values
+MAGIC = b"RATES1\n"
+_HEADER_LENGTH = struct.Struct("<I")
+
+
+class RateSnapshotStore:
+    """
+    Persists the latest cross-rate table per base currency.
+
+    Each table is one small binary file: a JSON header with the currency
+    codes and fetch time, followed by the float64 rate array as raw bytes.
+    Files are written to a temporary name and renamed into place, so readers
+    never see a half-written snapshot.
+    """
+
+    def __init__(self, folder: Path):
+        """
+        Initialize the store.
+
+        Args:
+            folder: Directory holding the snapshot files
+        """
+        self.folder = Path(folder)
+
+    def path(self, base_currency: str) -> Path:
+        """Return the snapshot path for a lowercase base currency."""
+        return self.folder / f"{base_currency}.rates"
+
+    def save(self, table: CrossRateTable) -> None:
+        """
+        Atomically write a table's snapshot.
+
+        Args:
+            table: The table to persist
+        """
+        header = json.dumps({
+            "pivot": table.pivot,
+            "fetched_at": table.fetched_at,
+            "byteorder": sys.byteorder,
+            "codes": table.codes(),
+        }).encode("utf-8")
+
+        self.folder.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.folder, prefix=f".{table.pivot}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(MAGIC)
+                f.write(_HEADER_LENGTH.pack(len(header)))
+                f.write(header)
+                f.write(table.values.tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path(table.pivot))
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    def load(self, base_currency: str) -> Optional[CrossRateTable]:
+        """
+        Read a table's snapshot.
+
+        Args:
+            base_currency: The lowercase base currency code
+
+        Returns:
+            The table, or None if there is no readable snapshot
+        """
+        path = self.path(base_currency)
+        try:
+            data = path.read_bytes()
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            logger.warning(f"Failed to read rate snapshot {path}: {str(e)}")
+            return None
+
+        try:
+            if not data.startswith(MAGIC):
+                raise ValueError("bad magic")
+            offset = len(MAGIC)
+            (header_length,) = _HEADER_LENGTH.unpack_from(data, offset)
+            offset += _HEADER_LENGTH.size
+            header = json.loads(data[offset:offset + header_length])
+            offset += header_length
+
+            values = array("d")
+            values.frombytes(data[offset:])
+            if header["byteorder"] != sys.byteorder:
+                values.byteswap()
+            codes = header["codes"]
+            if len(codes) != len(values):
+                raise ValueError("code/value count mismatch")
+        except (ValueError, KeyError, struct.error) as e:
+            logger.warning(f"Ignoring corrupt rate snapshot {path}: {str(e)}")
+            return None
+
+        index = {code: position for position, code in enumerate(codes)}
+        return CrossRateTable(header["pivot"], index, values, header["fetched_at"])
+
+
+rate_snapshots = RateSnapshotStore(config.RATE_SNAPSHOT_FOLDER)
@@ -0,0 +1,300 @@
+"""Source selection for exchange-rate mirrors: hedged requests and circuit breakers."""
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+import config
+from app.modules.log_writer import debug_sampled
+from app.modules.metrics import RATE_FETCHES, RATE_WINS
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """
+    Tracks recent outcomes of one mirror and decides whether to use it.
+
+    A call that fails, or succeeds slower than the slow-call threshold, counts
+    as bad. Once enough recent calls are bad the breaker opens and the mirror
+    is skipped for a cooldown period, after which a single probe is let through.
+    """
+
+    def __init__(self, name: str):
+        """
+        Initialize a closed breaker.
+
+        Args:
+            name: Name used in logs (usually the mirror host)
+        """
+        self.name = name
+        self.state = CLOSED
+        self._outcomes: deque = deque(maxlen=config.BREAKER_WINDOW)
+        self._latencies: deque = deque(maxlen=config.BREAKER_WINDOW)
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def available(self) -> bool:
+        """
+        Check, without claiming anything, whether a request could be sent to this mirror now.
+
+        Returns:
+            True if the breaker is closed, or due a probe with none running
+        """
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN:
+                return time.monotonic() - self._opened_at >= config.BREAKER_COOLDOWN
+            return not self._probe_in_flight
+
+    def claim(self) -> Tuple[bool, bool]:
+        """
+        Claim the right to send a request to this mirror; call only for a request about to be sent.
+
+        Returns:
+            (whether the request may be sent, whether it holds the half-open probe);
+            a claimed probe must end with ``record`` or ``release``
+        """
+        with self._lock:
+            if self.state == OPEN and time.monotonic() - self._opened_at >= config.BREAKER_COOLDOWN:
+                self.state = HALF_OPEN
+                logger.info(f"Circuit for {self.name} is half-open, probing")
+            if self.state == CLOSED:
+                return True, False
+            if self.state == HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True, True
+            return False, False
+
+    def record(self, ok: bool, latency: float, probe: bool = False) -> None:
+        """
+        Record the outcome of a request.
+
+        Args:
+            ok: Whether the request returned a valid table
+            latency: Request duration in seconds
+            probe: Whether the request held the half-open probe
+        """
+        bad = not ok or latency > config.BREAKER_SLOW_THRESHOLD
+        with self._lock:
+            self._outcomes.append(bad)
+            if ok:
+                self._latencies.append(latency)
+            if probe and self.state == HALF_OPEN:
+                self._probe_in_flight = False
+                if bad:
+                    self._open()
+                else:
+                    self.state = CLOSED
+                    self._outcomes.clear()
+                    logger.info(f"Circuit for {self.name} closed")
+                return
+            if self.state == CLOSED and len(self._outcomes) >= config.BREAKER_MIN_SAMPLES:
+                if sum(self._outcomes) / len(self._outcomes) >= config.BREAKER_ERROR_THRESHOLD:
+                    self._open()
+
+    def release(self, probe: bool) -> None:
+        """
+        End a request that was cancelled before it produced an outcome.
+
+        Args:
+            probe: Whether the request held the half-open probe; only then is the probe freed
+        """
+        if not probe:
+            return
+        with self._lock:
+            self._probe_in_flight = False
+
+    def _open(self) -> None:
+        self.state = OPEN
+        self._opened_at = time.monotonic()
+        logger.warning(f"Circuit for {self.name} opened")
+
+    def latency_quantile(self, q: float) -> Optional[float]:
+        """
+        Get a quantile of recent successful latencies.
+
+        Args:
+            q: Quantile between 0 and 1
+
+        Returns:
+            The latency in seconds, or None without samples
+        """
+        with self._lock:
+            samples = sorted(self._latencies)
+        if not samples:
+            return None
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the breaker state and recent error/latency statistics."""
+        with self._lock:
+            outcomes = list(self._outcomes)
+            state = self.state
+        return {
+            "state": state,
+            "samples": len(outcomes),
+            "error_rate": sum(outcomes) / len(outcomes) if outcomes else 0.0,
+            "p50_latency": self.latency_quantile(0.5),
+            "p95_latency": self.latency_quantile(0.95),
+        }
+
+
+class RateSource:
+    """One mirror from ``config.CURRENCY_API_URLS`` and its circuit breaker."""
+
+    def __init__(self, url_template: str):
+        """
+        Initialize a mirror.
+
+        Args:
+            url_template: URL with a ``{base}`` placeholder (and any other
+                fields passed to ``url``, such as ``{date}``)
+        """
+        self.url_template = url_template
+        self.breaker = CircuitBreaker(url_template.split("/")[2])
+
+    def url(self, base_currency: str, **fields: str) -> str:
+        """Format the mirror URL for a lowercase base currency and any extra fields."""
+        return self.url_template.format(base=base_currency, **fields)
+
+
+class SourceSelector:
+    """Picks mirrors by health and races them with hedged requests."""
+
+    def __init__(self, url_templates: List[str]):
+        """
+        Initialize the selector.
+
+        Args:
+            url_templates: Mirror URLs in order of preference
+        """
+        self.sources = [RateSource(url) for url in url_templates]
+        self.hedges = 0
+
+    def candidates(self) -> Tuple[List[RateSource], bool]:
+        """
+        Order the mirrors for the next request.
+
+        Available mirrors come first, fastest median latency first. Nothing is
+        claimed here; a half-open probe is only claimed for a mirror that is
+        actually called. If every breaker is open the mirrors are returned in
+        configured order anyway, so a total outage still gets a best-effort
+        attempt.
+
+        Returns:
+            (mirrors in the order to try them, whether they bypass their open breakers)
+        """
+        healthy = [source for source in self.sources if source.breaker.available()]
+        if not healthy:
+            logger.warning("All rate sources have open circuits, trying them anyway")
+            return list(self.sources), True
+
+        def median_latency(source: RateSource) -> float:
+            latency = source.breaker.latency_quantile(0.5)
+            return config.RATE_HEDGE_DELAY_DEFAULT if latency is None else latency
+
+        return sorted(healthy, key=median_latency), False
+
+    def hedge_delay(self, source: RateSource) -> float:
+        """
+        Get how long to wait on a mirror before hedging to the next one.
+
+        The delay tracks the mirror's recent p95 latency, clamped to the
+        configured bounds.
+        """
+        p95 = source.breaker.latency_quantile(0.95)
+        if p95 is None:
+            return config.RATE_HEDGE_DELAY_DEFAULT
+        return min(max(p95, config.RATE_HEDGE_DELAY_MIN), config.RATE_HEDGE_DELAY_MAX)
+
+    async def _attempt(self, source: RateSource, base_currency: str,
+                       fetch: Callable[[str], Awaitable[Any]], fields: Dict[str, str], probe: bool) -> Any:
+        started = time.monotonic()
+        try:
+            result = await fetch(source.url(base_currency, **fields))
+        except asyncio.CancelledError:
+            source.breaker.release(probe)
+            RATE_FETCHES.observe(time.monotonic() - started, mirror=source.breaker.name, outcome="cancelled")
+            raise
+        except Exception:
+            source.breaker.record(False, time.monotonic() - started, probe)
+            RATE_FETCHES.observe(time.monotonic() - started, mirror=source.breaker.name, outcome="error")
+            raise
+        source.breaker.record(True, time.monotonic() - started, probe)
+        RATE_FETCHES.observe(time.monotonic() - started, mirror=source.breaker.name, outcome="ok")
+        return result
+
+    async def fetch(self, base_currency: str, fetch: Callable[[str], Awaitable[Any]], **fields: str) -> Any:
+        """
+        Fetch from the mirrors, hedging to the next one when a mirror is slow.
+
+        Args:
+            base_currency: Lowercase base currency code
+            fetch: Coroutine function taking a URL; it must raise on an invalid response
+            **fields: Extra URL template fields (e.g., ``date`` for dated mirrors)
+
+        Returns:
+            The first successful result
+
+        Raises:
+            ValueError: If every mirror fails
+        """
+        candidates, forced = self.candidates()
+        pending: Dict[asyncio.Future, RateSource] = {}
+        next_index = 0
+
+        def launch() -> Optional[RateSource]:
+            """Call the next mirror whose breaker lets this request through, if any."""
+            nonlocal next_index
+            while next_index < len(candidates):
+                source = candidates[next_index]
+                next_index += 1
+                allowed, probe = source.breaker.claim()
+                if allowed or forced:
+                    task = asyncio.ensure_future(self._attempt(source, base_currency, fetch, fields, probe))
+                    pending[task] = source
+                    return source
+            return None
+
+        leader = launch()
+        try:
+            while pending:
+                timeout = self.hedge_delay(leader) if next_index < len(candidates) else None
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    hedge = launch()
+                    if hedge is not None:
+                        self.hedges += 1
+                        leader = hedge
+                        debug_sampled("Hedging '{}' rate fetch to {}", base_currency, leader.breaker.name)
+                    continue
+                for task in done:
+                    source = pending.pop(task)
+                    try:
+                        result = task.result()
+                    except Exception as e:
+                        logger.error(f"Failed to fetch from {source.url(base_currency, **fields)}: {str(e)}")
+                        continue
+                    RATE_WINS.inc(mirror=source.breaker.name)
+                    return result
+                leader = launch() or leader
+        finally:
+            for task in pending:
+                task.cancel()
+
+        raise ValueError(f"جميع مصادر أسعار الصرف فشلت لجلب أسعار {base_currency.upper()}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Return per-mirror breaker statistics and the hedge counter."""
+        return {
+            "hedges": self.hedges,
+            "sources": {source.breaker.name: source.breaker.stats() for source in self.sources},
+        }
@@ -0,0 +1,326 @@
+"""Rate tables shared across worker processes through mmap-backed segments."""
+import mmap
+import os
+import stat
+import struct
+import threading
+import time
+from array import array
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from loguru import logger
+
+import config
+from app.modules.cross_rates import CrossRateTable
+from app.modules.metrics import CallbackMetric, registry
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None
+
+# Segment layout: uint64 sequence, then the body (fetched_at, value count,
+# codes length, float64 values, newline-separated codes)
+_SEQUENCE = struct.Struct("<Q")
+_BODY_HEADER = struct.Struct("<dII")
+_BODY_OFFSET = _SEQUENCE.size
+_READ_RETRIES = 100
+_NOFOLLOW = getattr(os, "O_NOFOLLOW", 0)
+
+
+class SharedRateSegment:
+    """
+    One cross-rate table in a memory-mapped file shared by all workers.
+
+    Writers follow the seqlock protocol: the sequence counter is made odd,
+    the body is rewritten, then the counter is made even again. Readers take
+    no lock; they copy the body and retry if the counter was odd or changed
+    meanwhile, so they never see a torn update. Concurrent writers from
+    different processes are serialized with ``flock`` on the segment file.
+
+    The parsed table is memoized per sequence number, so the common read is
+    a single 8-byte load.
+    """
+
+    def __init__(self, key: str, path: Path, size: int):
+        """
+        Open (creating if needed) a segment file and map it.
+
+        Args:
+            key: Lowercase base currency of the table
+            path: The segment file
+            size: Segment size in bytes
+        """
+        self.key = key
+        self.path = path
+        self.size = size
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT | _NOFOLLOW, 0o600)
+        if os.fstat(self._fd).st_size < size:
+            os.ftruncate(self._fd, size)
+        self._map = mmap.mmap(self._fd, size)
+        self._write_lock = threading.Lock()
+        self._cached: Tuple[int, Optional[CrossRateTable]] = (0, None)
+        self.torn_reads = 0
+
+    @property
+    def sequence(self) -> int:
+        """The current sequence number; even when no write is in progress."""
+        return _SEQUENCE.unpack_from(self._map, 0)[0]
+
+    def read(self) -> Optional[CrossRateTable]:
+        """
+        Get the latest published table without taking any lock.
+
+        Returns:
+            The table, or None if nothing was published yet
+        """
+        cached_sequence, cached_table = self._cached
+        for _ in range(_READ_RETRIES):
+            sequence = self.sequence
+            if sequence == cached_sequence:
+                return cached_table
+            if sequence & 1:
+                self.torn_reads += 1
+                time.sleep(0)
+                continue
+
+            fetched_at, count, codes_length = _BODY_HEADER.unpack_from(self._map, _BODY_OFFSET)
+            values_offset = _BODY_OFFSET + _BODY_HEADER.size
+            codes_offset = values_offset + count * 8
+            if codes_offset + codes_length > self.size:
+                self.torn_reads += 1
+                time.sleep(0)
+                continue
+            values_bytes = self._map[values_offset:codes_offset]
+            codes_bytes = self._map[codes_offset:codes_offset + codes_length]
+
+            if self.sequence != sequence:
+                self.torn_reads += 1
+                time.sleep(0)
+                continue
+
+            values = array("d")
+            values.frombytes(values_bytes)
+            codes = codes_bytes.decode("utf-8").split("\n")
+            index = {code: position for position, code in enumerate(codes)}
+            table = CrossRateTable(self.key, index, values, fetched_at)
+            self._cached = (sequence, table)
+            return table
+
+        logger.warning(f"Gave up reading shared rates {self.path} after {_READ_RETRIES} attempts")
+        return cached_table
+
+    def write(self, table: CrossRateTable) -> bool:
+        """
+        Publish a table to every worker.
+
+        Args:
+            table: The table to publish
+
+        Returns:
+            True if the table fit in the segment and was written
+        """
+        codes_bytes = "\n".join(table.codes()).encode("utf-8")
+        values_bytes = table.values.tobytes()
+        body = _BODY_HEADER.pack(table.fetched_at, len(table.values), len(codes_bytes)) + values_bytes + codes_bytes
+        if _BODY_OFFSET + len(body) > self.size:
+            logger.error(f"Rate table for '{table.pivot}' ({len(body)} bytes) does not fit in shared segment of {self.size} bytes")
+            return False
+
+        with self._write_lock:
+            if fcntl is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                sequence = self.sequence
+                if sequence & 1:
+                    sequence += 1  # a writer died mid-update; its body is overwritten below
+                _SEQUENCE.pack_into(self._map, 0, sequence + 1)
+                self._map[_BODY_OFFSET:_BODY_OFFSET + len(body)] = body
+                _SEQUENCE.pack_into(self._map, 0, sequence + 2)
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(self._fd, fcntl.LOCK_UN)
+        return True
+
+    def close(self) -> None:
+        """Unmap the segment and close its file."""
+        self._map.close()
+        os.close(self._fd)
+
+
+class SharedRateStore:
+    """
+    Shared segments for every cached base plus the refresher election.
+
+    Exactly one process at a time holds the refresher lock (a non-blocking
+    ``flock`` on a lock file); it downloads rates and publishes them, while
+    the other workers read what it published. The kernel releases the lock
+    when the holder exits, so another worker takes over on its next attempt.
+
+    Segments and the lock are opened lazily and reopened after a fork
+    (see ``forget_after_fork``), because ``flock`` does not exclude
+    processes that share one open file.
+    """
+
+    def __init__(self, folder: Path, segment_size: int):
+        """
+        Initialize the store.
+
+        Args:
+            folder: Directory holding the segment and lock files
+            segment_size: Size of each segment in bytes
+        """
+        self.folder = Path(folder)
+        self.segment_size = segment_size
+        self._segments: Dict[str, SharedRateSegment] = {}
+        self._lock = threading.Lock()
+        self._leader_fd: Optional[int] = None
+        self._folder_checked = False
+        self.published = 0
+
+    def _ensure_folder(self) -> None:
+        """
+        Create the folder private to this user, refusing one others could tamper with.
+
+        Raises:
+            OSError: If the path is not a directory of ours, or other users can write to it
+        """
+        if self._folder_checked:
+            return
+        self.folder.mkdir(mode=0o700, parents=True, exist_ok=True)
+        info = os.lstat(self.folder)
+        if not stat.S_ISDIR(info.st_mode):
+            raise OSError(f"{self.folder} is not a directory")
+        if hasattr(os, "getuid") and info.st_uid != os.getuid():
+            raise OSError(f"{self.folder} is owned by another user")
+        if info.st_mode & (stat.S_IWGRP | stat.S_IWOTH):
+            raise OSError(f"{self.folder} is writable by other users")
+        self._folder_checked = True
+
+    def forget_after_fork(self) -> None:
+        """
+        Drop the segments and refresher lock a forked child inherits.
+
+        Inherited descriptors share the parent's open files (and its
+        ``flock``), so the child reopens its own on first use.
+        """
+        for segment in self._segments.values():
+            segment.close()
+        if self._leader_fd is not None:
+            os.close(self._leader_fd)
+        self._segments = {}
+        self._leader_fd = None
+        self._lock = threading.Lock()
+
+    def segment(self, key: str) -> Optional[SharedRateSegment]:
+        """
+        Get the segment for a base currency, opening it on first use.
+
+        Only opening a segment takes the store lock; once open, getting it
+        is a plain dictionary lookup, so reads stay lock-free.
+
+        Args:
+            key: Lowercase base currency code
+
+        Returns:
+            The segment, or None if it cannot be opened
+        """
+        segment = self._segments.get(key)
+        if segment is not None:
+            return segment
+        with self._lock:
+            segment = self._segments.get(key)
+            if segment is None:
+                try:
+                    self._ensure_folder()
+                    segment = SharedRateSegment(key, self.folder / f"{key}.seg", self.segment_size)
+                except OSError as e:
+                    logger.error(f"Failed to open shared rate segment for '{key}': {str(e)}")
+                    return None
+                self._segments[key] = segment
+            return segment
+
+    def read(self, key: str) -> Optional[CrossRateTable]:
+        """
+        Get the latest table published for a base currency.
+
+        Args:
+            key: Lowercase base currency code
+
+        Returns:
+            The table, or None if none was published
+        """
+        segment = self.segment(key)
+        return segment.read() if segment is not None else None
+
+    def publish(self, table: CrossRateTable) -> bool:
+        """
+        Publish a table to every worker.
+
+        Args:
+            table: The table to publish
+
+        Returns:
+            True if the table was written
+        """
+        segment = self.segment(table.pivot)
+        if segment is None or not segment.write(table):
+            return False
+        self.published += 1
+        return True
+
+    def is_leader(self) -> bool:
+        """
+        Check whether this process is the elected refresher, trying to take over if not.
+
+        Returns:
+            True if this process holds the refresher lock
+        """
+        if fcntl is None:
+            return True
+        with self._lock:
+            if self._leader_fd is not None:
+                return True
+            try:
+                self._ensure_folder()
+                fd = os.open(self.folder / "refresher.lock", os.O_RDWR | os.O_CREAT | _NOFOLLOW, 0o600)
+            except OSError as e:
+                logger.error(f"Failed to open refresher lock: {str(e)}")
+                return False
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                os.close(fd)
+                return False
+            self._leader_fd = fd
+        logger.info(f"Process {os.getpid()} elected as the rate refresher")
+        return True
+
+    def stats(self) -> Dict[str, object]:
+        """Return the leader flag, publish count and each segment's version."""
+        with self._lock:
+            segments = dict(self._segments)
+            leader = self._leader_fd is not None or fcntl is None
+        return {
+            "pid": os.getpid(),
+            "leader": leader,
+            "published": self.published,
+            "segments": {
+                key: {"sequence": segment.sequence, "torn_reads": segment.torn_reads}
+                for key, segment in segments.items()
+            },
+        }
+
+
+# Process-wide store; each worker maps the same files
+shared_rates = SharedRateStore(config.RATE_SHARED_FOLDER, config.RATE_SHARED_SEGMENT_SIZE)
+os.register_at_fork(after_in_child=shared_rates.forget_after_fork)
+registry.register(CallbackMetric(
+    "rate_shared_leader", "Whether this worker is the elected rate refresher (1) or not (0).",
+    [], lambda: {(): int(shared_rates.stats()["leader"])}, kind="gauge"
+))
+registry.register(CallbackMetric(
+    "rate_shared_published_total", "Rate tables this worker published to the shared segments.",
+    [], lambda: {(): shared_rates.published}
+))
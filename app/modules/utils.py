@@ -1,8 +1,157 @@
 """Utility functions for the Currency Converter application."""
-from typing import Dict, Any, Optional, List
+import re
+from typing import Dict, Any, Optional, List, Tuple
 
 import config
 
+# Map hamza/madda alef variants to bare alef; one character each, so positions are preserved
+_ALEF_VARIANTS = str.maketrans("أإآ", "ااا")
+
+# Arabic-Indic and Persian digits to ASCII
+ARABIC_DIGITS = str.maketrans("٠١٢٣٤٥٦٧٨٩۰۱۲۳۴۵۶۷۸۹", "01234567890123456789")
+
+
+def fold_alef(text: str) -> str:
+    """
+    Lowercase a text and fold alef variants, the light form of ``normalize_text``.
+    
+    Unlike ``normalize_text`` every character maps to exactly one character,
+    so match positions in the result are positions in the original text.
+    Currency matching and the intent parser both read text in this form.
+    
+    Args:
+        text: The text to fold
+        
+    Returns:
+        The folded text
+    """
+    return text.lower().translate(_ALEF_VARIANTS)
+
+
+# Arabic clitics that may be attached to a currency word (e.g., "بالدولار", "لليورو", "جنيهات")
+ARABIC_PREFIXES = frozenset(
+    conjunction + preposition + article
+    for conjunction in ("", "و", "ف")
+    for preposition in ("", "ب", "ل", "ك")
+    for article in ("", "ال")
+) | {"لل", "ولل", "فلل"}
+ARABIC_SUFFIXES = frozenset({"", "ات", "ين", "ان", "ا"})
+
+
+def _is_arabic(term: str) -> bool:
+    return "\u0600" <= term[0] <= "\u06ff"
+
+
+class CurrencyMatcher:
+    """
+    Aho-Corasick matcher over the currency terms of a mapping.
+
+    The automaton is built once; each lookup is a single pass over the text
+    regardless of how many terms the mapping holds. Matches must sit on word
+    boundaries (Arabic terms may carry attached clitics such as "بال" or
+    "ات"), overlapping matches resolve to the longest one, and results come
+    back in the order they appear in the text.
+    """
+
+    def __init__(self, mapping: Dict[str, str]):
+        """
+        Build the automaton.
+
+        Args:
+            mapping: Mapping of currency term to currency code
+        """
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        # Terms ending at each node: (term length, currency code, is Arabic)
+        self._output: List[List[Tuple[int, str, bool]]] = [[]]
+
+        for term, code in mapping.items():
+            term = fold_alef(term)
+            node = 0
+            for char in term:
+                if char not in self._goto[node]:
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append([])
+                    self._goto[node][char] = len(self._goto) - 1
+                node = self._goto[node][char]
+            self._output[node].append((len(term), code, _is_arabic(term)))
+
+        # Breadth-first pass to set failure links and merge suffix outputs
+        queue = list(self._goto[0].values())
+        for node in queue:
+            for char, child in self._goto[node].items():
+                fallback = self._fail[node]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(char, 0)
+                self._output[child] = self._output[child] + self._output[self._fail[child]]
+                queue.append(child)
+
+    @staticmethod
+    def _on_boundary(text: str, start: int, end: int, arabic: bool) -> bool:
+        """Check that a match is not part of a longer unrelated word."""
+        prefix_start = start
+        while prefix_start > 0 and text[prefix_start - 1].isalpha():
+            prefix_start -= 1
+        suffix_end = end
+        while suffix_end < len(text) and text[suffix_end].isalpha():
+            suffix_end += 1
+        if not arabic:
+            return prefix_start == start and suffix_end == end
+        return text[prefix_start:start] in ARABIC_PREFIXES and text[end:suffix_end] in ARABIC_SUFFIXES
+
+    def find(self, text: str) -> List[Tuple[int, int, str]]:
+        """
+        Find currency mentions in a text.
+
+        Args:
+            text: The text to analyze
+
+        Returns:
+            List of (start, end, currency_code) tuples ordered by position
+        """
+        text = fold_alef(text)
+        goto, fail, output = self._goto, self._fail, self._output
+        candidates = []
+        node = 0
+        for position, char in enumerate(text):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            for length, code, arabic in output[node]:
+                start = position + 1 - length
+                if self._on_boundary(text, start, position + 1, arabic):
+                    candidates.append((start, position + 1, code))
+
+        # Earliest first, longest first at the same position, then drop overlaps
+        candidates.sort(key=lambda mention: (mention[0], mention[0] - mention[1]))
+        mentions = []
+        last_end = -1
+        for mention in candidates:
+            if mention[0] >= last_end:
+                mentions.append(mention)
+                last_end = mention[1]
+        return mentions
+
+
+# Built once at import from the configured mapping
+_currency_matcher = CurrencyMatcher(config.CURRENCY_MAPPING)
+
+def find_currency_mentions(text: str) -> List[Tuple[int, int, str]]:
+    """
+    Find currency terms in a text, in the order they appear.
+    
+    Where terms overlap, the longest one wins (e.g., "جنيه استرليني" over "جنيه").
+    
+    Args:
+        text: The text to analyze
+        
+    Returns:
+        List of (start, end, currency_code) tuples ordered by position
+    """
+    return _currency_matcher.find(text)
+
 def identify_currencies_from_text(text: str) -> Dict[str, Optional[str]]:
     """
     Try to identify currencies mentioned in a text.
@@ -13,13 +162,12 @@ def identify_currencies_from_text(text: str) -> Dict[str, Optional[str]]:
     Returns:
         Dictionary with potential base and target currencies
     """
-    text_lower = text.lower()
     result = {"base_currency": None, "target_currency": None}
     
-    # Check for each currency in the mapping
+    # Distinct currencies in the order they appear in the text
     currencies_found = []
-    for term, code in config.CURRENCY_MAPPING.items():
-        if term in text_lower:
+    for _, _, code in find_currency_mentions(text):
+        if code not in currencies_found:
             currencies_found.append(code)
     
     # If we found at least two currencies, assume the first is base and second is target
@@ -32,6 +180,38 @@ def identify_currencies_from_text(text: str) -> Dict[str, Optional[str]]:
     
     return result
 
+# Normalization used for cache keys: letter variants, diacritics/tatweel, digits, punctuation
+_LETTER_VARIANTS = {
+    **_ALEF_VARIANTS,
+    **ARABIC_DIGITS,
+    **str.maketrans({
+        "ٱ": "ا", "ى": "ي", "ئ": "ي", "ؤ": "و", "ة": "ه",
+        "٫": ".", "٬": ",",
+    }),
+}
+_ARABIC_DIACRITICS = re.compile("[\u0610-\u061a\u064b-\u065f\u0670\u06d6-\u06ed\u0640]")
+_PUNCTUATION = re.compile(r"[؟?!،؛;:\"'«»()\[\]]|[.,](?!\d)")
+_WHITESPACE = re.compile(r"\s+")
+
+def normalize_text(text: str) -> str:
+    """
+    Normalize a message so trivially different phrasings compare equal.
+    
+    Lowercases, unifies Arabic letter variants, strips diacritics and tatweel,
+    converts Arabic-Indic digits, drops punctuation and collapses whitespace.
+    Decimal and thousands separators inside numbers are kept, so "100,5"
+    and "1005" stay different.
+    
+    Args:
+        text: The text to normalize
+        
+    Returns:
+        The normalized text
+    """
+    text = _ARABIC_DIACRITICS.sub("", text.lower()).translate(_LETTER_VARIANTS)
+    text = _PUNCTUATION.sub(" ", text)
+    return _WHITESPACE.sub(" ", text).strip()
+
 def format_currency(amount: float, currency_code: str) -> str:
     """
     Format a currency amount with the appropriate symbol.
@@ -1,19 +1,200 @@
 """Define application routes."""
 import asyncio
-from flask import Blueprint, render_template, request, jsonify
+import csv
+import json
+import math
+import mimetypes
+import re
+import secrets
+import time
+from datetime import date, datetime, timedelta, timezone
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from flask import Blueprint, Response, g, make_response, render_template, request, jsonify, send_from_directory, url_for
 from loguru import logger
 
-from app.modules.currency_service import convert_currency
-from app.modules.gemini_client import process_user_message
+import config
+from app.modules.admission import Rejected, chat_lane, client_address, convert_lane
+from app.modules.assets import asset_manifest
+from app.modules.currency_service import convert_batch, get_conversion, get_rate_history
+from app.modules.gemini_client import process_user_message, stream_user_message
+from app.modules.metrics import HTTP_DURATION, HTTP_REQUESTS, registry, server_timing_header, start_request_timing
+
+
+_SESSION_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{8,64}$")
+
+
+def client_session_id(data) -> str:
+    """
+    Get the chat session id sent by the client.
+
+    A client without a valid id gets a fresh one, and so a new conversation;
+    the id is returned with the response so the client can keep using it.
+    """
+    session_id = data.get("session_id")
+    if isinstance(session_id, str) and _SESSION_ID_PATTERN.match(session_id):
+        return session_id
+    return secrets.token_urlsafe(16)
+
+
+def rejection_body(rejection: Rejected) -> dict:
+    """Build the JSON body of a 429/503 admission rejection."""
+    return {"error": rejection.message, "reason": rejection.reason, "retry_after": rejection.retry_after}
+
+
+def format_sse(event) -> str:
+    """Format one chat stream event as a Server-Sent Events block."""
+    payload = json.dumps(event["data"], ensure_ascii=False)
+    return f"event: {event['event']}\ndata: {payload}\n\n"
+
+
+def _sse_events(events) -> Iterator[str]:
+    """
+    Drive an async generator of events on a private loop and format them as SSE.
+
+    Flask streams plain iterators, so each event is pulled from the async
+    generator with ``run_until_complete`` while the response is being written.
+    """
+    loop = asyncio.new_event_loop()
+    try:
+        while True:
+            try:
+                event = loop.run_until_complete(events.__anext__())
+            except StopAsyncIteration:
+                break
+            yield format_sse(event)
+    finally:
+        try:
+            loop.run_until_complete(events.aclose())
+            loop.run_until_complete(loop.shutdown_asyncgens())
+        finally:
+            loop.close()
+
+
+def _iter_lines(stream) -> Iterator[str]:
+    """Yield non-empty decoded lines from a request body stream."""
+    for raw_line in stream:
+        line = raw_line.decode("utf-8").strip()
+        if line:
+            yield line
+
+
+def parse_conversion_row(item) -> Tuple[float, str, str]:
+    """Turn one JSON object or CSV record into an (amount, base, target) row."""
+    amount = float(item.get("amount", 0))
+    base_currency = (item.get("base_currency") or "").strip().upper()
+    target_currency = (item.get("target_currency") or "").strip().upper()
+    if not amount or not base_currency or not target_currency:
+        raise ValueError("Missing required parameters")
+    if not math.isfinite(amount) or amount <= 0:
+        raise ValueError("Amount must be a positive number")
+    return amount, base_currency, target_currency
+
+
+def parse_date(value) -> Optional[date]:
+    """
+    Parse an optional ISO date (YYYY-MM-DD) from a request.
+
+    Raises:
+        ValueError: If a value is given but is not a valid date
+    """
+    if value in (None, ""):
+        return None
+    return date.fromisoformat(str(value))
+
+
+def _parse_batch_rows(items: Iterable) -> List[Tuple[float, str, str]]:
+    """Parse and validate batch rows, enforcing ``config.BATCH_MAX_ROWS``."""
+    rows = []
+    for number, item in enumerate(items, start=1):
+        if len(rows) >= config.BATCH_MAX_ROWS:
+            raise ValueError(f"Batch exceeds {config.BATCH_MAX_ROWS} rows")
+        try:
+            rows.append(parse_conversion_row(item))
+        except (TypeError, ValueError, AttributeError) as e:
+            raise ValueError(f"Invalid row {number}: {str(e)}")
+    return rows
+
+
+def _read_batch_request() -> List[Tuple[float, str, str]]:
+    """
+    Read batch rows from the request body.
+
+    JSON bodies may be an array of rows or an object with a "rows" array.
+    CSV (with a header line) and NDJSON bodies are read line by line from the stream.
+    """
+    mimetype = request.mimetype
+    if mimetype == "text/csv":
+        return _parse_batch_rows(csv.DictReader(_iter_lines(request.stream)))
+    if mimetype in ("application/x-ndjson", "application/ndjson", "application/jsonl"):
+        return _parse_batch_rows(json.loads(line) for line in _iter_lines(request.stream))
+    
+    data = request.get_json(silent=True)
+    if isinstance(data, dict):
+        data = data.get("rows")
+    if not isinstance(data, list):
+        raise ValueError("Expected a JSON array of rows")
+    return _parse_batch_rows(data)
 
 
 def register_routes(app):
     """Register routes with the Flask application."""
     
+    def client() -> str:
+        return client_address(request.remote_addr, request.headers.get("X-Forwarded-For"))
+    
+    def rejected(rejection: Rejected):
+        return jsonify(rejection_body(rejection)), rejection.status, {"Retry-After": str(rejection.retry_after)}
+    
+    @app.before_request
+    def start_timing():
+        """Start collecting the request's Server-Timing stages."""
+        g.request_started = time.perf_counter()
+        g.request_stages = start_request_timing()
+    
+    @app.after_request
+    def record_timing(response):
+        """Count the request and attach its Server-Timing breakdown."""
+        elapsed = time.perf_counter() - g.request_started
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        HTTP_REQUESTS.inc(route=route, method=request.method, status=response.status_code)
+        HTTP_DURATION.observe(elapsed, route=route)
+        response.headers["Server-Timing"] = server_timing_header(g.request_stages, elapsed)
+        return response
+    
+    @app.route("/metrics", methods=["GET"])
+    def metrics():
+        """Expose metrics in the Prometheus text format."""
+        return Response(registry.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
+    
+    @app.template_global()
+    def asset_url(path: str) -> str:
+        """URL of a static file: its fingerprinted build if there is one, else the plain file."""
+        hashed = asset_manifest.lookup(path)
+        if hashed is None:
+            return url_for("static", filename=path)
+        return url_for("assets", filename=hashed)
+    
+    @app.route("/assets/<path:filename>")
+    def assets(filename):
+        """Serve a fingerprinted asset, precompressed if the client accepts it, cached for good."""
+        if not asset_manifest.serves(filename):
+            return jsonify({"error": "Not found"}), 404
+        name, encoding = asset_manifest.negotiate(filename, request.headers.get("Accept-Encoding", ""))
+        response = send_from_directory(asset_manifest.output, name, mimetype=mimetypes.guess_type(filename)[0])
+        if encoding:
+            response.headers["Content-Encoding"] = encoding
+        response.headers["Vary"] = "Accept-Encoding"
+        response.headers["Cache-Control"] = f"public, max-age={config.ASSET_MAX_AGE}, immutable"
+        return response
+    
     @app.route("/")
     def index():
-        """Render the main chat interface."""
-        return render_template("index.html")
+        """Render the main chat interface, answering 304 if the client's copy is current."""
+        response = make_response(render_template("index.html"))
+        response.add_etag()
+        response.headers["Cache-Control"] = "no-cache"  # always revalidate, usually with a 304
+        return response.make_conditional(request)
     
     @app.route("/api/chat", methods=["POST"])
     async def chat():
@@ -28,42 +209,148 @@ def register_routes(app):
             logger.info(f"Received chat message: {user_message}")
             
             # Process the message with Gemini
-            response = await process_user_message(user_message)
+            session_id = client_session_id(data)
+            async with chat_lane.admit(client()):
+                response = await process_user_message(user_message, session_id)
             
-            return jsonify({"response": response})
+            return jsonify({"response": response, "session_id": session_id})
             
+        except Rejected as e:
+            return rejected(e)
         except Exception as e:
             logger.error(f"Error processing chat: {str(e)}")
             return jsonify({"error": f"Failed to process message: {str(e)}"}), 500
     
+    @app.route("/api/chat/stream", methods=["POST"])
+    def chat_stream():
+        """Process a chat message and stream the response as Server-Sent Events."""
+        data = request.get_json(silent=True) or {}
+        user_message = data.get("message", "")
+        
+        if not user_message:
+            return jsonify({"error": "No message provided"}), 400
+        
+        # The lane slot is held until the stream is closed
+        try:
+            asyncio.run(chat_lane.enter(client()))
+        except Rejected as e:
+            return rejected(e)
+        started = time.monotonic()
+        
+        logger.info(f"Received chat message (stream): {user_message}")
+        
+        session_id = client_session_id(data)
+        events = stream_user_message(user_message, session_id)
+        response = Response(
+            _sse_events(events),
+            mimetype="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no", "X-Session-Id": session_id}
+        )
+        response.call_on_close(lambda: chat_lane.leave(time.monotonic() - started))
+        return response
+    
     @app.route("/api/convert", methods=["POST"])
     async def convert():
         """Convert currency directly from API."""
         try:
             data = request.json
-            amount = float(data.get("amount", 0))
-            base_currency = data.get("base_currency", "").upper()
-            target_currency = data.get("target_currency", "").upper()
-            
-            if not amount or not base_currency or not target_currency:
-                return jsonify({"error": "Missing required parameters"}), 400
+            try:
+                amount, base_currency, target_currency = parse_conversion_row(data)
+            except (TypeError, ValueError, AttributeError) as e:
+                return jsonify({"error": str(e)}), 400
+            try:
+                as_of = parse_date(data.get("date"))
+            except ValueError:
+                return jsonify({"error": "Invalid date, expected YYYY-MM-DD"}), 400
             
             logger.info(f"Converting {amount} {base_currency} to {target_currency}")
             
             # Perform the conversion
-            result = await convert_currency(amount, base_currency, target_currency)
+            async with convert_lane.admit(client()):
+                conversion = await get_conversion(amount, base_currency, target_currency, as_of=as_of)
             
             return jsonify({
                 "amount": amount,
                 "base_currency": base_currency,
                 "target_currency": target_currency,
-                "result": result
+                "date": as_of.isoformat() if as_of else None,
+                "result": conversion["result"],
+                "rate_timestamp": conversion["rate_timestamp"],
+                "stale": conversion["stale"]
             })
             
+        except Rejected as e:
+            return rejected(e)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
         except Exception as e:
             logger.error(f"Error converting currency: {str(e)}")
             return jsonify({"error": f"Failed to convert currency: {str(e)}"}), 500
     
+    @app.route("/api/convert/batch", methods=["POST"])
+    async def convert_batch_route():
+        """Convert many rows in one request, fetching each base table once."""
+        try:
+            rows = _read_batch_request()
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        
+        if not rows:
+            return jsonify({"error": "No rows provided"}), 400
+        
+        try:
+            async with convert_lane.admit(client()):
+                results = await convert_batch(rows)
+            return jsonify({"count": len(results), "results": results})
+            
+        except Rejected as e:
+            return rejected(e)
+        except Exception as e:
+            logger.error(f"Error converting batch: {str(e)}")
+            return jsonify({"error": f"Failed to convert batch: {str(e)}"}), 500
+    
+    @app.route("/api/rates/history", methods=["GET"])
+    async def rate_history_route():
+        """
+        Return the daily rate of a currency pair over a date range.
+        
+        Query parameters: base, target, and either start/end (YYYY-MM-DD,
+        end defaults to today) or days (default 30, ending at end).
+        """
+        base_currency = request.args.get("base", "").strip().upper()
+        target_currency = request.args.get("target", "").strip().upper()
+        if not base_currency or not target_currency:
+            return jsonify({"error": "Missing required parameters"}), 400
+        try:
+            end = parse_date(request.args.get("end")) or datetime.now(timezone.utc).date()
+            start = parse_date(request.args.get("start"))
+            if start is None:
+                days = int(request.args.get("days", 30))
+                if days < 1:
+                    raise ValueError
+                start = end - timedelta(days=days - 1)
+        except ValueError:
+            return jsonify({"error": "Invalid date range, expected YYYY-MM-DD dates or a positive days count"}), 400
+        
+        try:
+            async with convert_lane.admit(client()):
+                rates = await get_rate_history(base_currency, target_currency, start, end)
+        except Rejected as e:
+            return rejected(e)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        except Exception as e:
+            logger.error(f"Error getting rate history: {str(e)}")
+            return jsonify({"error": f"Failed to get rate history: {str(e)}"}), 500
+        
+        return jsonify({
+            "base_currency": base_currency,
+            "target_currency": target_currency,
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "rates": rates
+        })
+    
     @app.errorhandler(404)
     def page_not_found(e):
         """Handle 404 errors."""
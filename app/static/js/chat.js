@@ -5,6 +5,13 @@ const chatMessages = document.getElementById('chatMessages');
 const sendButton = document.getElementById('sendButton');
 const currentYearSpan = document.getElementById('currentYear');
 
+// Per-tab chat session id so each visitor gets their own conversation
+const sessionId = sessionStorage.getItem('chatSessionId') || (() => {
+    const id = (crypto.randomUUID ? crypto.randomUUID() : `${Date.now()}-${Math.random().toString(36).slice(2)}`).replace(/[^A-Za-z0-9_-]/g, '');
+    sessionStorage.setItem('chatSessionId', id);
+    return id;
+})();
+
 // Update current year in footer
 if (currentYearSpan) {
     currentYearSpan.textContent = new Date().getFullYear();
@@ -39,7 +46,8 @@ function displayMessage(message, messageType) {
 function displayConversionResult(data) {
     const messageElement = document.createElement('div');
     messageElement.classList.add('message', 'bot-message');
-    messageElement.innerHTML = `<div class="message-content conversion-result"><p>نتيجة التحويل: <span class="amount">${formatCurrency(data.amount, data.base_currency)}</span> = <span class="amount">${formatCurrency(data.result, data.target_currency)}</span></p></div>`;
+    const staleNote = data.stale ? `<p class="stale-note">الأسعار بتاريخ ${data.rate_timestamp.slice(0, 10)} لتعذر تحديثها حالياً</p>` : '';
+    messageElement.innerHTML = `<div class="message-content conversion-result"><p>نتيجة التحويل: <span class="amount">${formatCurrency(data.amount, data.base_currency)}</span> = <span class="amount">${formatCurrency(data.result, data.target_currency)}</span></p>${staleNote}</div>`;
     chatMessages.appendChild(messageElement);
     chatMessages.scrollTop = chatMessages.scrollHeight;
 }
@@ -56,12 +64,75 @@ async function handleChatResponse(response) {
     
     // Check the type of the response
     if (responseData.response.type === 'conversion') {
-        displayConversionResult(responseData.response.data);
+        (responseData.response.conversions || [responseData.response.data]).forEach(displayConversionResult);
     } else {
         displayMessage(responseData.response.text, 'bot');
     }
 }
 
+// Function to parse one Server-Sent Events block into {event, data}
+function parseSseBlock(block) {
+    let event = 'message';
+    const dataLines = [];
+    block.split('\n').forEach(line => {
+        if (line.startsWith('event:')) {
+            event = line.slice(6).trim();
+        } else if (line.startsWith('data:')) {
+            dataLines.push(line.slice(5).trim());
+        }
+    });
+    return { event, data: dataLines.length ? JSON.parse(dataLines.join('\n')) : {} };
+}
+
+// Function to handle a streamed chat response, rendering events as they arrive
+async function handleChatStream(response, loadingDots) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let textElement = null;
+
+    const removeLoadingDots = () => {
+        if (loadingDots.parentNode) {
+            chatMessages.removeChild(loadingDots);
+        }
+    };
+
+    const handleEvent = ({ event, data }) => {
+        if (event === 'conversion') {
+            removeLoadingDots();
+            displayConversionResult(data);
+        } else if (event === 'chunk') {
+            removeLoadingDots();
+            if (!textElement) {
+                const messageElement = createMessageElement('', 'bot');
+                chatMessages.appendChild(messageElement);
+                textElement = messageElement.querySelector('p');
+            }
+            textElement.textContent += data.text;
+            chatMessages.scrollTop = chatMessages.scrollHeight;
+        } else if (event === 'error') {
+            removeLoadingDots();
+            displayMessage(data.text || 'حدث خطأ أثناء معالجة رسالتك.', 'bot');
+        }
+    };
+
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) {
+            break;
+        }
+        buffer += decoder.decode(value, { stream: true });
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+            const block = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+            if (block.trim()) {
+                handleEvent(parseSseBlock(block));
+            }
+        }
+    }
+}
+
 // Event listener for the chat form
 chatForm.addEventListener('submit', async (event) => {
     event.preventDefault();
@@ -73,26 +144,44 @@ chatForm.addEventListener('submit', async (event) => {
     
     // Show loading animation
     const loadingDots = showLoadingDots();
+    const requestBody = JSON.stringify({ message: message, session_id: sessionId });
 
     // Send the message to the server
     try {
-        const response = await fetch('/api/chat', {
+        const response = await fetch('/api/chat/stream', {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json',
+                'Accept': 'text/event-stream',
             },
-            body: JSON.stringify({ message: message }),
+            body: requestBody,
         });
         
-        // Handle the response
-        await handleChatResponse(response);
+        // Render streamed events, or fall back to the JSON endpoint
+        if (response.ok && response.body && response.body.getReader) {
+            await handleChatStream(response, loadingDots);
+        } else if (response.status === 429 || response.status === 503) {
+            // Rate limited or overloaded: show the server's message instead of retrying
+            await handleChatResponse(response);
+        } else {
+            const fallback = await fetch('/api/chat', {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json',
+                },
+                body: requestBody,
+            });
+            await handleChatResponse(fallback);
+        }
 
     } catch (error) {
         console.error('Error:', error);
         displayMessage('حدث خطأ أثناء معالجة رسالتك.', 'bot');
     } finally {
         // Remove loading animation
-        chatMessages.removeChild(loadingDots);
+        if (loadingDots.parentNode) {
+            chatMessages.removeChild(loadingDots);
+        }
     }
 });
 
@@ -0,0 +1 @@
+"""Performance benchmarks for the Currency Converter application."""
@@ -0,0 +1,75 @@
+"""
+Microbenchmark: currency identification with the Aho-Corasick matcher vs. the old linear scan.
+
+Run from the project root:
+    python -m benchmarks.bench_currency_matcher
+"""
+import itertools
+import string
+import timeit
+from typing import Dict, Optional
+
+import config
+from app.modules.utils import CurrencyMatcher, identify_currencies_from_text
+
+MESSAGES = [
+    "حول 100 دولار إلى يورو",
+    "كم يساوي 100 جنيه مصري بالدولار؟",
+    "معايا 50 دولار، بيساووا كام بالجنيه؟",
+    "حول 200 جنيه استرليني إلى جنيه مصري من فضلك وأخبرني بسعر الصرف الحالي",
+    "How much is 50 egyptian pounds worth in US dollars?",
+]
+
+
+def legacy_identify(text: str, mapping: Dict[str, str]) -> Dict[str, Optional[str]]:
+    """The previous implementation: one substring scan per mapping term."""
+    text_lower = text.lower()
+    result = {"base_currency": None, "target_currency": None}
+    currencies_found = []
+    for term, code in mapping.items():
+        if term in text_lower:
+            currencies_found.append(code)
+    if len(currencies_found) >= 2:
+        result["base_currency"] = currencies_found[0]
+        result["target_currency"] = currencies_found[1]
+    elif len(currencies_found) == 1:
+        result["base_currency"] = currencies_found[0]
+    return result
+
+
+def synthetic_mapping(size: int) -> Dict[str, str]:
+    """Grow the real mapping with synthetic terms to approximate a full ISO-4217 table."""
+    mapping = dict(config.CURRENCY_MAPPING)
+    for letters in itertools.islice(itertools.product(string.ascii_lowercase, repeat=3), size):
+        code = "".join(letters)
+        mapping[code] = code.upper()
+        mapping[f"{code} money"] = code.upper()
+        mapping[f"عملة {code}"] = code.upper()
+    return mapping
+
+
+def bench(label: str, func, number: int) -> float:
+    """Time ``func`` over every message and print microseconds per message."""
+    seconds = timeit.timeit(lambda: [func(message) for message in MESSAGES], number=number)
+    per_message = seconds / (number * len(MESSAGES)) * 1e6
+    print(f"{label:<40} {per_message:10.2f} µs/message")
+    return per_message
+
+
+def main(number: int = 2000) -> None:
+    """Run the benchmark for the configured mapping and a large synthetic one."""
+    print(f"Configured mapping: {len(config.CURRENCY_MAPPING)} terms")
+    legacy = bench("legacy linear scan", lambda text: legacy_identify(text, config.CURRENCY_MAPPING), number)
+    matcher = bench("aho-corasick matcher", identify_currencies_from_text, number)
+    print(f"{'speedup':<40} {legacy / matcher:10.2f}x\n")
+
+    large = synthetic_mapping(1000)
+    large_matcher = CurrencyMatcher(large)
+    print(f"Synthetic mapping: {len(large)} terms")
+    legacy = bench("legacy linear scan", lambda text: legacy_identify(text, large), number // 10)
+    matcher = bench("aho-corasick matcher", large_matcher.find, number // 10)
+    print(f"{'speedup':<40} {legacy / matcher:10.2f}x")
+
+
+if __name__ == "__main__":
+    main()
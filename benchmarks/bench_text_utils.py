@@ -0,0 +1,55 @@
+"""
+Microbenchmarks for the per-message text helpers.
+
+Times ``identify_currencies_from_text`` on short and long chat messages and
+``format_currency`` across symbol placements and magnitudes, so a slower
+matcher or formatter shows up before it reaches the request path.
+
+Run from the project root:
+    python -m benchmarks.bench_text_utils
+"""
+import timeit
+from typing import Callable, List, Tuple
+
+from app.modules.utils import format_currency, identify_currencies_from_text
+
+MESSAGES = [
+    "حول 100 دولار إلى يورو",
+    "كم يساوي 100 جنيه مصري بالدولار؟",
+    "حول 200 جنيه استرليني إلى جنيه مصري من فضلك وأخبرني بسعر الصرف الحالي",
+    "How much is 50 egyptian pounds worth in US dollars?",
+    "مرحبا، كيف حالك اليوم؟",
+]
+
+# A long message with no currency terms: the matcher's worst case is scanning all of it
+LONG_MESSAGE = "أريد أن أعرف المزيد عن أسعار الصرف في الأسواق العالمية هذا الأسبوع " * 40
+
+AMOUNTS: List[Tuple[float, str]] = [
+    (1234.5, "USD"),
+    (98765432.1, "EGP"),
+    (0.004, "EUR"),
+    (1500000, "JPY"),
+    (42, "XYZ"),
+]
+
+
+def bench(label: str, func: Callable[[], object], calls: int, number: int) -> float:
+    """Time ``func`` and print microseconds per call, where one run of ``func`` makes ``calls`` calls."""
+    seconds = min(timeit.repeat(func, number=number, repeat=3))
+    per_call = seconds / (number * calls) * 1e6
+    print(f"{label:<40} {per_call:10.2f} µs/call")
+    return per_call
+
+
+def main(number: int = 5000) -> None:
+    """Run every microbenchmark."""
+    bench("identify_currencies (chat messages)",
+          lambda: [identify_currencies_from_text(message) for message in MESSAGES], len(MESSAGES), number)
+    bench(f"identify_currencies ({len(LONG_MESSAGE)} chars)",
+          lambda: identify_currencies_from_text(LONG_MESSAGE), 1, number // 10)
+    bench("format_currency",
+          lambda: [format_currency(amount, code) for amount, code in AMOUNTS], len(AMOUNTS), number)
+
+
+if __name__ == "__main__":
+    main()
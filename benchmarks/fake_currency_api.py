@@ -0,0 +1,163 @@
+"""
+Local stand-in for the currency-API mirrors.
+
+Serves ``/v1/currencies/{base}.json`` and the dated
+``/{date}/v1/currencies/{base}.json`` in the upstream shape
+(``{"date": ..., "<base>": {"<code>": rate, ...}}``) from a deterministic
+rate table that drifts by date, with a configurable delay per response.
+
+Run standalone from the project root:
+    python -m benchmarks.fake_currency_api --port 8081 --latency 0.05
+
+then point the app at it:
+    CURRENCY_API_URLS=http://127.0.0.1:8081/v1/currencies/{base}.json
+    CURRENCY_HISTORY_URLS=http://127.0.0.1:8081/{date}/v1/currencies/{base}.json
+"""
+import argparse
+import json
+import re
+import threading
+import time
+import zlib
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+
+import config
+
+_PATH_PATTERN = re.compile(r"^(?:/(\d{4}-\d{2}-\d{2}))?/v1/currencies/([a-z]{3})\.json$")
+
+# Real codes the app and its shortcut buttons use, on top of the configured mapping
+COMMON_CODES = [
+    "usd", "eur", "gbp", "egp", "sar", "aed", "kwd", "qar", "bhd", "omr", "jod",
+    "jpy", "cny", "cad", "aud", "chf", "inr", "try", "mad", "tnd", "dzd", "lbp",
+]
+
+
+def usd_values(extra_codes: int = 150) -> Dict[str, float]:
+    """
+    Build a deterministic USD rate for every configured and some synthetic currencies.
+
+    Args:
+        extra_codes: Number of synthetic codes added to approximate the upstream table size
+
+    Returns:
+        Mapping of lowercase currency code to units per US dollar
+    """
+    codes = set(COMMON_CODES) | {code.lower() for code in config.CURRENCY_MAPPING.values()}
+    codes.update(f"x{chr(97 + index // 26 % 26)}{chr(97 + index % 26)}" for index in range(extra_codes))
+    values = {code: 0.1 + (zlib.crc32(code.encode()) % 100000) / 100.0 for code in sorted(codes)}
+    values["usd"] = 1.0
+    return values
+
+
+class FakeCurrencyAPI:
+    """Threaded HTTP server answering like the upstream currency API."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0):
+        """
+        Initialize the server; call ``start`` to serve in the background.
+
+        Args:
+            host: Address to bind
+            port: Port to bind (0 picks a free one)
+            latency: Seconds to wait before each response
+        """
+        self.latency = latency
+        self.values = usd_values()
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url_template(self) -> str:
+        """Mirror URL with a ``{base}`` placeholder, as used by ``config.CURRENCY_API_URLS``."""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1/currencies/{{base}}.json"
+
+    @property
+    def history_url_template(self) -> str:
+        """Dated mirror URL, as used by ``config.CURRENCY_HISTORY_URLS``."""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/{{date}}/v1/currencies/{{base}}.json"
+
+    def table(self, base: str, day: Optional[date] = None) -> Optional[Dict[str, object]]:
+        """Build the response document for a base currency and date, or None if either is unknown."""
+        day = day or date.today()
+        base_value = self.values.get(base)
+        if base_value is None or day > date.today():
+            return None
+        # Each currency drifts by a small, date-dependent amount
+        drift = {code: 1 + ((zlib.crc32(code.encode()) + day.toordinal() * 7919) % 200 - 100) / 10000
+                 for code in self.values}
+        rates = {code: value * drift[code] / (base_value * drift[base]) for code, value in self.values.items()}
+        return {"date": day.isoformat(), base: rates}
+
+    def _handler(self):
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                with api._lock:
+                    api.requests += 1
+                if api.latency:
+                    time.sleep(api.latency)
+                match = _PATH_PATTERN.match(self.path)
+                try:
+                    day = date.fromisoformat(match.group(1)) if match and match.group(1) else None
+                    document = api.table(match.group(2), day) if match else None
+                except ValueError:
+                    document = None
+                if document is None:
+                    self.send_error(404)
+                    return
+                body = json.dumps(document).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # keep benchmark output readable
+
+        return Handler
+
+    def serve_forever(self) -> None:
+        """Serve in the calling thread until interrupted."""
+        try:
+            self._server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self._server.server_close()
+
+    def start(self) -> "FakeCurrencyAPI":
+        """Serve in a daemon thread and return self."""
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-currency-api", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stop serving and close the socket."""
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def main() -> None:
+    """Serve the fake API in the foreground."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds per response")
+    args = parser.parse_args()
+
+    api = FakeCurrencyAPI(args.host, args.port, args.latency)
+    print(f"Serving {api.url_template} ({len(api.values)} currencies)")
+    api.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+"""
+Offline load test for /api/convert and /api/chat.
+
+Starts the fake currency API and the ASGI app (with the stub Gemini model)
+in this process, then drives the endpoints over HTTP at a fixed concurrency
+and reports latency percentiles and throughput. Nothing leaves the machine.
+
+Results go to stdout and the app's logs to stderr. Run from the project root:
+    python -m benchmarks.load_test --concurrency 50 --requests 2000
+    python -m benchmarks.load_test --endpoints chat --gemini-latency 0.8 --no-fast-path
+"""
+import argparse
+import asyncio
+import os
+import socket
+import tempfile
+import threading
+import time
+from typing import Callable, Dict, List, Tuple
+
+CONVERT_PAYLOADS = [
+    {"amount": 100, "base_currency": "USD", "target_currency": "EGP"},
+    {"amount": 250, "base_currency": "EUR", "target_currency": "SAR"},
+    {"amount": 1000, "base_currency": "EGP", "target_currency": "GBP"},
+    {"amount": 75.5, "base_currency": "AED", "target_currency": "KWD"},
+]
+
+# "{amount}" varies per request so repeated messages do not all hit the intent cache
+CHAT_MESSAGES = [
+    "حول {amount} دولار إلى يورو",
+    "كم يساوي {amount} جنيه مصري بالدولار؟",
+    "معايا {amount} دولار، بيساووا كام بالجنيه؟",
+    "حول {amount} دولار إلى يورو وجنيه استرليني وجنيه مصري",
+    "How much is {amount} euros worth in US dollars?",
+]
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def configure_environment(api_port: int, fast_path: bool) -> None:
+    """
+    Point the app at the fake API and keep its state out of the working tree.
+
+    Must run before ``config`` is imported, since it reads the environment once.
+    """
+    scratch = tempfile.mkdtemp(prefix="currency-bench-")
+    os.environ["CURRENCY_API_URLS"] = f"http://127.0.0.1:{api_port}/v1/currencies/{{base}}.json"
+    os.environ["CURRENCY_HISTORY_URLS"] = f"http://127.0.0.1:{api_port}/{{date}}/v1/currencies/{{base}}.json"
+    os.environ["DATA_FOLDER"] = scratch
+    os.environ["RATE_SHARED_FOLDER"] = os.path.join(scratch, "shared")
+    os.environ["LOG_FOLDER"] = os.path.join(scratch, "logs")
+    os.environ["ASSET_BUILD_FOLDER"] = os.path.join(scratch, "assets")
+    os.environ["FAST_PATH_ENABLED"] = "true" if fast_path else "false"
+    os.environ.setdefault("FLASK_ENV", "production")  # INFO logging, as deployed
+    # Every simulated user shares one address, so only the global lane limits apply
+    os.environ.setdefault("CHAT_RATE_LIMIT", "0")
+    os.environ.setdefault("CONVERT_RATE_LIMIT", "0")
+
+
+async def run_load(url: str, make_payload: Callable[[int], Dict], total: int,
+                   concurrency: int) -> Tuple[List[float], int, int, float]:
+    """
+    POST ``total`` requests to a URL from ``concurrency`` concurrent clients.
+
+    Args:
+        url: Endpoint to call
+        make_payload: Builds the JSON body for the n-th request
+        total: Number of requests to send
+        concurrency: Number of requests in flight at once
+
+    Returns:
+        (latencies of successful requests in seconds, error count,
+        count shed by admission control with 429/503, wall time in seconds)
+    """
+    import aiohttp
+
+    latencies: List[float] = []
+    errors = shed = 0
+    next_index = 0
+
+    async def client(session: aiohttp.ClientSession) -> None:
+        nonlocal errors, shed, next_index
+        while next_index < total:
+            index = next_index
+            next_index += 1
+            started = time.perf_counter()
+            try:
+                async with session.post(url, json=make_payload(index)) as response:
+                    await response.read()
+                    status = response.status
+            except aiohttp.ClientError:
+                status = None
+            if status == 200:
+                latencies.append(time.perf_counter() - started)
+            elif status in (429, 503):
+                shed += 1
+            else:
+                errors += 1
+
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    timeout = aiohttp.ClientTimeout(total=120)
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        started = time.perf_counter()
+        await asyncio.gather(*(client(session) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    return latencies, errors, shed, elapsed
+
+
+def report(name: str, latencies: List[float], errors: int, shed: int, elapsed: float) -> None:
+    """Print one result row."""
+    latencies = sorted(latencies)
+    ms = [percentile(latencies, fraction) * 1000 for fraction in (0.5, 0.95, 0.99)]
+    maximum = latencies[-1] * 1000 if latencies else 0.0
+    rps = len(latencies) / elapsed if elapsed else 0.0
+    print(f"{name:<14} {len(latencies):>7} {errors:>6} {shed:>6} {rps:>9.1f} "
+          f"{ms[0]:>9.1f} {ms[1]:>9.1f} {ms[2]:>9.1f} {maximum:>9.1f}")
+
+
+def start_app(port: int) -> None:
+    """Serve the ASGI app with uvicorn in a daemon thread and wait until it accepts connections."""
+    import uvicorn
+    from app.asgi import application
+
+    server = uvicorn.Server(uvicorn.Config(application, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, name="uvicorn", daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+
+
+def main() -> None:
+    """Run the load test and print a table of results."""
+    parser = argparse.ArgumentParser(description="Offline load test for /api/convert and /api/chat.")
+    parser.add_argument("--endpoints", default="convert,chat", help="comma-separated: convert, chat")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=500, help="requests per endpoint")
+    parser.add_argument("--gemini-latency", type=float, default=0.5, help="seconds per stub Gemini call")
+    parser.add_argument("--api-latency", type=float, default=0.05, help="seconds per fake currency-API response")
+    parser.add_argument("--no-fast-path", action="store_true", help="send every chat message to the stub Gemini")
+    parser.add_argument("--sessions", type=int, default=50, help="distinct chat session ids")
+    parser.add_argument("--amounts", type=int, default=1000, help="distinct amounts used in chat messages")
+    args = parser.parse_args()
+
+    api_port, app_port = _free_port(), _free_port()
+    configure_environment(api_port, fast_path=not args.no_fast_path)
+
+    from benchmarks import stub_gemini
+    from benchmarks.fake_currency_api import FakeCurrencyAPI
+
+    api = FakeCurrencyAPI(port=api_port, latency=args.api_latency).start()
+    model = stub_gemini.install(latency=args.gemini_latency)
+    start_app(app_port)
+    base_url = f"http://127.0.0.1:{app_port}"
+
+    payloads = {
+        "convert": ("/api/convert", lambda n: CONVERT_PAYLOADS[n % len(CONVERT_PAYLOADS)]),
+        "chat": ("/api/chat", lambda n: {
+            "message": CHAT_MESSAGES[n % len(CHAT_MESSAGES)].format(amount=10 + n % args.amounts),
+            "session_id": f"bench-session-{n % args.sessions:04d}",
+        }),
+    }
+
+    print(f"concurrency={args.concurrency} requests={args.requests} gemini_latency={args.gemini_latency}s "
+          f"api_latency={args.api_latency}s fast_path={not args.no_fast_path}")
+    print(f"{'endpoint':<14} {'ok':>7} {'errors':>6} {'shed':>6} {'req/s':>9} "
+          f"{'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for name in args.endpoints.split(","):
+        path, make_payload = payloads[name.strip()]
+        latencies, errors, shed, elapsed = asyncio.run(
+            run_load(base_url + path, make_payload, args.requests, args.concurrency)
+        )
+        report(path, latencies, errors, shed, elapsed)
+    print(f"\nupstream calls: currency API={api.requests}, Gemini={model.calls}")
+    print(f"app state and logs: {os.environ['DATA_FOLDER']}")
+    api.stop()
+
+
+if __name__ == "__main__":
+    main()
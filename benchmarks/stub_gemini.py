@@ -0,0 +1,178 @@
+"""
+Offline stand-in for the Gemini model used by the load test.
+
+The stub answers like ``genai.GenerativeModel``: a message naming two
+currencies gets a ``convert_currency`` function call, three or more get a
+``convert_currency_batch`` call, and the follow-up prompt that carries the
+conversion results gets a short text reply. Every call sleeps for a
+configurable latency so queueing in front of Gemini shows up in the numbers.
+"""
+import re
+import threading
+import time
+from types import SimpleNamespace
+from typing import Any, Dict, Iterator, List
+
+from app.modules import gemini_client
+from app.modules.utils import find_currency_mentions
+
+_AMOUNT_PATTERN = re.compile(r"\d+(?:\.\d+)?")
+
+
+class StubResponse:
+    """A ``GenerateContentResponse`` look-alike holding one candidate."""
+
+    def __init__(self, parts: List[SimpleNamespace]):
+        """
+        Initialize the response.
+
+        Args:
+            parts: Parts with ``text`` and ``function_call`` attributes
+        """
+        self.parts = parts
+        self.candidates = [SimpleNamespace(content=SimpleNamespace(role="model", parts=parts))]
+
+    @property
+    def text(self) -> str:
+        """Concatenated text parts; raises ValueError like the real client when there are none."""
+        texts = [part.text for part in self.parts if part.text]
+        if not texts:
+            raise ValueError("The response has no text parts.")
+        return "".join(texts)
+
+
+def _text_part(text: str) -> SimpleNamespace:
+    return SimpleNamespace(text=text, function_call=None)
+
+
+def _call_part(name: str, args: Dict[str, Any]) -> SimpleNamespace:
+    return SimpleNamespace(text="", function_call=SimpleNamespace(name=name, args=args))
+
+
+def reply_for(message: str) -> StubResponse:
+    """
+    Build the reply Gemini would give to a standalone message.
+
+    Args:
+        message: The user's message
+
+    Returns:
+        A function-call response when the message names two or more currencies, else text
+    """
+    codes: List[str] = []
+    for _, _, code in find_currency_mentions(message):
+        if code not in codes:
+            codes.append(code)
+    amount_match = _AMOUNT_PATTERN.search(message)
+    amount = float(amount_match.group()) if amount_match else 1.0
+
+    if len(codes) == 2:
+        args = {"amount": amount, "base_currency": codes[0], "target_currency": codes[1]}
+        return StubResponse([_call_part("convert_currency", args)])
+    if len(codes) > 2:
+        args = {"amount": amount, "base_currency": codes[0], "target_currencies": codes[1:]}
+        return StubResponse([_call_part("convert_currency_batch", args)])
+    return StubResponse([_text_part("يمكنني مساعدتك في تحويل العملات. ما المبلغ والعملات التي تريدها؟")])
+
+
+class StubChat:
+    """A ``ChatSession`` look-alike with a history and ``rewind``."""
+
+    def __init__(self, model: "StubModel"):
+        """
+        Initialize an empty chat.
+
+        Args:
+            model: The model supplying latency and reply settings
+        """
+        self.model = model
+        self.history: List[SimpleNamespace] = []
+        self._awaiting_results = False
+
+    def send_message(self, content: str, stream: bool = False) -> Any:
+        """
+        Answer a message after the model's latency.
+
+        Args:
+            content: The message or the prompt carrying conversion results
+            stream: Return an iterator of chunks instead of one response
+
+        Returns:
+            A StubResponse, or an iterator of StubResponse chunks when streaming
+        """
+        self.model.wait()
+        if self._awaiting_results:
+            response = StubResponse([_text_part(self.model.phrasing)])
+        else:
+            response = reply_for(content)
+        self._awaiting_results = bool(response.candidates[0].content.parts[0].function_call)
+        self.history.append(SimpleNamespace(role="user", parts=[_text_part(content)]))
+        self.history.append(response.candidates[0].content)
+        return self._chunks(response.text) if stream else response
+
+    def _chunks(self, text: str) -> Iterator[StubResponse]:
+        words = text.split(" ")
+        step = max(1, len(words) // self.model.stream_chunks)
+        for start in range(0, len(words), step):
+            if start:
+                time.sleep(self.model.chunk_delay)
+            yield StubResponse([_text_part(" ".join(words[start:start + step]) + " ")])
+
+    def rewind(self) -> None:
+        """Drop the last exchange."""
+        del self.history[-2:]
+        self._awaiting_results = False
+
+
+class StubModel:
+    """A ``GenerativeModel`` look-alike with configurable latency."""
+
+    def __init__(self, latency: float = 0.5, stream_chunks: int = 4, chunk_delay: float = 0.05):
+        """
+        Initialize the model.
+
+        Args:
+            latency: Seconds each call takes before answering
+            stream_chunks: Number of chunks a streamed reply is split into
+            chunk_delay: Seconds between streamed chunks
+        """
+        self.latency = latency
+        self.stream_chunks = stream_chunks
+        self.chunk_delay = chunk_delay
+        self.phrasing = "تم تحويل المبلغ بنجاح حسب أحدث سعر صرف متاح."
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def wait(self) -> None:
+        """Count a call and sleep for the configured latency."""
+        with self._lock:
+            self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def start_chat(self) -> StubChat:
+        """Start a new chat."""
+        return StubChat(self)
+
+    def generate_content(self, content: str) -> StubResponse:
+        """Answer a one-off request."""
+        self.wait()
+        return reply_for(content)
+
+
+def install(latency: float = 0.5, **kwargs) -> StubModel:
+    """
+    Make the app use a stub model instead of calling Gemini.
+
+    Must be called before the first chat session is created.
+
+    Args:
+        latency: Seconds each call takes
+        **kwargs: Further ``StubModel`` options
+
+    Returns:
+        The installed model
+    """
+    model = StubModel(latency, **kwargs)
+    gemini_client._gemini_model = model
+    return model
@@ -12,14 +12,103 @@ BASE_DIR = Path(__file__).resolve().parent
 # Get configuration from environment variables
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 GEMINI_MODEL = "gemini-1.5-flash"
+# Maximum Gemini calls in flight per process (extra calls queue)
+GEMINI_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", "8"))
+# Per-client chat sessions
+GEMINI_MAX_SESSIONS = int(os.getenv("GEMINI_MAX_SESSIONS", "1000"))
+GEMINI_SESSION_IDLE_TIMEOUT = float(os.getenv("GEMINI_SESSION_IDLE_TIMEOUT", "1800"))  # seconds
+GEMINI_HISTORY_WINDOW = int(os.getenv("GEMINI_HISTORY_WINDOW", "12"))  # contents resent per request
+# Answer unambiguous conversion requests locally instead of calling Gemini
+FAST_PATH_ENABLED = os.getenv("FAST_PATH_ENABLED", "true").lower() == "true"
 FLASK_ENV = os.getenv("FLASK_ENV", "development")
 DEBUG = FLASK_ENV == "development"
 
-# Currency API URLs
-CURRENCY_API_URLS = [
-    "https://cdn.jsdelivr.net/npm/@fawazahmed0/currency-api@latest/v1/currencies/{base}.json",
+# Admission control: a per-client token bucket and a bounded queue per lane.
+# Chat requests wait on Gemini; conversions get their own, larger lane.
+CHAT_RATE_LIMIT = float(os.getenv("CHAT_RATE_LIMIT", "0.5"))  # requests/second per client (0 disables)
+CHAT_RATE_BURST = int(os.getenv("CHAT_RATE_BURST", "10"))
+CHAT_MAX_IN_FLIGHT = int(os.getenv("CHAT_MAX_IN_FLIGHT", str(2 * GEMINI_MAX_CONCURRENCY)))
+CHAT_MAX_QUEUE = int(os.getenv("CHAT_MAX_QUEUE", "64"))
+CHAT_MAX_WAIT = float(os.getenv("CHAT_MAX_WAIT", "10"))  # seconds waiting for a slot before 503
+CONVERT_RATE_LIMIT = float(os.getenv("CONVERT_RATE_LIMIT", "20"))  # requests/second per client (0 disables)
+CONVERT_RATE_BURST = int(os.getenv("CONVERT_RATE_BURST", "50"))
+CONVERT_MAX_IN_FLIGHT = int(os.getenv("CONVERT_MAX_IN_FLIGHT", "256"))
+CONVERT_MAX_QUEUE = int(os.getenv("CONVERT_MAX_QUEUE", "1024"))
+CONVERT_MAX_WAIT = float(os.getenv("CONVERT_MAX_WAIT", "2"))  # seconds
+ADMISSION_MAX_CLIENTS = int(os.getenv("ADMISSION_MAX_CLIENTS", "10000"))  # rate-limit buckets kept
+TRUST_PROXY_HEADERS = os.getenv("TRUST_PROXY_HEADERS", "false").lower() == "true"  # rate limit by X-Forwarded-For
+
+# Currency API URLs (comma-separated override, e.g. to point at the benchmark's fake API)
+CURRENCY_API_URLS = os.getenv(
+    "CURRENCY_API_URLS",
+    "https://cdn.jsdelivr.net/npm/@fawazahmed0/currency-api@latest/v1/currencies/{base}.json,"
     "https://latest.currency-api.pages.dev/v1/currencies/{base}.json"
-]
+).split(",")
+
+# Pivot currency whose table serves every cross rate
+PIVOT_CURRENCY = os.getenv("PIVOT_CURRENCY", "usd").lower()
+
+# Exchange-rate cache configuration
+RATE_CACHE_TTL = int(os.getenv("RATE_CACHE_TTL", "300"))  # seconds
+RATE_CACHE_MAX_SIZE = int(os.getenv("RATE_CACHE_MAX_SIZE", "64"))  # base currencies
+RATE_STALE_RETRY = int(os.getenv("RATE_STALE_RETRY", "30"))  # seconds before retrying upstream after serving a stale table
+RATE_CACHE_STALE_TTL = int(os.getenv("RATE_CACHE_STALE_TTL", "3600"))  # seconds an expired table is served while it refreshes
+
+# Background refresh of hot rate tables ahead of expiry
+RATE_REFRESH_ENABLED = os.getenv("RATE_REFRESH_ENABLED", "true").lower() == "true"
+RATE_REFRESH_AHEAD = float(os.getenv("RATE_REFRESH_AHEAD", "60"))  # seconds before expiry
+RATE_REFRESH_JITTER = float(os.getenv("RATE_REFRESH_JITTER", "15"))  # random spread (seconds)
+RATE_REFRESH_POLL = float(os.getenv("RATE_REFRESH_POLL", "30"))  # max sleep between scheduling passes
+RATE_REFRESH_HOT_BASES = int(os.getenv("RATE_REFRESH_HOT_BASES", "10"))  # observed bases kept warm
+RATE_REFRESH_BACKOFF_MIN = float(os.getenv("RATE_REFRESH_BACKOFF_MIN", "5"))  # seconds
+RATE_REFRESH_BACKOFF_MAX = float(os.getenv("RATE_REFRESH_BACKOFF_MAX", "300"))  # seconds
+
+# On-disk rate snapshots used for warm starts and when every mirror is down
+DATA_FOLDER = Path(os.getenv("DATA_FOLDER", str(BASE_DIR / "data")))
+RATE_SNAPSHOT_FOLDER = DATA_FOLDER / "rates"
+
+# Rate tables shared by all worker processes through memory-mapped segments
+RATE_SHARED_ENABLED = os.getenv("RATE_SHARED_ENABLED", "true").lower() == "true"
+RATE_SHARED_FOLDER = Path(os.getenv(
+    "RATE_SHARED_FOLDER",
+    # Per-user default, so another local user cannot claim the folder first
+    f"/dev/shm/currency-converter-{os.getuid()}" if os.path.isdir("/dev/shm") and hasattr(os, "getuid")
+    else str(DATA_FOLDER / "shared")
+))
+RATE_SHARED_SEGMENT_SIZE = int(os.getenv("RATE_SHARED_SEGMENT_SIZE", str(64 * 1024)))  # bytes per base currency
+
+# Daily historical rates: dated mirror URLs and the local time-series store
+CURRENCY_HISTORY_URLS = os.getenv(
+    "CURRENCY_HISTORY_URLS",
+    "https://cdn.jsdelivr.net/npm/@fawazahmed0/currency-api@{date}/v1/currencies/{base}.json,"
+    "https://{date}.currency-api.pages.dev/v1/currencies/{base}.json"
+).split(",")
+RATE_HISTORY_FOLDER = DATA_FOLDER / "history"
+RATE_HISTORY_EPOCH = os.getenv("RATE_HISTORY_EPOCH", "2024-03-02")  # first date the dated mirrors publish
+RATE_HISTORY_MAX_DAYS = int(os.getenv("RATE_HISTORY_MAX_DAYS", "366"))  # longest range per history query
+RATE_HISTORY_FETCH_CONCURRENCY = int(os.getenv("RATE_HISTORY_FETCH_CONCURRENCY", "8"))  # missing dates fetched at once
+
+# Outbound HTTP connection pool configuration
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "100"))
+HTTP_POOL_PER_HOST = int(os.getenv("HTTP_POOL_PER_HOST", "20"))
+HTTP_DNS_CACHE_TTL = int(os.getenv("HTTP_DNS_CACHE_TTL", "300"))  # seconds
+HTTP_KEEPALIVE_TIMEOUT = float(os.getenv("HTTP_KEEPALIVE_TIMEOUT", "30"))  # seconds
+HTTP_REQUEST_TIMEOUT = float(os.getenv("HTTP_REQUEST_TIMEOUT", "5"))  # seconds
+
+# Batch conversion endpoint
+BATCH_MAX_ROWS = int(os.getenv("BATCH_MAX_ROWS", "10000"))
+
+# Hedged requests across the rate mirrors (seconds)
+RATE_HEDGE_DELAY_DEFAULT = float(os.getenv("RATE_HEDGE_DELAY_DEFAULT", "0.3"))
+RATE_HEDGE_DELAY_MIN = float(os.getenv("RATE_HEDGE_DELAY_MIN", "0.05"))
+RATE_HEDGE_DELAY_MAX = float(os.getenv("RATE_HEDGE_DELAY_MAX", "1.0"))
+
+# Per-mirror circuit breaker
+BREAKER_WINDOW = int(os.getenv("BREAKER_WINDOW", "20"))  # recent calls considered
+BREAKER_MIN_SAMPLES = int(os.getenv("BREAKER_MIN_SAMPLES", "5"))
+BREAKER_ERROR_THRESHOLD = float(os.getenv("BREAKER_ERROR_THRESHOLD", "0.5"))  # share of bad calls
+BREAKER_SLOW_THRESHOLD = float(os.getenv("BREAKER_SLOW_THRESHOLD", "2.0"))  # seconds
+BREAKER_COOLDOWN = float(os.getenv("BREAKER_COOLDOWN", "30"))  # seconds
 
 # Common currency mappings to help with currency identification
 CURRENCY_MAPPING = {
@@ -36,8 +125,28 @@ CURRENCY_MAPPING = {
     # Add more mappings as needed
 }
 
+# Quick conversion buttons on the chat page; their intents are pre-warmed at startup
+SHORTCUT_QUERIES = [
+    ("دولار → يورو", "حول 1 دولار إلى يورو"),
+    ("دولار → جنيه مصري", "حول 1 دولار إلى جنيه مصري"),
+    ("يورو → دولار", "كم يساوي 100 يورو بالدولار؟"),
+    ("جنيه مصري → دولار", "كم يساوي 100 جنيه مصري بالدولار؟"),
+]
+
+# Cache of extracted conversion intents by normalized message
+INTENT_CACHE_MAX_SIZE = int(os.getenv("INTENT_CACHE_MAX_SIZE", "5000"))
+
+# Static asset pipeline: fingerprinted, precompressed copies of app/static
+STATIC_FOLDER = BASE_DIR / "app" / "static"
+ASSET_BUILD_ENABLED = os.getenv("ASSET_BUILD_ENABLED", "true").lower() == "true"  # build at startup
+ASSET_BUILD_FOLDER = Path(os.getenv("ASSET_BUILD_FOLDER", str(BASE_DIR / "build" / "assets")))
+ASSET_MAX_AGE = int(os.getenv("ASSET_MAX_AGE", str(365 * 24 * 3600)))  # seconds hashed assets are cached
+
 # Logging configuration
-LOG_FOLDER = BASE_DIR / "logs"
+LOG_FOLDER = Path(os.getenv("LOG_FOLDER", str(BASE_DIR / "logs")))
 LOG_FILENAME = LOG_FOLDER / "app.log"
 LOG_LEVEL = "DEBUG" if DEBUG else "INFO"
-LOG_ROTATION = "10 MB"
\ No newline at end of file
+LOG_ROTATION = "10 MB"
+LOG_JSON = os.getenv("LOG_JSON", "true").lower() == "true"  # one compact JSON object per line in the log file
+LOG_DEBUG_SAMPLE_EVERY = int(os.getenv("LOG_DEBUG_SAMPLE_EVERY", "10"))  # debug_sampled keeps 1 in N calls per call site
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))  # records waiting for the background writer
\ No newline at end of file
@@ -0,0 +1,56 @@
+"""Tests for per-client chat session ids and the session store."""
+import pytest
+from flask import Flask
+
+from app import routes
+from app.modules.chat_sessions import SessionStore
+from app.routes import client_session_id, register_routes
+
+
+@pytest.fixture
+def client(monkeypatch):
+    seen = []
+
+    async def fake_process(message, session_id):
+        seen.append(session_id)
+        return {"text": "ok", "type": "text"}
+
+    monkeypatch.setattr(routes, "process_user_message", fake_process)
+    app = Flask("app")
+    register_routes(app)
+    test_client = app.test_client()
+    test_client.seen = seen
+    return test_client
+
+
+def test_valid_session_id_is_kept():
+    assert client_session_id({"session_id": "tab-1234abcd"}) == "tab-1234abcd"
+
+
+@pytest.mark.parametrize("data", [{}, {"session_id": "short"}, {"session_id": "bad id!"}, {"session_id": 12345678}])
+def test_missing_or_invalid_session_id_gets_a_fresh_one(data):
+    first, second = client_session_id(data), client_session_id(data)
+    assert first != second
+    assert routes._SESSION_ID_PATTERN.match(first)
+
+
+def test_clients_without_an_id_never_share_a_session(client):
+    bodies = [client.post("/api/chat", json={"message": "hi"}, environ_base={"REMOTE_ADDR": "10.0.0.1"}).get_json()
+              for _ in range(2)]
+    assert bodies[0]["session_id"] != bodies[1]["session_id"]
+    assert client.seen == [body["session_id"] for body in bodies]
+
+    reused = client.post("/api/chat", json={"message": "hi", "session_id": bodies[0]["session_id"]}).get_json()
+    assert reused["session_id"] == bodies[0]["session_id"]
+    assert client.seen[-1] == bodies[0]["session_id"]
+
+
+def test_stats_sum_session_sizes():
+    store = SessionStore(lambda: {"bytes": 10, "approx_tokens": 2}, max_sessions=5, idle_timeout=60)
+    for session_id in ("a", "b", "c"):
+        store.get(session_id)
+    stats = store.stats(sizer=lambda session: dict(session))
+    assert stats["live"] == 3
+    assert stats["total_bytes"] == 30
+    assert stats["total_approx_tokens"] == 6
+    assert "sessions" not in stats
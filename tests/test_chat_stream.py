@@ -0,0 +1,61 @@
+"""Tests for streamed chat replies."""
+from types import SimpleNamespace
+
+import config
+from app.modules import gemini_client
+from app.modules.gemini_client import GeminiChat, gemini_limiter
+from app.routes import _sse_events
+
+CONVERSION = {
+    "amount": 100.0,
+    "base_currency": "USD",
+    "target_currency": "EUR",
+    "result": 92.0,
+    "rate": 0.92,
+}
+
+
+def _response(text="", function_call=None):
+    part = SimpleNamespace(text=text, function_call=function_call)
+    return SimpleNamespace(text=text, candidates=[SimpleNamespace(content=SimpleNamespace(role="model", parts=[part]))])
+
+
+class FakeChat:
+    """Answers with a conversion call, then streams the phrased reply in chunks."""
+
+    def __init__(self):
+        self.history = []
+
+    def send_message(self, content, stream=False):
+        if stream:
+            return iter([_response(f"chunk {n} ") for n in range(4)])
+        args = {"amount": 100, "base_currency": "USD", "target_currency": "EUR"}
+        return _response(function_call=SimpleNamespace(name="convert_currency", args=args))
+
+    def rewind(self):
+        pass
+
+
+class FakeModel:
+    def start_chat(self):
+        return FakeChat()
+
+
+async def _fake_conversions(self, requests, original_message):
+    return [dict(CONVERSION)], []
+
+
+def test_abandoned_stream_releases_gemini_slot(monkeypatch):
+    monkeypatch.setattr(gemini_client, "_gemini_model", FakeModel())
+    monkeypatch.setattr(GeminiChat, "_run_conversions", _fake_conversions)
+    chat = GeminiChat()
+
+    # More abandoned streams than there are slots: a leaked slot would hang the last one
+    for _ in range(config.GEMINI_MAX_CONCURRENCY + 1):
+        events = _sse_events(chat.stream_message("حول 100 دولار إلى يورو"))
+        for block in events:
+            if block.startswith("event: chunk"):
+                break
+        events.close()  # the client disconnected mid-reply
+
+    assert gemini_limiter.stats()["in_flight"] == 0
@@ -0,0 +1,38 @@
+"""Tests for the /api/convert endpoint."""
+from datetime import date, timedelta
+
+import pytest
+from flask import Flask
+
+from app.routes import register_routes
+
+
+@pytest.fixture
+def client():
+    app = Flask("app")
+    register_routes(app)
+    return app.test_client()
+
+
+def test_future_date_is_a_bad_request(client):
+    tomorrow = (date.today() + timedelta(days=2)).isoformat()
+    response = client.post("/api/convert", json={
+        "amount": 10, "base_currency": "USD", "target_currency": "EUR", "date": tomorrow
+    })
+    assert response.status_code == 400
+    assert response.get_json()["error"]
+
+
+@pytest.mark.parametrize("amount", ["NaN", "inf", "-5"])
+def test_convert_rejects_amounts_that_are_not_positive_numbers(client, amount):
+    response = client.post("/api/convert", json={"amount": amount, "base_currency": "USD", "target_currency": "EUR"})
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize("amount", ["NaN", "-inf", "-1"])
+def test_batch_rejects_amounts_that_are_not_positive_numbers(client, amount):
+    rows = [{"amount": 5, "base_currency": "USD", "target_currency": "EUR"},
+            {"amount": amount, "base_currency": "USD", "target_currency": "EUR"}]
+    response = client.post("/api/convert/batch", json=rows)
+    assert response.status_code == 400
+    assert "row 2" in response.get_json()["error"]
@@ -0,0 +1,22 @@
+"""Tests for batch conversion."""
+import asyncio
+
+from app.modules import currency_service
+from app.modules.cross_rates import CrossRateTable
+
+TABLE = CrossRateTable.from_rates("usd", {"usd": 1.0, "eur": 0.5, "egp": 50.0}, fetched_at=0)
+
+
+async def _get_rate_table(base_currency):
+    return TABLE
+
+
+def test_converts_rows_in_order_and_flags_unknown_targets(monkeypatch):
+    monkeypatch.setattr(currency_service, "get_rate_table", _get_rate_table)
+    rows = [(10.0, "USD", "EUR"), (3.0, "eur", "egp"), (1.0, "USD", "XXX"), (2.0, "USD", "EUR")]
+
+    results = asyncio.run(currency_service.convert_batch(rows))
+
+    assert [entry.get("result") for entry in results] == [5.0, 300.0, None, 1.0]
+    assert "error" in results[2]
+    assert [entry["target_currency"] for entry in results] == ["EUR", "EGP", "XXX", "EUR"]
@@ -0,0 +1,64 @@
+"""Tests for background threads across a fork, as in a pre-forking server."""
+import asyncio
+import os
+
+import pytest
+
+from app.modules.http_client import http_client
+from app.modules.rate_cache import RateCache
+from app.modules.rate_refresher import RateRefresher
+
+pytestmark = pytest.mark.skipif(not hasattr(os, "fork"), reason="needs os.fork")
+
+
+def _in_child(check) -> int:
+    """Run ``check`` in a forked child and return its exit status (0 if it returned True)."""
+    pid = os.fork()
+    if pid == 0:
+        try:
+            os._exit(0 if check() else 1)
+        except BaseException:
+            os._exit(2)
+    _, status = os.waitpid(pid, 0)
+    return os.waitstatus_to_exitcode(status)
+
+
+def test_http_client_restarts_in_a_forked_child():
+    http_client.start()
+
+    async def answer():
+        return 42
+
+    def check():
+        if http_client.started:
+            return False
+        result = asyncio.run(asyncio.wait_for(http_client.run(answer()), timeout=5))
+        return result == 42 and http_client.started
+
+    try:
+        assert _in_child(check) == 0
+        assert http_client.started
+    finally:
+        http_client.stop()
+
+
+def test_rate_refresher_is_idle_in_a_forked_child():
+    async def fetch(key):
+        raise ValueError("offline")
+
+    refresher = RateRefresher(RateCache(max_size=4, ttl=60), fetch, seeds=[], table_key=lambda base: base)
+    os.register_at_fork(after_in_child=refresher.forget_after_fork)
+    refresher.start()
+
+    def check():
+        if refresher.running:
+            return False
+        refresher.start()
+        running = refresher.running
+        refresher.stop()
+        return running
+
+    try:
+        assert _in_child(check) == 0
+    finally:
+        refresher.stop()
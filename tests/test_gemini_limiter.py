@@ -0,0 +1,35 @@
+"""Tests for the limiter in front of Gemini calls."""
+import asyncio
+import threading
+import time
+
+from app.modules.gemini_client import gemini_limiter, run_gemini_call
+
+
+def test_cancelled_call_keeps_its_slot_until_the_call_returns():
+    started, finish = threading.Event(), threading.Event()
+
+    def slow_call():
+        started.set()
+        finish.wait(5)
+        return "done"
+
+    async def cancel_mid_call():
+        task = asyncio.ensure_future(run_gemini_call(slow_call, stage="test"))
+        await asyncio.get_running_loop().run_in_executor(None, started.wait, 5)
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        return gemini_limiter.stats()["in_flight"]
+
+    try:
+        assert asyncio.run(cancel_mid_call()) == 1  # the call is still running on the pool
+    finally:
+        finish.set()
+
+    deadline = time.monotonic() + 5
+    while gemini_limiter.stats()["in_flight"] and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert gemini_limiter.stats()["in_flight"] == 0
@@ -0,0 +1,41 @@
+"""Tests for the local conversion-intent parser."""
+import pytest
+
+from app.modules.intent_parser import parse_conversion_intent
+
+
+@pytest.mark.parametrize("message, expected", [
+    ("حول 100 دولار إلى يورو", (100.0, "USD", "EUR")),
+    ("كم يساوي 100 جنيه مصري بالدولار؟", (100.0, "EGP", "USD")),
+    ("حول 200 جنيه استرليني إلى جنيه مصري", (200.0, "GBP", "EGP")),
+    ("معايا 100 دولار، بيساووا كام بالجنيه؟", (100.0, "USD", "EGP")),
+    ("حول مية دولار لليورو", (100.0, "USD", "EUR")),
+    ("100 دولار كم يورو", (100.0, "USD", "EUR")),
+    ("convert 100 dollars to euros", (100.0, "USD", "EUR")),
+    ("100 euros in dollars", (100.0, "EUR", "USD")),
+    ("حول 100 دولار إلى يورو من فضلك", (100.0, "USD", "EUR")),
+    ("حول 100 دولارات إلى يورو", (100.0, "USD", "EUR")),
+    ("حول 2 دولارين إلى يورو", (2.0, "USD", "EUR")),
+    ("كم يساوي 300 جنيهات بالدولارات", (300.0, "EGP", "USD")),
+])
+def test_parses_unambiguous_messages(message, expected):
+    intent = parse_conversion_intent(message)
+    assert (intent["amount"], intent["base_currency"], intent["target_currency"]) == expected
+
+
+@pytest.mark.parametrize("message", [
+    "حول 100 دولار إلى يورو وين",
+    "حول 100 دولار إلى يورو والريال",
+    "100 دولار كم يورو و كم درهم",
+    "convert 100 dollars to euros and yen",
+    "convert 100 dollars to euros or yen",
+    "حول 100 دولار إلى يورو ثم",
+    "حول 100 دولار هونج كونج الى يورو",
+    "convert 100 dollars to hong kong dollars",
+    "حول 100 دولار كندي إلى يورو",
+    "حول 100 دولار و يورو",
+    "حول 100 دولارات كندية إلى يورو",
+    "حول 100 يورو إلى دولارات كندية",
+])
+def test_leaves_unrecognized_currencies_to_gemini(message):
+    assert parse_conversion_intent(message) is None
@@ -0,0 +1,31 @@
+"""Tests for call-site debug sampling."""
+from loguru import logger
+
+from app.modules import log_writer
+from app.modules.log_writer import debug_sampled
+
+
+class CountingArg:
+    """Counts how often the logger formats it."""
+
+    def __init__(self):
+        self.formatted = 0
+
+    def __format__(self, spec):
+        self.formatted += 1
+        return "arg"
+
+
+def test_skipped_calls_are_never_formatted(monkeypatch):
+    monkeypatch.setattr(log_writer.config, "LOG_DEBUG_SAMPLE_EVERY", 10)
+    messages = []
+    handler = logger.add(messages.append, level="DEBUG", format="{message}")
+    arg = CountingArg()
+    try:
+        for _ in range(25):
+            debug_sampled("value {}", arg)
+    finally:
+        logger.remove(handler)
+
+    assert len(messages) == 3
+    assert arg.formatted == 3
@@ -0,0 +1,26 @@
+"""Tests for the /metrics endpoint."""
+import pytest
+from flask import Flask
+
+from app.routes import register_routes
+
+
+@pytest.fixture
+def client():
+    app = Flask("app")
+    register_routes(app)
+    return app.test_client()
+
+
+def test_feature_gauges_are_on_metrics(client):
+    body = client.get("/metrics").get_data(as_text=True)
+    for name in ("limiter_in_flight", "limiter_queued", "admission_tracked_clients", "rate_cache_entries",
+                 "rate_mirror_circuit_open", "rate_refresher_runs_total", "rate_shared_leader",
+                 "rate_history_days", "intent_cache_entries", "chat_sessions"):
+        assert f"# TYPE {name} " in body
+    assert 'limiter_in_flight{limiter="gemini"}' in body
+
+
+def test_per_feature_stats_endpoints_are_gone(client):
+    for feature in ("cache", "sources", "sessions", "gemini", "admission", "shared"):
+        assert client.get(f"/api/{feature}/stats").status_code == 404
@@ -0,0 +1,59 @@
+"""Tests for the single-flight rate cache."""
+import asyncio
+
+from app.modules.rate_cache import RateCache
+
+
+def test_cancelled_follower_does_not_fail_the_shared_fetch():
+    cache = RateCache(ttl=60, max_size=10)
+
+    async def scenario():
+        started, release = asyncio.Event(), asyncio.Event()
+
+        async def fetch(base):
+            started.set()
+            await release.wait()
+            return "table"
+
+        leader = asyncio.create_task(cache.refresh("usd", fetch))
+        await started.wait()
+        cancelled = asyncio.create_task(cache.refresh("usd", fetch))
+        follower = asyncio.create_task(cache.refresh("usd", fetch))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        await asyncio.sleep(0)
+        release.set()
+
+        assert await leader == "table"
+        assert await follower == "table"
+        assert cancelled.cancelled()
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_leader_hands_the_fetch_to_a_follower():
+    cache = RateCache(ttl=60, max_size=10)
+
+    async def scenario():
+        started = asyncio.Event()
+        calls = []
+
+        async def fetch(base):
+            calls.append(base)
+            if len(calls) == 1:
+                started.set()
+                await asyncio.Event().wait()  # never finishes; the leader is cancelled
+            return "table"
+
+        leader = asyncio.create_task(cache.refresh("usd", fetch))
+        await started.wait()
+        follower = asyncio.create_task(cache.refresh("usd", fetch))
+        await asyncio.sleep(0)
+        leader.cancel()
+
+        assert await follower == "table"
+        assert leader.cancelled()
+        assert len(calls) == 2
+        assert cache.get("usd") == "table"
+
+    asyncio.run(scenario())
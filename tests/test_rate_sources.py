@@ -0,0 +1,70 @@
+"""Tests for mirror selection and circuit breakers."""
+import asyncio
+
+import config
+from app.modules.rate_sources import HALF_OPEN, OPEN, SourceSelector
+
+MIRRORS = ["https://a.example/{base}.json", "https://b.example/{base}.json"]
+
+
+def _cooled_down(breaker):
+    """Put a breaker in the open state with its cooldown already over."""
+    breaker.state = OPEN
+    breaker._opened_at -= config.BREAKER_COOLDOWN + 1
+
+
+def test_ordering_mirrors_claims_no_probe():
+    selector = SourceSelector(MIRRORS)
+    for source in selector.sources:
+        _cooled_down(source.breaker)
+
+    selector.candidates()
+    selector.candidates()
+
+    assert all(source.breaker.claim() == (True, True) for source in selector.sources)
+
+
+def test_probe_is_claimed_only_for_the_mirror_called():
+    selector = SourceSelector(MIRRORS)
+    first, second = selector.sources
+    _cooled_down(first.breaker)
+    _cooled_down(second.breaker)
+    first.breaker._latencies.append(0.01)
+
+    async def fetch(url):
+        return url
+
+    assert asyncio.run(selector.fetch("usd", fetch)) == "https://a.example/usd.json"
+    assert first.breaker.state != HALF_OPEN
+    assert second.breaker.claim() == (True, True)
+
+
+def test_forced_attempt_does_not_free_another_requests_probe():
+    selector = SourceSelector(MIRRORS[:1])
+    breaker = selector.sources[0].breaker
+    _cooled_down(breaker)
+    assert breaker.claim() == (True, True)  # another request is probing
+
+    async def fetch(url):
+        raise asyncio.CancelledError
+
+    async def scenario():
+        try:
+            await selector.fetch("usd", fetch)
+        except asyncio.CancelledError:
+            pass
+
+    asyncio.run(scenario())
+    assert breaker.claim() == (False, False)
+
+
+def test_zero_latency_sorts_first():
+    selector = SourceSelector(MIRRORS)
+    first, second = selector.sources
+    first.breaker._latencies.append(0.1)
+    second.breaker._latencies.append(0.0)
+
+    ordered, forced = selector.candidates()
+
+    assert ordered == [second, first]
+    assert not forced
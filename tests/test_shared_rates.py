@@ -0,0 +1,63 @@
+"""Tests for the rate tables shared between workers."""
+import os
+import stat
+import threading
+
+from app.modules.cross_rates import CrossRateTable
+from app.modules.shared_rates import SharedRateStore
+
+
+def test_creates_a_private_folder_and_segments(tmp_path):
+    folder = tmp_path / "shared"
+    store = SharedRateStore(folder, 4096)
+
+    assert store.segment("usd") is not None
+    assert store.is_leader()
+    assert stat.S_IMODE(os.stat(folder).st_mode) & 0o077 == 0
+    assert stat.S_IMODE(os.stat(folder / "usd.seg").st_mode) == 0o600
+    assert stat.S_IMODE(os.stat(folder / "refresher.lock").st_mode) == 0o600
+
+
+def test_refuses_a_folder_other_users_can_write(tmp_path):
+    folder = tmp_path / "shared"
+    folder.mkdir()
+    folder.chmod(0o777)
+    store = SharedRateStore(folder, 4096)
+
+    assert store.segment("usd") is None
+    assert not store.is_leader()
+    assert not (folder / "usd.seg").exists()
+
+
+def test_refuses_a_symlinked_folder(tmp_path):
+    target = tmp_path / "elsewhere"
+    target.mkdir(mode=0o700)
+    folder = tmp_path / "shared"
+    folder.symlink_to(target)
+    store = SharedRateStore(folder, 4096)
+
+    assert store.segment("usd") is None
+
+
+def test_reads_take_no_store_lock(tmp_path):
+    store = SharedRateStore(tmp_path / "shared", 4096)
+    store.publish(CrossRateTable.from_rates("usd", {"usd": 1.0, "eur": 0.5}, fetched_at=0))
+
+    results = []
+    with store._lock:  # a reader blocked on the store lock would never finish
+        reader = threading.Thread(target=lambda: results.append(store.read("usd")))
+        reader.start()
+        reader.join(timeout=5)
+    assert results and results[0].rate("usd", "eur") == 0.5
+
+
+def test_forked_child_reopens_its_segments(tmp_path):
+    store = SharedRateStore(tmp_path / "shared", 4096)
+    store.publish(CrossRateTable.from_rates("usd", {"usd": 1.0, "eur": 0.5}, fetched_at=0))
+    inherited = store.segment("usd")
+
+    store.forget_after_fork()
+
+    reopened = store.segment("usd")
+    assert reopened is not inherited
+    assert reopened.read().rate("usd", "eur") == 0.5
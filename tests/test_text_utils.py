@@ -0,0 +1,34 @@
+"""Tests for the shared text normalization."""
+from app.modules.intent_cache import IntentCache
+from app.modules.utils import fold_alef, normalize_text
+
+
+def test_fold_alef_keeps_positions():
+    text = "حوّل 100 دولار إلى يورو"
+    assert len(fold_alef(text)) == len(text)
+    assert fold_alef("أإآ") == "ااا"
+
+
+def test_normalize_text_builds_on_the_same_folding():
+    assert normalize_text("حوّل ١٠٠ دولار إلى يورو؟") == normalize_text("حول 100 دولار الي يورو")
+    assert normalize_text(fold_alef("آلاف")) == normalize_text("آلاف")
+
+
+def test_intent_cache_matches_alef_variants():
+    cache = IntentCache(max_size=10)
+    intent = {"amount": 100.0, "base_currency": "USD", "target_currency": "EUR"}
+    assert cache.put("حول 100 دولار إلى يورو", intent)
+    assert cache.get("حول 100 دولار الى يورو") == intent
+
+
+def test_normalize_text_keeps_digit_separators():
+    assert normalize_text("حول 100,5 دولار إلى يورو") != normalize_text("حول 1005 دولار إلى يورو")
+    assert normalize_text("حول ١٬٠٠٠ دولار، إلى يورو") == normalize_text("حول 1,000 دولار إلى يورو")
+
+
+def test_intent_cache_misses_when_the_amount_differs():
+    cache = IntentCache(max_size=10)
+    intent = {"amount": 1005.0, "base_currency": "USD", "target_currency": "EUR"}
+    assert cache.put("حول 1005 دولار إلى يورو", intent)
+    assert cache.get("حول 100,5 دولار إلى يورو") is None
+    assert cache.get("حول 1005 دولار إلى يورو") == intent